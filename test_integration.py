@@ -113,6 +113,1370 @@ async def test_security():
         return False
 
 
+async def test_event_bus():
+    """测试事件总线"""
+    print("[*] Testing Event Bus...")
+    from yfai.core import DropPolicy, EventBus, EventType
+
+    try:
+        bus = EventBus(queue_size=2)
+        jobs = bus.subscribe("job", predicate=lambda e: e.job_id == "j1")
+        newest = bus.subscribe(EventType.JOB_STATUS, policy=DropPolicy.DROP_NEWEST)
+
+        for status in ("pending", "running", "success"):
+            bus.publish(EventType.JOB_STATUS, job_id="j1", status=status)
+        bus.publish(EventType.JOB_STEP, job_id="j2", status="running")
+        bus.publish(EventType.TOOL_CALL, tool_name="fs.read")
+
+        # 队列满时分别丢弃最旧/最新的事件, 发布方不阻塞
+        jobs.close()
+        assert [e.data["status"] async for e in jobs] == ["running", "success"]
+        assert [e.data["status"] for e in newest.drain()] == ["pending", "running"]
+        assert jobs.dropped == 1 and newest.dropped == 1
+        assert bus.get_stats()["subscribers"] == 1
+
+        print("  [OK] Event Bus working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Event Bus failed: {e}")
+        return False
+
+
+async def test_single_flight():
+    """测试相同请求合并"""
+    print("[*] Testing Single Flight...")
+    import asyncio
+
+    from yfai.core.cancellation import cancel_scope, current_token
+    from yfai.core.context import current_context, request_context
+    from yfai.localops.executor import OperationCancelled
+    from yfai.providers.singleflight import SingleFlight
+
+    try:
+        flight = SingleFlight()
+        calls = []
+
+        sessions = []
+
+        async def upstream():
+            # 上游不继承任何调用方的取消令牌, 但沿用首个调用方的请求上下文
+            assert current_token() is None
+            sessions.append(current_context().session_id)
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        # N 个并发调用方只触发一次上游调用
+        results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(5)))
+        assert results == ["result"] * 5 and len(calls) == 1 and flight.in_flight() == 0
+
+        # 首个调用方的截止时间只结束它自己, 其余等待者照常拿到结果
+        async def with_deadline():
+            with request_context(session_id="s-first"):
+                async with cancel_scope(timeout=0.01):
+                    return await flight.do("k", upstream)
+
+        first = asyncio.create_task(with_deadline())
+        await asyncio.sleep(0)
+        rest = await asyncio.gather(flight.do("k", upstream), flight.do("k", upstream))
+        assert rest == ["result", "result"] and len(calls) == 2
+        assert sessions == [None, "s-first"]
+        try:
+            await first
+            raise AssertionError("deadline not raised")
+        except OperationCancelled:
+            pass
+
+        # 单个等待者取消不影响其他等待者
+        waiter = asyncio.create_task(flight.do("k", upstream))
+        other = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        assert await other == "result" and waiter.cancelled() and len(calls) == 3
+
+        # 流式请求: 晚加入的调用方先收到已产生的片段
+        async def chunks():
+            calls.append(1)
+            for text in ("a", "b", "c"):
+                await asyncio.sleep(0.02)
+                yield text
+
+        async def collect():
+            return [chunk async for chunk in flight.stream("s", chunks)]
+
+        early = asyncio.create_task(collect())
+        await asyncio.sleep(0.03)
+        late = asyncio.create_task(collect())
+        assert await early == ["a", "b", "c"] and await late == ["a", "b", "c"]
+        assert len(calls) == 4
+
+        # 一个订阅者提前取消, 其余订阅者仍收到完整的流
+        quitter = asyncio.create_task(collect())
+        stayer = asyncio.create_task(collect())
+        await asyncio.sleep(0.03)
+        quitter.cancel()
+        assert await stayer == ["a", "b", "c"] and len(calls) == 5
+
+        print("  [OK] Single Flight working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Single Flight failed: {e}")
+        return False
+
+
+async def test_cancellation():
+    """测试取消令牌与截止时间"""
+    print("[*] Testing Cancellation...")
+    import os
+    import time
+
+    from yfai.core.cancellation import CancelToken, DeadlineExceeded, OperationCancelled, cancel_scope
+    from yfai.localops import ShellOps
+
+    try:
+        # 超过截止时间: 子进程组被结束, 不等满命令自身的超时
+        if os.name == "posix":
+            shell, command = ShellOps(default_shell="bash"), "sleep 30"
+        else:
+            shell, command = ShellOps(default_shell="powershell"), "Start-Sleep 30"
+        started = time.monotonic()
+        try:
+            async with cancel_scope(timeout=0.3):
+                await shell.execute(command, timeout=60)
+            raise AssertionError("命令未被中断")
+        except DeadlineExceeded:
+            pass
+        assert time.monotonic() - started < 5
+
+        # 主动取消: 进行中的等待立即结束, 子令牌随父令牌取消
+        token = CancelToken()
+        child = CancelToken(parent=token)
+        asyncio.get_running_loop().call_later(0.05, token.cancel, "用户终止")
+        try:
+            async with cancel_scope(token=token):
+                await asyncio.sleep(10)
+            raise AssertionError("等待未被中断")
+        except OperationCancelled as e:
+            assert str(e) == "用户终止"
+        assert child.cancelled and asyncio.current_task().cancelling() == 0
+
+        print("  [OK] Cancellation working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Cancellation failed: {e}")
+        return False
+
+
+async def test_logging():
+    """测试结构化日志"""
+    print("[*] Testing Structured Logging...")
+    import json
+    import logging
+    import tempfile
+
+    from yfai.core.context import request_context
+    from yfai.core.log import setup_logging, shutdown_logging
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file = Path(tmp) / "yfai.log"
+            setup_logging({"logging": {
+                "format": "json",
+                "console": False,
+                "file": str(log_file),
+                "levels": {"yfai.test.quiet": "ERROR"},
+                "rate_limit": {"window_sec": 60, "burst": 2},
+            }})
+            logger = logging.getLogger("yfai.test")
+            with request_context(session_id="s1", job_id="j1"):
+                for i in range(10):
+                    logger.warning("上游失败: %s", i)
+            logging.getLogger("yfai.test.quiet").warning("不应输出")
+            logger.info("完成", extra={"chunks": 3})
+            shutdown_logging()
+
+            entries = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+
+        # 重复告警限流, 记录携带请求上下文与附加字段
+        assert [e["msg"] for e in entries] == ["上游失败: 0", "上游失败: 1", "完成"]
+        assert entries[0]["job_id"] == "j1" and entries[0]["session_id"] == "s1"
+        assert entries[2]["chunks"] == 3
+
+        print("  [OK] Structured Logging working")
+        return True
+    except Exception as e:
+        shutdown_logging()
+        print(f"  [FAIL] Structured Logging failed: {e}")
+        return False
+
+
+async def test_stream_checkpoint():
+    """测试流式响应中途取消时保留已收到的内容与落盘元数据"""
+    print("[*] Testing Stream Checkpoint...")
+    import copy
+    import json
+
+    from yfai.core import ConfigManager, Orchestrator
+    from yfai.core.cancellation import CancelToken
+    from yfai.core.context import current_context
+    from yfai.localops.executor import OperationCancelled
+    from yfai.store import Message
+
+    try:
+        config = copy.deepcopy(ConfigManager().get_all())
+        config.setdefault("providers", {})["echo"] = {"latency": 0, "chunk_delay": 0.01, "chunk_size": 4}
+        config["app"]["stream_checkpoint"] = {"interval_sec": 0, "bytes": 1}
+        orch = Orchestrator(config)
+        session_id = await orch.create_session("Stream Checkpoint")
+
+        def load():
+            with orch.db_manager.get_session() as db_session:
+                message = db_session.query(Message).filter_by(
+                    session_id=session_id, role="assistant"
+                ).first()
+                return message.content, json.loads(message.message_metadata)
+
+        token = CancelToken()
+        stream = orch.stream_chat(
+            "一条足够长的消息用于测试中途取消", session_id=session_id,
+            provider="echo", cancel_token=token,
+        )
+        received = [await stream.__anext__() for _ in range(3)]
+
+        # 进行中的消息按间隔落盘
+        content, metadata = load()
+        assert metadata["status"] == "streaming" and metadata["usage"]["chunks"] >= 2
+        assert content and "".join(received).startswith(content)
+
+        # 进程重启时进行中的消息标记为中断, 内容保留
+        orch._recover_interrupted_streams()
+        assert load()[1]["status"] == "interrupted" and load()[0] == content
+
+        # 中途取消: 保存已收到的全部内容与取消原因
+        token.cancel("用户终止")
+        try:
+            await stream.__anext__()
+            raise AssertionError("cancel not raised")
+        except OperationCancelled:
+            pass
+        content, metadata = load()
+        assert metadata["status"] == "cancelled" and metadata["error"] == "用户终止"
+        assert content == "".join(received)
+
+        # 流式过程中 Provider 调用处于会话上下文中, 结束后恢复
+        seen = []
+        original = orch.provider_manager.stream_chat
+
+        def spy(*args, **kwargs):
+            seen.append(current_context().session_id)
+            return original(*args, **kwargs)
+
+        orch.provider_manager.stream_chat = spy
+        async for _ in orch.stream_chat("再来一条", session_id=session_id, provider="echo"):
+            pass
+        assert seen == [session_id] and current_context().session_id is None
+
+        print("  [OK] Stream Checkpoint working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Stream Checkpoint failed: {e}")
+        return False
+
+
+async def test_step_dependencies():
+    """测试智能体步骤依赖解析与结果传递"""
+    print("[*] Testing Step Dependencies...")
+    from yfai.core.agent_runner import AgentRunner
+
+    try:
+        # 未声明 depends_on 时保持顺序执行
+        assert AgentRunner._resolve_dependencies([{}, {}, {}]) == [[], [0], [1]]
+
+        steps = [
+            {"index": 0, "name": "进程", "depends_on": []},
+            {"index": 1, "name": "端口", "depends_on": []},
+            {"index": 2, "name": "报告", "depends_on": [0, "端口"]},
+            {"index": 3, "name": "孤立", "depends_on": [9]},
+        ]
+        assert AgentRunner._resolve_dependencies(steps) == [[], [], [0, 1], [-1]]
+
+        # 混合计划: 只有显式的 [] 表示不依赖, 未声明的步骤仍依赖前一步
+        mixed = [{"index": 0}, {"index": 1, "depends_on": []}, {"index": 2}, {"index": 3, "depends_on": [0, 2]}]
+        assert AgentRunner._resolve_dependencies(mixed) == [[], [], [1], [0, 2]]
+
+        step = {
+            "type": "tool",
+            "params": {"content": "进程数 {{steps.0.count}}", "ports": "{{steps.1.open}}"},
+        }
+        bound = AgentRunner._bind_step_inputs(step, {0: {"count": 12}, 1: {"open": [80, 443]}})
+        assert bound["params"] == {"content": "进程数 12", "ports": [80, 443]}
+        assert step["params"]["ports"] == "{{steps.1.open}}"
+
+        print("  [OK] Step Dependencies working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Step Dependencies failed: {e}")
+        return False
+
+
+async def test_parallel_approval():
+    """测试并发步骤的审批逐个进行, 未声明依赖的步骤等待前一步"""
+    print("[*] Testing Parallel Approval...")
+    import json
+    import uuid
+
+    from yfai.core.agent_runner import AgentRunner
+    from yfai.providers import ProviderManager
+    from yfai.security import SecurityGuard, SecurityPolicy
+    from yfai.security.guard import ApprovalResult, ApprovalStatus
+    from yfai.store import DatabaseManager
+    from yfai.store.db import Agent
+
+    try:
+        config = {"app": {"default_provider": "echo"}, "providers": {"echo": {"latency": 0}}}
+        db = DatabaseManager("data/test.db")
+        events = []
+        active = 0
+        peak = 0
+
+        async def approve(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return ApprovalResult(request_id=request.id, status=ApprovalStatus.APPROVED, approved_by="test")
+
+        async def executor(tool, params):
+            events.append(("start", params.get("path", tool)))
+            await asyncio.sleep(0.02)
+            events.append(("end", params.get("path", tool)))
+            return {"value": f"{tool}-ok"}
+
+        guard = SecurityGuard(config)
+        guard.set_approval_callback(approve)
+        runner = AgentRunner(
+            db, ProviderManager(config), guard, SecurityPolicy(config),
+            tool_executor=executor, max_parallel_steps=4,
+        )
+        agent_id = str(uuid.uuid4())
+        steps = [
+            {"type": "tool", "name": "写A", "tool": "fs.write", "params": {"path": "a.txt"}, "depends_on": []},
+            {"type": "tool", "name": "写B", "tool": "fs.write", "params": {"path": "b.txt"}, "depends_on": []},
+            {"type": "tool", "name": "进程", "tool": "process.list", "params": {}},
+        ]
+        with db.get_session() as session:
+            session.add(Agent(
+                id=agent_id, name="approval-test", system_prompt="test", default_provider="echo",
+                allowed_tools=json.dumps([step["tool"] for step in steps]),
+                stop_condition=json.dumps({"workflow_steps": steps}),
+            ))
+            session.commit()
+
+        result = await runner.run_agent(agent_id, "写入")
+        assert result["status"] == "success", result
+
+        # 两个并发步骤都需要审批, 审批回调不重叠
+        assert peak == 1
+        assert len(guard.approval_history) == 2
+        # 未声明 depends_on 的步骤在前一步(写B)完成后才开始
+        assert events.index(("start", "process.list")) > events.index(("end", "b.txt"))
+
+        print("  [OK] Parallel Approval working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Parallel Approval failed: {e}")
+        return False
+
+
+async def test_plan_stream():
+    """测试流式计划的增量步骤解析"""
+    print("[*] Testing Plan Stream...")
+    import json
+
+    from yfai.core.agent_runner import AgentRunner
+    from yfai.core.plan_stream import PlanStepParser
+    from yfai.providers import ProviderManager
+    from yfai.security import SecurityGuard, SecurityPolicy
+    from yfai.store import DatabaseManager
+
+    try:
+        plan = {
+            "goal": "巡检",
+            "steps": [
+                {"index": 0, "type": "tool", "params": {"note": "a}b\"{["}, "depends_on": []},
+                {"index": 1, "type": "analysis", "depends_on": [0]},
+            ],
+        }
+        text = "```json\n" + json.dumps(plan, ensure_ascii=False, indent=2) + "\n```"
+
+        parser = PlanStepParser()
+        emitted = []
+        for i in range(0, len(text), 7):
+            for step in parser.feed(text[i:i + 7]):
+                # 每个步骤在其对象闭合时交出, 早于整个计划结束
+                emitted.append((step, len(parser.text)))
+
+        assert [step for step, _ in emitted] == plan["steps"]
+        assert emitted[0][1] < len(text) - 20
+        assert parser.finished
+
+        # 逐字符输入("steps" 键与转义字符跨片段)结果相同
+        parser = PlanStepParser()
+        single = [step for char in text for step in parser.feed(char)]
+        assert single == plan["steps"] and parser.text == text
+
+        # 计划仍在生成时步骤失败: 不再等待后续步骤, 并关闭计划流
+        config = {"app": {"default_provider": "echo"}, "providers": {"echo": {"latency": 0}}}
+        runner = AgentRunner(
+            DatabaseManager("data/test.db"), ProviderManager(config),
+            SecurityGuard(config), SecurityPolicy(config),
+        )
+        closed = asyncio.Event()
+
+        async def incoming():
+            try:
+                yield {"type": "tool", "tool": "net.list_ports"}
+                await asyncio.sleep(30)
+                yield {"type": "tool", "tool": "net.ping"}
+            finally:
+                closed.set()
+
+        async def execute(job_id, pos, step, agent, timeout=None):
+            return {"step_index": pos, "status": "failed", "error": "进程不可用"}
+
+        runner._execute_step = execute
+        results = await asyncio.wait_for(
+            runner._run_steps("job", [{"type": "tool", "tool": "process.list"}], {}, 4, incoming=incoming()),
+            timeout=5,
+        )
+        assert [result["status"] for result in results] == ["failed"]
+        assert closed.is_set()
+
+        print("  [OK] Plan Stream working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Plan Stream failed: {e}")
+        return False
+
+
+async def test_streamed_plan_failure():
+    """测试计划仍在流式生成时步骤失败: 不再等待计划, 已生成的步骤照常保存并发布"""
+    print("[*] Testing Streamed Plan Failure...")
+    import json
+    import time
+    import uuid
+
+    from yfai.core.agent_runner import AgentRunner
+    from yfai.core.events import EventBus, EventType
+    from yfai.providers import ProviderManager
+    from yfai.security import SecurityGuard, SecurityPolicy
+    from yfai.store import DatabaseManager
+    from yfai.store.db import Agent, JobRun
+
+    try:
+        config = {"app": {"default_provider": "echo"}, "providers": {"echo": {"latency": 0}}}
+        db = DatabaseManager("data/test.db")
+        bus = EventBus()
+        plans = bus.subscribe(EventType.JOB_PLAN)
+        providers = ProviderManager(config)
+        steps = [
+            {"index": 0, "type": "tool", "name": "IP", "tool": "net.get_local_ip", "params": {}},
+            {"index": 1, "type": "tool", "name": "进程", "tool": "process.list", "params": {}},
+        ]
+
+        async def stream_chat(messages=None, provider_name=None, model=None, **kwargs):
+            # 第一步生成后计划还要很久才生成完
+            yield '{"goal": "巡检", "steps": [' + json.dumps(steps[0])
+            await asyncio.sleep(5)
+            yield ", " + json.dumps(steps[1]) + "]}"
+
+        providers.stream_chat = stream_chat
+
+        async def executor(tool, params):
+            return {"error": "网络不可用"}
+
+        runner = AgentRunner(
+            db, providers, SecurityGuard(config), SecurityPolicy(config),
+            tool_executor=executor, event_bus=bus, summary_strategy="template",
+        )
+        agent_id = str(uuid.uuid4())
+        with db.get_session() as session:
+            session.add(Agent(
+                id=agent_id, name="stream-fail-test", system_prompt="test", default_provider="echo",
+                allowed_tools=json.dumps([step["tool"] for step in steps]),
+            ))
+            session.commit()
+
+        started = time.perf_counter()
+        result = await runner.run_agent(agent_id, "巡检")
+        assert time.perf_counter() - started < 2
+        assert result["status"] == "failed"
+        assert result["plan"]["steps"] == steps[:1] and result["plan"]["source"] == "partial"
+
+        # 已执行步骤对应的计划已保存并发布
+        with db.get_session() as session:
+            stored = json.loads(session.query(JobRun).filter_by(id=result["job_id"]).first().plan)
+        assert stored["steps"] == steps[:1]
+        published = [event.data["plan"]["steps"] for event in plans.drain()]
+        assert published and published[-1] == steps[:1]
+        plans.close()
+
+        print("  [OK] Streamed Plan Failure working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Streamed Plan Failure failed: {e}")
+        return False
+
+
+async def test_resume_job():
+    """测试智能体任务从失败处继续"""
+    print("[*] Testing Resume Job...")
+    import json
+    import uuid
+
+    from yfai.core.agent_runner import AgentRunner
+    from yfai.providers import ProviderManager
+    from yfai.security import SecurityGuard, SecurityPolicy
+    from yfai.store import DatabaseManager
+    from yfai.store.db import Agent
+
+    try:
+        config = {"app": {"default_provider": "echo"}, "providers": {"echo": {"latency": 0}}}
+        db = DatabaseManager("data/test.db")
+        calls = []
+        failing = {"net.get_local_ip"}
+
+        async def executor(tool, params):
+            calls.append(tool)
+            if tool in failing:
+                failing.discard(tool)
+                return {"error": "网络不可用"}
+            return {"value": f"{tool}-ok"}
+
+        runner = AgentRunner(
+            db, ProviderManager(config), SecurityGuard(config), SecurityPolicy(config),
+            tool_executor=executor,
+        )
+        agent_id = str(uuid.uuid4())
+        steps = [
+            {"type": "tool", "name": "进程", "tool": "process.list", "params": {}},
+            {"type": "tool", "name": "IP", "tool": "net.get_local_ip", "params": {}},
+            {"type": "tool", "name": "端口", "tool": "net.list_ports", "params": {"ip": "{{steps.1.value}}"}},
+        ]
+        with db.get_session() as session:
+            session.add(Agent(
+                id=agent_id, name="resume-test", system_prompt="test", default_provider="echo",
+                allowed_tools=json.dumps([step["tool"] for step in steps]),
+                stop_condition=json.dumps({"workflow_steps": steps}),
+            ))
+            session.commit()
+
+        first = await runner.run_agent(agent_id, "巡检")
+        assert first["status"] == "failed"
+        assert calls == ["process.list", "net.get_local_ip"]
+
+        # 已成功的步骤直接复用结果, 只执行失败的步骤及其后续步骤
+        calls.clear()
+        resumed = await runner.resume_job(first["job_id"])
+        assert resumed["status"] == "success"
+        assert calls == ["net.get_local_ip", "net.list_ports"]
+        assert [r.get("resumed", False) for r in resumed["results"]] == [True, False, False]
+
+        # 流式规划的任务: 计划仍在生成时步骤失败, 继续时沿用已保存的计划, 成功的步骤不再执行
+        async def stream_chat(messages=None, provider_name=None, model=None, **kwargs):
+            yield '{"goal": "巡检", "steps": [' + json.dumps(steps[0]) + ", " + json.dumps(steps[1])
+            await asyncio.sleep(5)
+            yield ", " + json.dumps(steps[2]) + "]}"
+
+        providers = ProviderManager(config)
+        providers.stream_chat = stream_chat
+        stream_runner = AgentRunner(
+            db, providers, SecurityGuard(config), SecurityPolicy(config),
+            tool_executor=executor, summary_strategy="template",
+        )
+        stream_agent_id = str(uuid.uuid4())
+        with db.get_session() as session:
+            session.add(Agent(
+                id=stream_agent_id, name="resume-stream-test", system_prompt="test",
+                default_provider="echo", allowed_tools=json.dumps([step["tool"] for step in steps]),
+            ))
+            session.commit()
+
+        calls.clear()
+        failing.add("net.get_local_ip")
+        first = await stream_runner.run_agent(stream_agent_id, "巡检")
+        assert first["status"] == "failed"
+        assert calls == ["process.list", "net.get_local_ip"]
+
+        calls.clear()
+        resumed = await stream_runner.resume_job(first["job_id"])
+        assert resumed["status"] == "success"
+        assert calls == ["net.get_local_ip"]
+        assert [r.get("resumed", False) for r in resumed["results"]] == [True, False]
+
+        print("  [OK] Resume Job working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Resume Job failed: {e}")
+        return False
+
+
+async def test_plan_cache():
+    """测试相同智能体与目标复用缓存的计划"""
+    print("[*] Testing Plan Cache...")
+    import json
+    import uuid
+
+    from yfai.core.agent_runner import AgentRunner
+    from yfai.core.plan_cache import PlanCache
+    from yfai.providers import ProviderManager
+    from yfai.security import SecurityGuard, SecurityPolicy
+    from yfai.store import DatabaseManager
+    from yfai.store.db import Agent
+
+    try:
+        config = {"app": {"default_provider": "echo"}, "providers": {"echo": {"latency": 0}}}
+        db = DatabaseManager("data/test.db")
+        cache = PlanCache(ttl=60)
+
+        async def executor(tool, params):
+            return {"value": f"{tool}-ok"}
+
+        runner = AgentRunner(
+            db, ProviderManager(config), SecurityGuard(config), SecurityPolicy(config),
+            tool_executor=executor, stream_planning=False, plan_cache=cache,
+        )
+        planned = []
+
+        async def generate_plan(agent, goal, context=None):
+            planned.append(goal)
+            return {"goal": goal, "steps": [
+                {"index": 0, "type": "tool", "name": "进程", "tool": "process.list", "params": {}},
+            ]}
+
+        runner._generate_plan = generate_plan
+        agent_id = str(uuid.uuid4())
+        with db.get_session() as session:
+            session.add(Agent(
+                id=agent_id, name="plan-cache-test", system_prompt="test", default_provider="echo",
+                allowed_tools=json.dumps(["process.list"]),
+            ))
+            session.commit()
+
+        first = await runner.run_agent(agent_id, "Daily Build")
+        assert first["status"] == "success" and len(planned) == 1
+
+        # 规范化后相同的目标直接复用计划
+        second = await runner.run_agent(agent_id, "  daily   build ")
+        assert second["status"] == "success" and second["plan"]["source"] == "cache"
+        assert len(planned) == 1
+
+        # 缓存的计划校验失败时重新规划
+        key = cache.key(runner._load_agent(agent_id, None), "daily build")
+        cache.put(key, {"goal": "daily build", "steps": [{"type": "tool", "tool": "fs.delete"}]})
+        third = await runner.run_agent(agent_id, "daily build")
+        assert third["status"] == "success" and len(planned) == 2
+        assert not third["plan"].get("source")
+
+        # 上下文可强制重新规划
+        await runner.run_agent(agent_id, "daily build", context={"plan_cache": False})
+        assert len(planned) == 3
+
+        print("  [OK] Plan Cache working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Plan Cache failed: {e}")
+        return False
+
+
+async def test_run_budget():
+    """测试智能体运行的时长、Token 与单步超时预算"""
+    print("[*] Testing Run Budget...")
+    import asyncio
+    import json
+    import time
+    import uuid
+
+    from yfai.core.agent_runner import AgentRunner
+    from yfai.providers import ProviderManager
+    from yfai.security import SecurityGuard, SecurityPolicy
+    from yfai.store import DatabaseManager
+    from yfai.store.db import Agent
+
+    try:
+        config = {"app": {"default_provider": "echo"}, "providers": {"echo": {"latency": 0}}}
+        db = DatabaseManager("data/test.db")
+
+        async def executor(tool, params):
+            if tool == "net.list_ports":
+                await asyncio.sleep(5)
+            return {"value": f"{tool}-ok"}
+
+        runner = AgentRunner(
+            db, ProviderManager(config), SecurityGuard(config), SecurityPolicy(config),
+            tool_executor=executor,
+        )
+
+        def create_agent(steps):
+            agent_id = str(uuid.uuid4())
+            with db.get_session() as session:
+                session.add(Agent(
+                    id=agent_id, name="budget-test", system_prompt="test", default_provider="echo",
+                    allowed_tools=json.dumps([step["tool"] for step in steps if step.get("tool")]),
+                    stop_condition=json.dumps({"workflow_steps": steps}),
+                ))
+                session.commit()
+            return agent_id
+
+        tools = create_agent([
+            {"type": "tool", "name": "进程", "tool": "process.list", "params": {}},
+            {"type": "tool", "name": "端口", "tool": "net.list_ports", "params": {}, "continue_on_error": True},
+            {"type": "tool", "name": "IP", "tool": "net.get_local_ip", "params": {}},
+        ])
+
+        # 单步超时只影响超时的步骤
+        result = await runner.run_agent(tools, "巡检", context={"budget": {"step_timeout_sec": 0.2}})
+        assert [r["status"] for r in result["results"]] == ["success", "failed", "success"]
+        assert "超时" in result["results"][1]["result"]["error"] and result["stop_reason"] is None
+
+        # 时长预算耗尽时终止执行中的步骤并生成总结
+        started = time.monotonic()
+        result = await runner.run_agent(tools, "巡检", context={"budget": {"max_duration_sec": 0.3}})
+        assert time.monotonic() - started < 2
+        assert result["status"] == "failed" and "时长" in result["stop_reason"]
+        assert [r["status"] for r in result["results"]] == ["success", "cancelled"]
+        assert "提前结束" in result["summary"]
+
+        # Token 预算按模型返回的 usage 计量
+        model = create_agent([
+            {"type": "model", "name": f"分析{i}", "prompt": "hello"} for i in range(3)
+        ])
+        result = await runner.run_agent(model, "分析", context={"budget": {"max_tokens": 1}})
+        assert len(result["results"]) == 1 and "Token" in result["stop_reason"]
+        assert result["budget"]["total_tokens"] > 0
+
+        print("  [OK] Run Budget working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Run Budget failed: {e}")
+        return False
+
+
+async def test_run_agent_stream():
+    """测试智能体运行事件流"""
+    print("[*] Testing Run Agent Stream...")
+    import asyncio
+    import json
+    import uuid
+
+    from yfai.core.agent_runner import AgentRunner
+    from yfai.providers import ProviderManager
+    from yfai.security import SecurityGuard, SecurityPolicy
+    from yfai.store import DatabaseManager
+    from yfai.store.db import Agent, JobRun
+
+    try:
+        config = {"app": {"default_provider": "echo"}, "providers": {"echo": {"latency": 0, "chunk_size": 4}}}
+        db = DatabaseManager("data/test.db")
+
+        async def executor(tool, params):
+            if tool == "net.list_ports":
+                await asyncio.sleep(5)
+            return {"value": f"{tool}-ok"}
+
+        runner = AgentRunner(
+            db, ProviderManager(config), SecurityGuard(config), SecurityPolicy(config),
+            tool_executor=executor,
+        )
+        steps = [
+            {"type": "tool", "name": "进程", "tool": "process.list", "params": {}},
+            {"type": "model", "name": "分析", "prompt": "分析进程列表"},
+        ]
+        agent_id = str(uuid.uuid4())
+        with db.get_session() as session:
+            session.add(Agent(
+                id=agent_id, name="stream-test", system_prompt="test", default_provider="echo",
+                allowed_tools=json.dumps(["process.list", "net.list_ports"]),
+                stop_condition=json.dumps({"workflow_steps": steps}),
+            ))
+            session.commit()
+
+        events = [event async for event in runner.run_agent_stream(agent_id, "巡检")]
+        types = [event.type for event in events]
+        assert types[0] == "job.status" and events[0].data["status"] == "pending"
+        assert types[-1] == "job.result" and events[-1].data["status"] == "success"
+        assert types.index("job.plan") < types.index("job.step") < types.index("job.output")
+        output = "".join(e.data["text"] for e in events if e.type == "job.output")
+        assert output == events[-1].data["results"][1]["result"]["content"]
+        assert types.count("job.output") > 1 and "job.summary" in types
+
+        # 消费方提前关闭事件流时任务随之取消
+        with db.get_session() as session:
+            agent = session.query(Agent).filter_by(id=agent_id).first()
+            agent.stop_condition = json.dumps({"workflow_steps": [
+                {"type": "tool", "name": "端口", "tool": "net.list_ports", "params": {}},
+            ]})
+            session.commit()
+        stream = runner.run_agent_stream(agent_id, "巡检")
+        async for event in stream:
+            if event.type == "job.step":
+                job_id = event.job_id
+                break
+        await stream.aclose()
+        with db.get_session() as session:
+            assert session.query(JobRun).filter_by(id=job_id).first().status == "cancelled"
+
+        print("  [OK] Run Agent Stream working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Run Agent Stream failed: {e}")
+        return False
+
+
+async def test_summary_strategy():
+    """测试智能体运行总结策略"""
+    print("[*] Testing Summary Strategy...")
+    import json
+    import uuid
+
+    from yfai.core.agent_runner import AgentRunner
+    from yfai.providers import ProviderManager
+    from yfai.security import SecurityGuard, SecurityPolicy
+    from yfai.store import DatabaseManager
+    from yfai.store.db import Agent, JobRun
+
+    try:
+        config = {"app": {"default_provider": "echo"}, "providers": {"echo": {"latency": 0}}}
+        db = DatabaseManager("data/test.db")
+
+        async def executor(tool, params):
+            return {"message": f"{tool} ok"}
+
+        manager = ProviderManager(config)
+        calls = []
+        chat = manager.chat
+
+        async def counting_chat(messages, provider_name=None, **kwargs):
+            calls.append(provider_name)
+            return await chat(messages, provider_name, **kwargs)
+
+        manager.chat = counting_chat
+        runner = AgentRunner(
+            db, manager, SecurityGuard(config), SecurityPolicy(config),
+            tool_executor=executor, summary_by_priority={"scheduled": "on_failure"},
+        )
+
+        def add_agent(steps):
+            agent_id = str(uuid.uuid4())
+            with db.get_session() as session:
+                session.add(Agent(
+                    id=agent_id, name="summary-test", system_prompt="test", default_provider="echo",
+                    allowed_tools=json.dumps(["process.list"]),
+                    stop_condition=json.dumps({"workflow_steps": steps}),
+                ))
+                session.commit()
+            return agent_id
+
+        ok_agent = add_agent([{"type": "tool", "name": "进程", "tool": "process.list", "params": {}}])
+        bad_agent = add_agent([{"type": "tool", "name": "删除", "tool": "fs.delete", "params": {}}])
+
+        # 默认每次调用模型总结
+        result = await runner.run_agent(ok_agent, "巡检")
+        assert len(calls) == 1 and result["summary"].startswith("echo:")
+
+        # 模板总结不调用模型, 由步骤结果生成
+        result = await runner.run_agent(ok_agent, "巡检", context={"summary": "template"})
+        assert len(calls) == 1
+        assert "目标: 巡检" in result["summary"] and "1. [成功] 进程 - process.list ok" in result["summary"]
+
+        # 定时任务全部成功时用模板, 失败时才调用模型
+        result = await runner.run_agent(ok_agent, "巡检", priority="scheduled")
+        assert len(calls) == 1 and result["summary"].startswith("目标:")
+        result = await runner.run_agent(bad_agent, "巡检", priority="scheduled")
+        assert result["status"] == "failed" and len(calls) == 2
+
+        # 流式总结与最终状态落盘并发, 完成后写入总结
+        result = await runner.run_agent(ok_agent, "巡检", context={"summary": "stream"})
+        assert len(calls) == 3 and result["status"] == "success"
+        with db.get_session() as session:
+            job = session.query(JobRun).filter_by(id=result["job_id"]).first()
+            assert job.status == "success" and job.summary == result["summary"]
+
+        print("  [OK] Summary Strategy working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Summary Strategy failed: {e}")
+        return False
+
+
+async def test_cassette():
+    """测试智能体运行的录制与回放"""
+    print("[*] Testing Cassette...")
+    import json
+    import os
+    import tempfile
+    import time
+    import uuid
+
+    from yfai.core.agent_runner import AgentRunner
+    from yfai.core.cassette import Cassette, CassetteMiss, install_recorder, install_replayer
+    from yfai.providers import ProviderManager
+    from yfai.security import SecurityGuard, SecurityPolicy
+    from yfai.store import DatabaseManager
+    from yfai.store.db import Agent
+
+    try:
+        config = {"app": {"default_provider": "echo"}, "providers": {"echo": {"latency": 0.05, "chunk_size": 4}}}
+        db = DatabaseManager("data/test.db")
+        calls = []
+
+        async def executor(tool, params):
+            calls.append(tool)
+            return {"value": f"{tool}-ok"}
+
+        def build_runner():
+            return AgentRunner(
+                db, ProviderManager(config), SecurityGuard(config), SecurityPolicy(config),
+                tool_executor=executor,
+            )
+
+        steps = [
+            {"type": "tool", "name": "进程", "tool": "process.list", "params": {}},
+            {"type": "model", "name": "分析", "prompt": "分析进程列表"},
+        ]
+        agent_id = str(uuid.uuid4())
+        with db.get_session() as session:
+            session.add(Agent(
+                id=agent_id, name="cassette-test", system_prompt="test", default_provider="echo",
+                allowed_tools=json.dumps(["process.list"]),
+                stop_condition=json.dumps({"workflow_steps": steps}),
+            ))
+            session.commit()
+
+        # 录制: 真实(回显)Provider 与工具执行器
+        recording = Cassette({"agent_id": agent_id, "goal": "巡检"})
+        runner = build_runner()
+        install_recorder(runner, recording)
+        recorded = await runner.run_agent(agent_id, "巡检")
+        path = os.path.join(tempfile.mkdtemp(), "run.json")
+        recording.save(path)
+        assert recorded["status"] == "success" and calls == ["process.list"]
+
+        # 回放: 不调用工具, 结果一致, 不等待时明显快于录制时的模型延迟
+        cassette = Cassette.load(path)
+        runner = build_runner()
+        install_replayer(runner, cassette, speed=0)
+        started = time.perf_counter()
+        replayed = await runner.run_agent(agent_id, "巡检")
+        assert time.perf_counter() - started < 0.1
+        assert calls == ["process.list"]
+        assert [r["result"] for r in replayed["results"]] == [r["result"] for r in recorded["results"]]
+        assert replayed["summary"] == recorded["summary"]
+        stats = cassette.get_stats()
+        assert stats["misses"] == 0 and stats["unused"] == 0
+
+        # 录像中没有的请求报告未命中
+        try:
+            await runner.tool_executor("fs.read", {"path": "/tmp"})
+            raise AssertionError("miss not raised")
+        except CassetteMiss:
+            assert cassette.get_stats()["misses"] == 1
+
+        print("  [OK] Cassette working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Cassette failed: {e}")
+        return False
+
+
+async def test_job_queue():
+    """测试智能体任务队列的优先级与并发上限"""
+    print("[*] Testing Job Queue...")
+    import asyncio
+
+    from yfai.core.job_queue import AgentJobQueue, JobQueueFull
+
+    try:
+        queue = AgentJobQueue(workers=2, max_queued=4, per_agent_limit=1, provider_limits={"ollama": 1})
+        order = []
+        release = asyncio.Event()
+
+        async def job(name, priority, agent_id, provider=None):
+            async with queue.slot(priority, agent_id=agent_id, provider=provider):
+                order.append(name)
+                await release.wait()
+
+        # 占满两个名额, 其余任务排队
+        running = [
+            asyncio.create_task(job("a1", "batch", "a")),
+            asyncio.create_task(job("b1", "batch", "b", "ollama")),
+        ]
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(job("batch", "batch", "c")),
+            asyncio.create_task(job("a2", "interactive", "a")),
+            asyncio.create_task(job("ollama", "interactive", "d", "ollama")),
+            asyncio.create_task(job("scheduled", "scheduled", "e")),
+        ]
+        await asyncio.sleep(0)
+        stats = queue.get_stats()
+        assert stats["running"] == 2 and stats["queued"] == 4
+        assert stats["queued_by_priority"] == {"interactive": 2, "scheduled": 1, "batch": 1}
+
+        # 排队已满时拒绝
+        try:
+            await job("overflow", "batch", "f")
+            raise AssertionError("排队已满时应拒绝")
+        except JobQueueFull:
+            pass
+
+        # 排队中的任务被取消时直接出队
+        waiting[0].cancel()
+        await asyncio.sleep(0)
+        assert queue.get_stats()["queued"] == 3
+
+        # 名额释放后按优先级分配, 受限的任务不挡住后面的任务
+        release.set()
+        await asyncio.gather(*running, *waiting[1:])
+        assert order[:2] == ["a1", "b1"]
+        assert order[2:] == ["a2", "ollama", "scheduled"]
+        stats = queue.get_stats()
+        assert stats["running"] == 0 and stats["completed"] == 5 and stats["cancelled"] == 1
+
+        # 保留给交互任务的名额: 后台任务占满其余名额后, 交互任务仍立即开始
+        queue = AgentJobQueue(workers=3, per_agent_limit=None, reserved_interactive=1)
+        order.clear()
+        release = asyncio.Event()
+        background = [asyncio.create_task(job(f"batch{i}", "batch", "a")) for i in range(4)]
+        await asyncio.sleep(0)
+        stats = queue.get_stats()
+        assert stats["running"] == 2 and stats["queued"] == 2
+        interactive = asyncio.create_task(job("interactive", "interactive", "b"))
+        await asyncio.sleep(0)
+        assert order[-1] == "interactive"
+        assert queue.get_stats()["running"] == 3 and queue.get_stats()["queued"] == 2
+        release.set()
+        await asyncio.gather(*background, interactive)
+        assert queue.get_stats()["completed"] == 5
+
+        print("  [OK] Job Queue working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Job Queue failed: {e}")
+        return False
+
+
+async def test_tool_registry():
+    """测试工具注册表的分发、别名与参数校验"""
+    print("[*] Testing Tool Registry...")
+    from yfai.core.tools import ParamValidator, ToolRegistry, ToolSpec
+
+    try:
+        registry = ToolRegistry()
+        calls = []
+
+        def read(path: str, encoding: str = "utf-8"):
+            calls.append(("read", path, encoding))
+            return {"success": True, "content": path}
+
+        async def ping(host: str):
+            calls.append(("ping", host))
+            return {"success": True, "host": host}
+
+        registry.register_many([
+            ToolSpec("fs.read", read, risk_level="low", aliases=["fs.read_file"]),
+            ToolSpec("net.ping", ping),
+        ])
+
+        # 同步与异步处理函数都按名称分发
+        assert (await registry.invoke("fs.read", {"path": "a.txt"}))["content"] == "a.txt"
+        assert (await registry.invoke("net.ping", {"host": "x"}))["host"] == "x"
+        assert calls == [("read", "a.txt", "utf-8"), ("ping", "x")]
+
+        # 别名与函数调用名(点号替换为双下划线)解析到同一工具
+        assert registry.get("fs.read_file") is registry.get("fs.read")
+        assert registry.get("fs__read") is registry.get("fs.read")
+        assert sorted(registry.names()) == ["fs.read", "net.ping"]
+        await registry.invoke("fs.read_file", {"path": "b.txt"})
+        assert calls[-1] == ("read", "b.txt", "utf-8")
+        registry.unregister("fs.read")
+        assert registry.get("fs.read_file") is None
+
+        # 参数校验在调用前拒绝缺失与未知参数
+        validator = ParamValidator.from_callable(read)
+        assert validator.validate({"path": "a"}) is None
+        assert "缺少参数: path" in validator.validate({})
+        assert "未知参数: mode" in validator.validate({"path": "a", "mode": "w"})
+        result = await registry.invoke("net.ping", {"hostname": "x"})
+        assert result["success"] is False and "参数错误" in result["error"]
+        assert (await registry.invoke("fs.missing", {}))["error"] == "未知工具: fs.missing"
+        assert len(calls) == 3
+
+        print("  [OK] Tool Registry working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Tool Registry failed: {e}")
+        return False
+
+
+async def test_tool_executor():
+    """测试同步工具的线程池执行与单工具并发上限"""
+    print("[*] Testing Tool Executor...")
+    import asyncio
+    import threading
+    import time
+
+    from yfai.core.tools import ToolRegistry, ToolSpec
+    from yfai.localops import LocalOpsExecutor
+
+    try:
+        executor = LocalOpsExecutor(max_workers=4, per_tool_limits={"slow.limited": 1})
+        registry = ToolRegistry(executor)
+        lock = threading.Lock()
+        running = {"slow.limited": 0, "slow.free": 0}
+        peak = dict(running)
+
+        def make(name):
+            def handler(seconds: float):
+                with lock:
+                    running[name] += 1
+                    peak[name] = max(peak[name], running[name])
+                time.sleep(seconds)
+                with lock:
+                    running[name] -= 1
+                return {"success": True}
+            return handler
+
+        registry.register_many([
+            ToolSpec("slow.limited", make("slow.limited")),
+            ToolSpec("slow.free", make("slow.free"), max_concurrency=3),
+        ])
+
+        # 阻塞调用在线程池中执行, 事件循环仍能按时调度
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await asyncio.gather(*(registry.invoke("slow.free", {"seconds": 0.2}) for _ in range(3)))
+        elapsed = time.perf_counter() - started
+        tick_task.cancel()
+        assert ticks >= 10, ticks
+        assert elapsed < 0.4 and peak["slow.free"] == 3
+
+        # per_tool_limits 限制同一工具的并发数
+        await asyncio.gather(*(registry.invoke("slow.limited", {"seconds": 0.05}) for _ in range(3)))
+        assert peak["slow.limited"] == 1
+        assert executor.get_stats()["available_slots"] == {"slow.limited": 1, "slow.free": 3}
+
+        print("  [OK] Tool Executor working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Tool Executor failed: {e}")
+        return False
+
+
+async def test_tool_call_response():
+    """测试函数调用响应(content 为 null)的解析"""
+    print("[*] Testing Tool Call Response...")
+    import httpx
+
+    from yfai.providers.bailian import BailianProvider
+    from yfai.providers.base import ChatMessage
+
+    try:
+        fixture = {
+            "model": "qwen-plus",
+            "choices": [{
+                "finish_reason": "tool_calls",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": "call_1",
+                        "type": "function",
+                        "function": {"name": "fs__read", "arguments": "{\"path\": \"a.txt\"}"},
+                    }],
+                },
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+        provider = BailianProvider(api_key="test")
+        provider._client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json=fixture)
+        ))
+        provider._client_loop = asyncio.get_running_loop()
+        response = await provider.chat([ChatMessage(role="user", content="读取 a.txt")])
+        await provider.aclose()
+        assert response.content == "" and response.finish_reason == "tool_calls"
+        assert response.tool_calls[0]["function"]["name"] == "fs__read"
+
+        print("  [OK] Tool Call Response working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Tool Call Response failed: {e}")
+        return False
+
+
+async def test_tool_call_grouping():
+    """测试同一批工具调用的冲突分组: 同一资源的写入串行, 读取并发"""
+    print("[*] Testing Tool Call Grouping...")
+    import json
+
+    from yfai.core import ConfigManager, Orchestrator
+    from yfai.core.tools import ToolSpec
+    from yfai.security.guard import ApprovalResult, ApprovalStatus
+
+    try:
+        orch = Orchestrator(ConfigManager().get_all())
+        orch.security_guard.set_approval_callback(
+            lambda request: ApprovalResult(request_id=request.id, status=ApprovalStatus.APPROVED)
+        )
+        running = {"write": 0, "read": 0}
+        peak = dict(running)
+
+        def make(kind):
+            async def handler(path: str):
+                running[kind] += 1
+                peak[kind] = max(peak[kind], running[kind])
+                await asyncio.sleep(0.05)
+                running[kind] -= 1
+                return {"success": True, "path": path}
+            return handler
+
+        orch.tool_registry.register_many([
+            ToolSpec("fs.write", make("write"), risk_level="medium"),
+            ToolSpec("fs.read", make("read"), risk_level="low", idempotent=True),
+        ])
+
+        def call(name, path):
+            return {"function": {"name": name, "arguments": json.dumps({"path": path})}}
+
+        calls = [
+            call("fs.write", "./a.txt"), call("fs.write", "a.txt"),
+            call("fs.read", "b.txt"), call("fs.read", "./b.txt"), call("fs.read", "b.txt"),
+        ]
+        parsed = [orch._parse_tool_call(c) for c in calls]
+        assert sorted(orch._group_tool_calls(parsed)) == [[0, 1], [2], [3], [4]]
+
+        # 无法确定资源的非只读调用(shell.exec)彼此串行, 只读调用仍然并发
+        unkeyed = [
+            ("shell.exec", {"command": "echo a > out.txt"}, None),
+            ("shell.exec", {"command": "echo b > out.txt"}, None),
+            ("net.local_ip", {}, None),
+        ]
+        assert sorted(orch._group_tool_calls(unkeyed)) == [[0, 1], [2]]
+
+        results = await orch._run_tool_calls(calls)
+        assert all(result["success"] for result in results)
+        assert peak == {"write": 1, "read": 3}
+
+        print("  [OK] Tool Call Grouping working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Tool Call Grouping failed: {e}")
+        return False
+
+
+async def test_tool_cache():
+    """测试幂等工具结果缓存与写入失效"""
+    print("[*] Testing Tool Cache...")
+    from yfai.core.context import request_context
+    from yfai.core.tool_cache import ToolResultCache, path_resource
+    from yfai.core.tools import ToolRegistry, ToolSpec
+
+    try:
+        files = {"/data/a.txt": "v1"}
+        reads = []
+
+        def read(path):
+            reads.append(path)
+            return {"success": True, "content": files.get(path)}
+
+        def write(path, content):
+            files[path] = content
+            return {"success": True}
+
+        resources = lambda params: [path_resource(params["path"])]
+        registry = ToolRegistry(cache=ToolResultCache())
+        registry.register(ToolSpec("fs.read", read, idempotent=True, resources=resources))
+        registry.register(ToolSpec("fs.write", write, resources=resources))
+
+        with request_context(job_id="job-1"):
+            first = await registry.invoke("fs.read", {"path": "/data/a.txt"})
+            second = await registry.invoke("fs.read", {"path": "/data/a.txt"})
+            assert "cached" not in first and second["cached"] == "job"
+            assert len(reads) == 1
+
+            # 写入其他路径不影响缓存, 写入同一路径后重新读取
+            await registry.invoke("fs.write", {"path": "/data/b.txt", "content": "x"})
+            assert (await registry.invoke("fs.read", {"path": "/data/a.txt"}))["cached"] == "job"
+            await registry.invoke("fs.write", {"path": "/data/a.txt", "content": "v2"})
+            third = await registry.invoke("fs.read", {"path": "/data/a.txt"})
+            assert third["content"] == "v2" and "cached" not in third
+
+        # 其他任务不共享任务内缓存
+        with request_context(job_id="job-2"):
+            await registry.invoke("fs.read", {"path": "/data/a.txt"})
+        assert len(reads) == 3
+
+        print(f"  [OK] Tool Cache working - {registry.cache.get_stats()}")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Tool Cache failed: {e}")
+        return False
+
+
+async def test_message_serialization():
+    """请求体序列化微基准(1k 条历史消息)"""
+    print("[*] Testing Message Serialization...")
+    import json
+    import time
+
+    from yfai.providers import ChatMessage, CompactMessage
+    from yfai.providers.messages import encode_chat_body
+
+    try:
+        size, rounds = 1000, 20
+        rows = [
+            ("user" if i % 2 == 0 else "assistant", f"第 {i} 条消息 message body " * 8)
+            for i in range(size)
+        ]
+        payload = {"model": "qwen-plus", "temperature": 0.7, "stream": True}
+
+        # 旧路径: 每轮重建 pydantic 消息, model_dump 后整体编码
+        started = time.perf_counter()
+        for _ in range(rounds):
+            messages = [ChatMessage(role=role, content=content) for role, content in rows]
+            data = {**payload, "messages": [m.model_dump(exclude_none=True) for m in messages]}
+            baseline = json.dumps(data).encode("utf-8")
+        baseline_ms = (time.perf_counter() - started) * 1000 / rounds
+
+        # 新路径: 缓存的轻量消息, 请求体由 JSON 片段拼接
+        compact = [CompactMessage(role=role, content=content) for role, content in rows]
+        body = encode_chat_body(payload, compact)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            body = encode_chat_body(payload, compact)
+        compact_ms = (time.perf_counter() - started) * 1000 / rounds
+
+        assert json.loads(body) == json.loads(baseline)
+        print(f"  {size} 条消息: 原始 {baseline_ms:.2f}ms, 片段拼接 {compact_ms:.2f}ms")
+        assert compact_ms < baseline_ms
+
+        print("  [OK] Message Serialization working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Message Serialization failed: {e}")
+        return False
+
+
 async def test_orchestrator():
     """测试核心调度器"""
     print("[*] Testing Orchestrator...")
@@ -126,6 +1490,15 @@ async def test_orchestrator():
         session_id = await orch.create_session("Test Session")
         assert session_id is not None
 
+        # 本地工具的风险等级: 删除/终止为 high, 读取/列出为 low, 其余为 medium
+        risk = {name: orch._get_risk_level(name, {}) for name in orch.tool_registry.names()}
+        assert risk["fs.delete"] == risk["process.kill"] == "high"
+        assert risk["fs.read"] == risk["fs.list"] == risk["process.list"] == "low"
+        assert all(risk[name] == "medium" for name in (
+            "fs.search", "process.get", "process.system_info",
+            "net.check_port", "net.local_ip", "net.search",
+        ))
+
         # 健康检查
         health = await orch.health_check()
         print(f"  [OK] Orchestrator working - Session ID: {session_id[:8]}...")
@@ -135,6 +1508,347 @@ async def test_orchestrator():
         return False
 
 
+# 启动导入预算(毫秒), 可通过环境变量 YFAI_IMPORT_BUDGET_MS 调整
+IMPORT_BUDGET_MS = 1500
+
+# 无界面启动路径上不应加载的重模块
+DEFERRED_MODULES = (
+    "faiss",
+    "numpy",
+    "sentence_transformers",
+    "PyQt6",
+    "yfai.app",
+    "yfai.mcp",
+    "yfai.search",
+    "yfai.store.indexer",
+)
+
+
+async def test_warmup():
+    """测试后台预热: 不阻塞启动, 填充模型缓存与健康状态, 单个失败不外抛"""
+    print("[*] Testing Warmup...")
+    import copy
+    import time
+
+    from yfai.core import ConfigManager, Orchestrator
+    from yfai.providers import EchoProvider
+
+    try:
+        config = copy.deepcopy(ConfigManager().get_all())
+        config["app"]["warmup"] = {"enabled": True, "timeout_sec": 1, "probe_mcp": False, "probe_search": False}
+        orch = Orchestrator(config)
+        manager = orch.provider_manager
+
+        def provider(warmup):
+            instance = EchoProvider(default_model="echo", latency=0)
+            instance.warmup = warmup
+            return instance
+
+        async def slow(preload_model=False):
+            await asyncio.sleep(0.1)
+            return {"healthy": True, "models": ["slow-model"]}
+
+        async def broken(preload_model=False):
+            raise ConnectionError("连接被拒绝")
+
+        async def hanging(preload_model=False):
+            await asyncio.sleep(30)
+
+        manager.providers = {
+            "slow": provider(slow), "broken": provider(broken), "hanging": provider(hanging),
+        }
+        manager.health_status = {}
+        manager.model_cache = {}
+
+        # 预热在后台进行, 启动立即返回
+        started = time.perf_counter()
+        task = orch.start_warmup()
+        assert time.perf_counter() - started < 0.05 and not task.done()
+        assert orch.start_warmup() is task and manager.model_cache == {}
+
+        summary = await task
+        assert manager.model_cache == {"slow": ["slow-model"]}
+        assert manager.health_status == {"slow": True, "broken": False, "hanging": False}
+        assert summary["providers"]["broken"]["error"] == "连接被拒绝"
+        assert summary["providers"]["hanging"]["error"] == "TimeoutError"
+        assert summary["elapsed_sec"] < 5
+
+        # 关闭预热时不启动任务
+        orch.config["app"]["warmup"]["enabled"] = False
+        assert orch.start_warmup() is None
+
+        print("  [OK] Warmup working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Warmup failed: {e}")
+        return False
+
+
+async def test_api_server():
+    """测试无界面服务的鉴权、并发饱和与优雅关闭"""
+    print("[*] Testing API Server...")
+    import copy
+
+    import httpx
+
+    from yfai.core import ConfigManager
+    from yfai.server import ApiServer, build_orchestrator, use_echo_provider
+
+    try:
+        config = copy.deepcopy(ConfigManager().get_all())
+        use_echo_provider(config)
+        config["providers"]["echo"] = {"latency": 0.2}
+        config["server"] = {
+            "host": "127.0.0.1", "port": 0, "api_token": "secret",
+            "max_concurrent_requests": 1, "queue_timeout_sec": 0.05, "shutdown_grace_sec": 5,
+        }
+        server = ApiServer(build_orchestrator(config), config)
+        await server.start()
+        url = f"http://127.0.0.1:{server.port}"
+        auth = {"Authorization": "Bearer secret"}
+        body = {"message": "ping"}
+
+        async with httpx.AsyncClient(base_url=url, timeout=10) as client:
+            # 鉴权: 缺少或错误的令牌返回 401, /health 不需要令牌
+            assert (await client.get("/health")).status_code == 200
+            assert (await client.get("/v1/stats")).status_code == 401
+            wrong = {"Authorization": "Bearer secreT"}
+            assert (await client.get("/v1/stats", headers=wrong)).status_code == 401
+            assert (await client.get("/v1/stats", headers=auth)).status_code == 200
+
+            # 并发名额已满且排队超时时返回 503
+            first, second = await asyncio.gather(
+                client.post("/v1/chat", json=body, headers=auth),
+                client.post("/v1/chat", json=body, headers=auth),
+            )
+            statuses = sorted([first.status_code, second.status_code])
+            assert statuses == [200, 503], statuses
+
+            # 优雅关闭: 进行中的请求完成后才停止, 之后不再接受连接
+            in_flight = asyncio.create_task(client.post("/v1/chat", json=body, headers=auth))
+            await asyncio.sleep(0.05)
+            await server.stop()
+            response = await in_flight
+            assert response.status_code == 200 and response.json()["content"] == "echo: ping"
+        try:
+            async with httpx.AsyncClient(base_url=url, timeout=2) as client:
+                await client.get("/health")
+            raise AssertionError("server still accepting connections")
+        except httpx.ConnectError:
+            pass
+
+        print("  [OK] API Server working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] API Server failed: {e}")
+        return False
+
+
+async def test_compare_chat():
+    """测试对比模式: 多路并发、胜出规则、历史只保留胜出回复、非法参数返回 400"""
+    print("[*] Testing Compare Chat...")
+    import copy
+    import time
+
+    import httpx
+
+    from yfai.core import ConfigManager, Orchestrator
+    from yfai.providers import EchoProvider
+    from yfai.server import ApiServer, build_orchestrator, use_echo_provider
+    from yfai.store import Message
+
+    try:
+        orch = Orchestrator(copy.deepcopy(ConfigManager().get_all()))
+        manager = orch.provider_manager
+        for name, latency in (("slow-a", 0.3), ("fast", 0.05), ("slow-b", 0.3)):
+            manager.providers[name] = EchoProvider(default_model=name, latency=latency, chunk_delay=0)
+            manager.health_status[name] = True
+        targets = [("slow-a", None), ("fast", None), ("slow-b", None)]
+
+        async def run(keep_alternates):
+            session_id = await orch.create_session("Compare")
+            started = time.perf_counter()
+            events = [event async for event in orch.compare_chat(
+                "对比", targets, session_id=session_id, keep_alternates=keep_alternates,
+            )]
+            return session_id, events, time.perf_counter() - started
+
+        def assistant_messages(session_id):
+            with orch.db_manager.get_session() as db_session:
+                return db_session.query(Message).filter_by(session_id=session_id, role="assistant").count()
+
+        # 各路并发: 总耗时取决于最慢的一路而非之和
+        session_id, events, elapsed = await run(keep_alternates=False)
+        assert elapsed < 0.5, elapsed
+        result = events[-1]
+        assert result["type"] == "result" and result["winner"] == 1
+        assert [item["content"] for item in result["results"]] == ["echo: 对比"] * 3
+        assert sum(1 for event in events if event["type"] == "done") == 3
+
+        # 只有胜出的回复进入会话
+        assert assistant_messages(session_id) == 1
+        history = await orch._get_session_messages(session_id)
+        assert [message.role for message in history] == ["user", "assistant"]
+
+        # 保留备选回复时全部保存, 但后续对话历史只包含胜出的回复
+        session_id, events, _ = await run(keep_alternates=True)
+        assert assistant_messages(session_id) == 3
+        assert len(await orch._get_session_messages(session_id)) == 2
+
+        # 服务端: compare 格式错误返回 400, 正确时以 SSE 推送 result
+        config = copy.deepcopy(ConfigManager().get_all())
+        use_echo_provider(config)
+        config["providers"]["echo"] = {"latency": 0}
+        config["server"] = {"host": "127.0.0.1", "port": 0}
+        server = ApiServer(build_orchestrator(config), config)
+        await server.start()
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}", timeout=10) as client:
+                for compare in ([{"model": "qwen"}], "echo", [{"provider": "echo"}, "ollama"]):
+                    response = await client.post("/v1/chat", json={"message": "hi", "compare": compare})
+                    assert response.status_code == 400, (compare, response.status_code)
+                response = await client.post(
+                    "/v1/chat", json={"message": "hi", "compare": [{"provider": "echo"}, {"provider": "echo"}]}
+                )
+                assert response.status_code == 200 and "event: result" in response.text
+        finally:
+            await server.stop()
+
+        print("  [OK] Compare Chat working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Compare Chat failed: {e}")
+        return False
+
+
+async def test_percentile():
+    """测试延迟分位数(最近秩法)"""
+    print("[*] Testing Percentile...")
+    from yfai.server.loadtest import percentile
+
+    try:
+        hundred = list(range(1, 101))
+        assert percentile(hundred, 50) == 50
+        assert percentile(hundred, 95) == 95
+        assert percentile(hundred, 99) == 99
+        assert percentile(hundred, 100) == 100
+        # 样本顺序无关; 20 个样本的 p95 为第 19 个而非最大值
+        twenty = list(range(20, 0, -1))
+        assert percentile(twenty, 95) == 19 and percentile(twenty, 50) == 10
+        assert percentile([7.0], 95) == 7.0 and percentile([], 50) is None
+
+        print("  [OK] Percentile working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Percentile failed: {e}")
+        return False
+
+
+async def test_batch():
+    """测试批量运行的断点续跑与 Provider 限速"""
+    print("[*] Testing Batch Runner...")
+    import copy
+    import json
+    import tempfile
+    import time
+
+    from yfai.automation.batch import RateLimiter, load_completed, run_batch
+    from yfai.core import ConfigManager
+    from yfai.server import build_orchestrator, use_echo_provider
+
+    try:
+        config = copy.deepcopy(ConfigManager().get_all())
+        use_echo_provider(config)
+        config["providers"]["echo"] = {"latency": 0}
+        orch = build_orchestrator(config)
+        workdir = Path(tempfile.mkdtemp())
+        input_path = workdir / "in.jsonl"
+        output_path = workdir / "out.jsonl"
+        input_path.write_text("".join(
+            json.dumps({"id": record_id, "input": f"hi {record_id}"}) + "\n"
+            for record_id in ("a", "b", "c", "d")
+        ), encoding="utf-8")
+
+        # 上次运行完成了 a, 中断时 b 只写了半行
+        output_path.write_text(
+            json.dumps({"id": "a", "status": "success"}) + "\n" + '{"id": "b", "sta',
+            encoding="utf-8",
+        )
+        summary = await run_batch(orch, input_path, output_path, resume=True)
+        assert summary["skipped"] == 1 and summary["success"] == 3
+        lines = output_path.read_text(encoding="utf-8").splitlines()
+        assert lines[1] == '{"id": "b", "sta'
+        assert [json.loads(line)["id"] for line in lines[2:]].count("b") == 1
+        assert load_completed(output_path) == {"a", "b", "c", "d"}
+
+        # 再次续跑时全部跳过
+        summary = await run_batch(orch, input_path, output_path, resume=True)
+        assert summary["skipped"] == 4 and summary["processed"] == 0
+
+        # 限速: 令牌桶容量用完后按速率放行
+        limiter = RateLimiter(rate=20, burst=1)
+        started = time.perf_counter()
+        for _ in range(5):
+            await limiter.acquire()
+        assert time.perf_counter() - started >= 0.18
+
+        started = time.perf_counter()
+        summary = await run_batch(
+            orch, input_path, workdir / "limited.jsonl", concurrency=4, rate_limits={"echo": 2.5}
+        )
+        assert summary["success"] == 4 and time.perf_counter() - started >= 0.75
+        await orch.shutdown()
+
+        print("  [OK] Batch Runner working")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Batch Runner failed: {e}")
+        return False
+
+
+async def test_import_time():
+    """测试启动导入开销(python -X importtime)"""
+    print("[*] Testing Import Time...")
+    import os
+    import subprocess
+
+    budget_ms = int(os.environ.get("YFAI_IMPORT_BUDGET_MS", IMPORT_BUDGET_MS))
+    target = "yfai.core.orchestrator"
+
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+        # 每行格式: import time: self [us] | cumulative | imported package
+        cumulative = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, total, name = line[len("import time:"):].split("|")
+            cumulative[name.strip()] = int(total)
+
+        loaded = sorted(
+            name for name in cumulative
+            if any(name == mod or name.startswith(mod + ".") for mod in DEFERRED_MODULES)
+        )
+        assert not loaded, f"启动时加载了应延迟的模块: {', '.join(loaded)}"
+
+        total_ms = cumulative[target] / 1000
+        assert total_ms <= budget_ms, f"导入 {target} 耗时 {total_ms:.0f}ms, 超出预算 {budget_ms}ms"
+        print(f"  [OK] Import time within budget - {total_ms:.0f}ms / {budget_ms}ms")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Import time check failed: {e}")
+        return False
+
+
 async def main():
     """主测试函数"""
     print("=" * 60)
@@ -148,7 +1862,35 @@ async def main():
         ("Provider", test_providers()),
         ("本地操作", test_localops()),
         ("安全模块", test_security()),
+        ("事件总线", test_event_bus()),
+        ("请求合并", test_single_flight()),
+        ("取消与截止时间", test_cancellation()),
+        ("结构化日志", test_logging()),
+        ("流式落盘", test_stream_checkpoint()),
+        ("步骤依赖", test_step_dependencies()),
+        ("并行审批", test_parallel_approval()),
+        ("流式计划", test_plan_stream()),
+        ("流式计划中断", test_streamed_plan_failure()),
+        ("任务续跑", test_resume_job()),
+        ("计划缓存", test_plan_cache()),
+        ("运行预算", test_run_budget()),
+        ("运行事件流", test_run_agent_stream()),
+        ("录制回放", test_cassette()),
+        ("总结策略", test_summary_strategy()),
+        ("任务队列", test_job_queue()),
+        ("工具注册表", test_tool_registry()),
+        ("工具线程池", test_tool_executor()),
+        ("函数调用响应", test_tool_call_response()),
+        ("工具调用分组", test_tool_call_grouping()),
+        ("工具结果缓存", test_tool_cache()),
+        ("消息序列化", test_message_serialization()),
         ("核心调度器", test_orchestrator()),
+        ("启动预热", test_warmup()),
+        ("无界面服务", test_api_server()),
+        ("模型对比", test_compare_chat()),
+        ("延迟分位数", test_percentile()),
+        ("批量运行", test_batch()),
+        ("启动导入", test_import_time()),
     ]
 
     results = []
@@ -1,7 +1,6 @@
 """允许通过 python -m yfai 运行"""
 
-from .main import main
+from .cli import main
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,38 @@
+"""包级延迟导入(PEP 562)
+
+包的 `__init__` 只登记导出名称与所在子模块, 首次访问时才导入子模块,
+避免 `import yfai.xxx` 连带加载 faiss、numpy、psutil、httpx 等重依赖
+"""
+
+import importlib
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(
+    package: str,
+    exports: Dict[str, str],
+    namespace: Dict[str, Any],
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """生成包级 `__getattr__` 与 `__dir__`
+
+    Args:
+        package: 包名(传入 `__name__`)
+        exports: 导出名称 -> 相对子模块名(如 ".db")
+        namespace: 包的全局命名空间(传入 `globals()`), 导入后缓存到其中
+
+    Returns:
+        Tuple: (__getattr__, __dir__)
+    """
+
+    def __getattr__(name: str) -> Any:
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
@@ -1,6 +1,15 @@
 """PyQt6 桌面UI模块"""
 
-from .main_window import MainWindow
+from typing import TYPE_CHECKING
 
-__all__ = ["MainWindow"]
+from .._lazy import lazy_exports
 
+_EXPORTS = {
+    "MainWindow": ".main_window",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .main_window import MainWindow
@@ -1,6 +1,7 @@
 """主窗口"""
 
 import asyncio
+import importlib
 from typing import Any, Dict, Optional
 
 from PyQt6.QtWidgets import (
@@ -16,30 +17,36 @@ from PyQt6.QtWidgets import (
     QStackedWidget,
     QMessageBox,
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QObject
+from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QAction
 
 from .widgets.chat_widget import ChatWidget
 from .widgets.sidebar import SidebarWidget
 from .widgets.tools_panel import ToolsPanel
-from .widgets.tools_page import ToolsPage
 from .widgets.settings_dialog import SettingsDialog
-from .widgets.settings_page import SettingsPage
-from .widgets.models_page import ModelsPage
-from .widgets.agents_page import AgentsPage
-from .widgets.jobs_page import JobsPage
-from .widgets.automation_page import AutomationPage
-from .widgets.connector_page import ConnectorPage
-from .widgets.knowledge_page import KnowledgeBasePage
-from .widgets.sessions_page import SessionsPage
-from .widgets.assistants_page import AssistantsPage
-from .widgets.logs_page import LogsPage
-from .widgets.approvals_page import ApprovalsPage
 from .widgets.approval_dialog import ApprovalDialog
 
 from yfai.security.guard import ApprovalRequest, ApprovalResult, ApprovalStatus
 
 
+# 非默认页面在首次切换时才导入模块并创建:
+# 页面键 -> (widgets 下的模块名, 类名, 窗口属性名, 是否需要配置管理器)
+LAZY_PAGES = {
+    "agents": ("agents_page", "AgentsPage", "agents_page", False),
+    "jobs": ("jobs_page", "JobsPage", "jobs_page", False),
+    "automation": ("automation_page", "AutomationPage", "automation_page", False),
+    "connectors": ("connector_page", "ConnectorPage", "connectors_page", False),
+    "knowledge": ("knowledge_page", "KnowledgeBasePage", "knowledge_page", False),
+    "sessions": ("sessions_page", "SessionsPage", "sessions_page", False),
+    "assistants": ("assistants_page", "AssistantsPage", "assistants_page", False),
+    "logs": ("logs_page", "LogsPage", "logs_page", False),
+    "approvals": ("approvals_page", "ApprovalsPage", "approvals_page", False),
+    "models": ("models_page", "ModelsPage", "models_page", True),
+    "tools": ("tools_page", "ToolsPage", "tools_page", True),
+    "settings": ("settings_page", "SettingsPage", "settings_page", True),
+}
+
+
 class MainWindow(QMainWindow):
     """主窗口"""
 
@@ -85,43 +92,14 @@ class MainWindow(QMainWindow):
         # 中间页面堆栈
         self.page_stack = QStackedWidget()
 
-        # 初始化所有页面
+        # 启动时只创建聊天页面, 其余页面按需创建(见 _get_page)
         self.chat_widget = ChatWidget(self.orchestrator)
-        self.agents_page = AgentsPage(self.orchestrator)
-        self.jobs_page = JobsPage(self.orchestrator)
-        self.automation_page = AutomationPage(self.orchestrator)
-        self.connectors_page = ConnectorPage(self.orchestrator)
-        self.knowledge_page = KnowledgeBasePage(self.orchestrator)
-        self.sessions_page = SessionsPage(self.orchestrator)
-        self.assistants_page = AssistantsPage(self.orchestrator)
-        self.logs_page = LogsPage(self.orchestrator)
-        self.approvals_page = ApprovalsPage(self.orchestrator)
-
-        # 系统类页面
-        self.models_page = ModelsPage(self.orchestrator, self.config_manager)
-        self.tools_page = ToolsPage(self.orchestrator, self.config_manager)
-        self.settings_page = SettingsPage(self.orchestrator, self.config_manager)
-
-        # 页面映射表
-        self.pages = {
-            "chat": self.chat_widget,
-            "agents": self.agents_page,
-            "jobs": self.jobs_page,
-            "automation": self.automation_page,
-            "connectors": self.connectors_page,
-            "knowledge": self.knowledge_page,
-            "sessions": self.sessions_page,
-            "assistants": self.assistants_page,
-            "logs": self.logs_page,
-            "approvals": self.approvals_page,
-            "models": self.models_page,
-            "tools": self.tools_page,
-            "settings": self.settings_page,
-        }
-
-        # 添加所有页面到堆栈
-        for page in self.pages.values():
-            self.page_stack.addWidget(page)
+        for _, _, attr, _ in LAZY_PAGES.values():
+            setattr(self, attr, None)
+
+        # 页面映射表(已创建的页面)
+        self.pages = {"chat": self.chat_widget}
+        self.page_stack.addWidget(self.chat_widget)
 
         # 默认显示聊天页面
         self.page_stack.setCurrentWidget(self.chat_widget)
@@ -250,14 +228,48 @@ class MainWindow(QMainWindow):
         """连接信号"""
         # 侧边栏信号
         self.sidebar.page_changed.connect(self._on_page_changed)
-        self.assistants_page.assistant_selected.connect(self._on_assistant_requested)
-        self.assistants_page.assistants_updated.connect(self._populate_assistant_combo)
-        self.sessions_page.session_resume_requested.connect(self._on_session_resume)
 
         # 聊天组件信号
         self.chat_widget.status_changed.connect(self.statusBar.showMessage)
-        self.settings_page.settings_saved.connect(self._on_config_saved)
-        self.models_page.config_updated.connect(self._on_config_saved)
+
+    def _get_page(self, page: str) -> Optional[QWidget]:
+        """获取页面, 首次访问时导入并创建
+
+        Args:
+            page: 页面键
+
+        Returns:
+            Optional[QWidget]: 页面组件, 未知页面返回 None
+        """
+        widget = self.pages.get(page)
+        if widget is not None or page not in LAZY_PAGES:
+            return widget
+
+        module_name, class_name, attr, needs_config = LAZY_PAGES[page]
+        module = importlib.import_module(f".widgets.{module_name}", __package__)
+        page_class = getattr(module, class_name)
+        if needs_config:
+            widget = page_class(self.orchestrator, self.config_manager)
+        else:
+            widget = page_class(self.orchestrator)
+
+        setattr(self, attr, widget)
+        self.pages[page] = widget
+        self.page_stack.addWidget(widget)
+        self._connect_page_signals(page, widget)
+        return widget
+
+    def _connect_page_signals(self, page: str, widget: QWidget) -> None:
+        """连接按需创建页面的信号"""
+        if page == "assistants":
+            widget.assistant_selected.connect(self._on_assistant_requested)
+            widget.assistants_updated.connect(self._populate_assistant_combo)
+        elif page == "sessions":
+            widget.session_resume_requested.connect(self._on_session_resume)
+        elif page == "settings":
+            widget.settings_saved.connect(self._on_config_saved)
+        elif page == "models":
+            widget.config_updated.connect(self._on_config_saved)
 
     def _load_settings(self) -> None:
         """加载设置"""
@@ -635,8 +647,9 @@ class MainWindow(QMainWindow):
 
     def _on_page_changed(self, page: str) -> None:
         """页面改变"""
-        if page in self.pages:
-            self.page_stack.setCurrentWidget(self.pages[page])
+        widget = self._get_page(page)
+        if widget is not None:
+            self.page_stack.setCurrentWidget(widget)
 
             # 更新状态栏
             page_names = {
@@ -717,8 +730,10 @@ class MainWindow(QMainWindow):
     def _on_config_saved(self, new_config: Dict[str, Any]) -> None:
         """配置保存后更新运行时依赖"""
         self.config = new_config
-        self.settings_page.reload_config(new_config)
-        self.tools_page.refresh()
+        if self.settings_page:
+            self.settings_page.reload_config(new_config)
+        if self.tools_page:
+            self.tools_page.refresh()
 
         # 更新Orchestrator依赖
         self.orchestrator.update_config(new_config)
@@ -774,6 +789,9 @@ class MainWindow(QMainWindow):
             import logging
             logging.error(f"取消任务失败: {e}")
 
+        # 释放本地操作线程池
+        self.orchestrator.local_executor.shutdown(wait=False)
+
         # 接受关闭事件
         event.accept()
 
@@ -2,7 +2,6 @@
 
 import asyncio
 import json
-from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from PyQt6.QtWidgets import (
@@ -28,7 +27,9 @@ from PyQt6.QtWidgets import (
     QTabWidget,
 )
 from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QFont
+from PyQt6.QtGui import QFont, QTextCursor
+
+from yfai.core.cancellation import CancelToken, OperationCancelled
 
 
 AVAILABLE_AGENT_TOOLS = [
@@ -193,8 +194,9 @@ class AgentsPage(QWidget):
 
         # 加载智能体列表
         self._load_agents()
-        self._progress_task: Optional[asyncio.Task] = None
-        self._progress_stop: Optional[asyncio.Event] = None
+        # 每次运行递增, 旧运行的事件不再显示
+        self._run_generation = 0
+        self._run_token: Optional[CancelToken] = None
 
     def _load_agents(self):
         """加载智能体列表"""
@@ -274,9 +276,10 @@ class AgentsPage(QWidget):
         QMessageBox.information(self, "成功", "智能体已开始执行")
 
     async def _run_agent_async(self, agent_id: str, goal: str):
-        """异步运行智能体"""
+        """异步运行智能体, 逐个显示计划、步骤、输出片段与总结事件"""
+        self._run_generation += 1
+        generation = self._run_generation
         try:
-            self._cancel_progress_watcher()
             self.run_log_output.clear()
             self.run_summary_output.clear()
 
@@ -294,41 +297,32 @@ class AgentsPage(QWidget):
             self._append_log(f"启动智能体: {agent_info.get('name')} (Provider: {provider_label}, 模型: {model_label})")
             self._append_log(f"目标: {goal}")
 
-            start_marker = datetime.utcnow()
-            self._progress_stop = asyncio.Event()
-            self._progress_task = asyncio.create_task(
-                self._poll_job_progress(agent_id, start_marker, self._progress_stop)
-            )
-
-            result = await self.orchestrator.run_agent(
-                agent_id, goal, context=context or None
-            )
-
-            if self._progress_stop:
-                self._progress_stop.set()
-            if self._progress_task:
-                try:
-                    await self._progress_task
-                except asyncio.CancelledError:
-                    pass
-            self._progress_stop = None
-            self._progress_task = None
-
-            summary = self._format_run_result(result)
-            self.run_summary_output.setPlainText(summary)
-            self._append_log(f"执行完成: {result.get('status')}")
+            self._run_token = CancelToken()
+            result: Dict[str, Any] = {}
+            async for event in self.orchestrator.run_agent_stream(
+                agent_id, goal, context=context or None, cancel_token=self._run_token
+            ):
+                if generation != self._run_generation:
+                    # 已开始新的运行, 本次运行继续执行但不再显示
+                    continue
+                if event.type == "job.result":
+                    result = event.data
+                else:
+                    self._render_run_event(event)
+
+            if generation == self._run_generation:
+                summary = self._format_run_result(result)
+                self.run_summary_output.setPlainText(summary)
+                self._append_log(f"执行完成: {result.get('status')}")
+        except OperationCancelled as e:
+            self.run_summary_output.setPlainText(f"已终止: {e}")
+            self._append_log(f"执行终止: {e}")
         except Exception as e:
-            if self._progress_stop:
-                self._progress_stop.set()
-            if self._progress_task:
-                try:
-                    await self._progress_task
-                except asyncio.CancelledError:
-                    pass
-            self._progress_stop = None
-            self._progress_task = None
             self.run_summary_output.setPlainText(f"运行失败: {e}")
             print(f"Agent run failed: {e}")
+        finally:
+            if generation == self._run_generation:
+                self._run_token = None
 
     def _on_run_provider_changed(self, _text: str) -> None:
         """运行时 Provider 切换"""
@@ -414,79 +408,38 @@ class AgentsPage(QWidget):
                 raise ValueError("未找到智能体")
             return agent.to_dict()
 
-    def _cancel_progress_watcher(self) -> None:
-        """取消正在运行的进度轮询"""
-        if self._progress_stop:
-            self._progress_stop.set()
-        if self._progress_task:
-            self._progress_task.cancel()
-        self._progress_stop = None
-        self._progress_task = None
-
     def _request_stop(self) -> None:
-        """终止按钮（占位）"""
-        self._append_log("终止功能尚未实现")
-
-    async def _poll_job_progress(
-        self,
-        agent_id: str,
-        start_marker: datetime,
-        stop_event: asyncio.Event,
-    ) -> None:
-        """轮询数据库，实时显示 JobRun/JobStep"""
-        from yfai.store.db import JobRun, JobStep
-
-        job_id: Optional[str] = None
-        last_logged_step = -1
-        last_status = None
-        tolerance = start_marker - timedelta(seconds=2)
-
-        while not stop_event.is_set():
-            try:
-                with self.orchestrator.db_manager.get_session() as db_session:
-                    if not job_id:
-                        job = (
-                            db_session.query(JobRun)
-                            .filter(JobRun.agent_id == agent_id)
-                            .order_by(JobRun.created_at.desc())
-                            .first()
-                        )
-                        if job and job.created_at >= tolerance:
-                            job_id = job.id
-                            self._append_log(f"Job {job_id} 状态: {job.status}")
-
-                    if job_id:
-                        job = db_session.query(JobRun).filter_by(id=job_id).first()
-                        if job:
-                            steps = (
-                                db_session.query(JobStep)
-                                .filter_by(job_id=job_id)
-                                .order_by(JobStep.step_index)
-                                .all()
-                            )
-                            for step in steps:
-                                if (
-                                    step.step_index is not None
-                                    and step.step_index > last_logged_step
-                                ):
-                                    desc = step.step_name or step.step_type
-                                    self._append_log(
-                                        f"[Step {step.step_index}] {desc} -> {step.status}"
-                                    )
-                                    last_logged_step = step.step_index
-
-                            if job.status != last_status:
-                                self._append_log(f"Job {job_id} 状态: {job.status}")
-                                last_status = job.status
-
-                            if job.status in {"failed", "success", "cancelled"}:
-                                self._append_log(f"Job {job_id} 完成: {job.status}")
-                                stop_event.set()
-                                break
-            except Exception:
-                pass
-
-            await asyncio.sleep(1)
+        """终止当前运行: 中断进行中的模型请求与命令, 剩余步骤不再执行"""
+        if self._run_token is None or self._run_token.cancelled:
+            self._append_log("当前没有运行中的任务")
+            return
+        self._run_token.cancel("用户终止")
+        self._append_log("正在终止...")
+
+    @staticmethod
+    def _insert_text(output: QTextEdit, text: str) -> None:
+        """在文本框末尾追加片段(不换行)"""
+        output.moveCursor(QTextCursor.MoveOperation.End)
+        output.insertPlainText(text)
+
+    def _render_run_event(self, event) -> None:
+        """显示一个任务进度事件"""
+        data = event.data
+        if event.type == "job.plan":
+            steps = (data.get("plan") or {}).get("steps") or []
+            self._append_log(f"计划就绪: {len(steps)} 个步骤")
+        elif event.type == "job.step":
+            desc = data.get("step_name") or data.get("step_type")
+            line = f"[Step {data.get('step_index')}] {desc} -> {data.get('status')}"
+            if data.get("error"):
+                line += f" ({data['error']})"
+            self._append_log(line)
+        elif event.type == "job.output":
+            self._insert_text(self.run_log_output, data.get("text", ""))
+        elif event.type == "job.summary":
+            self._insert_text(self.run_summary_output, data.get("text", ""))
+        elif event.type == "job.status":
+            self._append_log(f"Job {event.job_id} 状态: {data.get('status')}")
 
 
 class AgentEditDialog(QDialog):
@@ -669,7 +622,6 @@ class AgentEditDialog(QDialog):
             return
 
         workflow_steps = self._collect_workflow_steps()
-        workflow_data = {"workflow_steps": workflow_steps} if workflow_steps else None
 
         try:
             with self.orchestrator.db_manager.get_session() as db_session:
@@ -692,8 +644,16 @@ class AgentEditDialog(QDialog):
                 agent.is_enabled = self.enabled_check.isChecked()
                 tools = self._collect_selected_tools()
                 agent.allowed_tools = json.dumps(tools)
+                # 保留 stop_condition 中的其他配置(如 budget)
+                try:
+                    stop_condition = json.loads(agent.stop_condition) if agent.stop_condition else {}
+                except Exception:
+                    stop_condition = {}
+                stop_condition.pop("workflow_steps", None)
+                if workflow_steps:
+                    stop_condition["workflow_steps"] = workflow_steps
                 agent.stop_condition = (
-                    json.dumps(workflow_data, ensure_ascii=False) if workflow_data else None
+                    json.dumps(stop_condition, ensure_ascii=False) if stop_condition else None
                 )
 
                 if not self.agent_id:
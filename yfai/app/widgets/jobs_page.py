@@ -1,5 +1,7 @@
 """运行记录页面"""
 
+import asyncio
+
 from PyQt6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -23,6 +25,8 @@ import json
 from datetime import datetime
 from sqlalchemy import or_
 
+from yfai.core.events import EventType
+
 
 class JobsPage(QWidget):
     """运行记录页面"""
@@ -35,6 +39,12 @@ class JobsPage(QWidget):
         self.current_job_id = None
         self._init_ui()
 
+        # 任务状态变化时自动刷新, 无需手动点击刷新; 保留任务引用, 页面销毁时停止订阅
+        self._job_events = self.orchestrator.event_bus.subscribe(EventType.JOB_STATUS, maxsize=64)
+        self._watch_task = asyncio.get_event_loop().create_task(self._watch_job_events())
+        events, task = self._job_events, self._watch_task
+        self.destroyed.connect(lambda *_: (task.cancel(), events.close()))
+
     def _init_ui(self):
         """初始化UI"""
         layout = QVBoxLayout()
@@ -98,6 +108,13 @@ class JobsPage(QWidget):
         # 加载 Job 列表
         self._load_jobs()
 
+    async def _watch_job_events(self) -> None:
+        """订阅任务状态事件, 合并短时间内的连续变化后刷新列表"""
+        async for _event in self._job_events:
+            await asyncio.sleep(0.1)
+            self._job_events.drain()
+            self._load_jobs()
+
     def _populate_agent_filter(self) -> None:
         try:
             with self.orchestrator.db_manager.get_session() as db_session:
@@ -76,7 +76,7 @@ class SettingsDialog(QDialog):
 
         async def fetch():
             try:
-                models = await self.orchestrator.provider_manager.list_all_models()
+                models = await self.orchestrator.provider_manager.list_all_models(refresh=True)
                 self.form.set_available_models(models)
             except Exception as exc:
                 self.form.models_status_label.setText(f"加载失败: {exc}")
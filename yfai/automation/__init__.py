@@ -1,5 +1,20 @@
 """自动化模块"""
 
-from .scheduler import AutomationScheduler
+from typing import TYPE_CHECKING
 
-__all__ = ["AutomationScheduler"]
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    "AutomationScheduler": ".scheduler",
+    "BatchRecord": ".batch",
+    "BatchRunner": ".batch",
+    "RateLimiter": ".batch",
+    "run_batch": ".batch",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .scheduler import AutomationScheduler
+    from .batch import BatchRecord, BatchRunner, RateLimiter, run_batch
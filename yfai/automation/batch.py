@@ -0,0 +1,374 @@
+"""批量运行器
+
+读取 JSONL 记录 `{assistant|agent, input, provider, model}`, 以有界并发交给
+Orchestrator.chat / run_agent 执行; 每个 Provider 单独限速, 结果逐行写入 JSONL,
+输出文件同时作为断点, 重新运行时跳过已成功的记录
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO
+
+from yfai.store.db import Agent, Assistant
+
+
+@dataclass
+class BatchRecord:
+    """批量任务记录"""
+
+    record_id: str
+    input: str
+    assistant: Optional[str] = None
+    agent: Optional[str] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    context: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def kind(self) -> str:
+        return "agent" if self.agent else "chat"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], line_no: int) -> "BatchRecord":
+        """从 JSON 对象解析记录
+
+        Args:
+            data: JSON 对象
+            line_no: 行号(记录未提供 id 时作为断点标识)
+
+        Returns:
+            BatchRecord: 批量任务记录
+        """
+        text = data.get("input")
+        if not isinstance(text, str) or not text:
+            raise ValueError("缺少 input")
+        if data.get("assistant") and data.get("agent"):
+            raise ValueError("assistant 与 agent 只能指定一个")
+        return cls(
+            record_id=str(data.get("id") or f"line-{line_no}"),
+            input=text,
+            assistant=data.get("assistant"),
+            agent=data.get("agent"),
+            provider=data.get("provider"),
+            model=data.get("model"),
+            context=data.get("context") or {},
+        )
+
+
+class RateLimiter:
+    """令牌桶限速器"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """初始化限速器
+
+        Args:
+            rate: 每秒允许的请求数
+            burst: 允许的突发请求数, 默认等于 rate(至少 1)
+        """
+        self.rate = rate
+        self.capacity = max(1, burst or int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """获取一个令牌, 不足时等待"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def read_records(path: Path) -> Iterator[Any]:
+    """逐行读取输入文件
+
+    Yields:
+        BatchRecord 或解析失败时的 (record_id, 错误信息)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            data = None
+            try:
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("记录必须是 JSON 对象")
+                yield BatchRecord.from_dict(data, line_no)
+            except (json.JSONDecodeError, ValueError) as e:
+                record_id = f"line-{line_no}"
+                if isinstance(data, dict) and data.get("id"):
+                    record_id = str(data["id"])
+                yield (record_id, str(e))
+
+
+def load_completed(path: Path) -> Set[str]:
+    """读取已有输出中成功完成的记录ID
+
+    Args:
+        path: 输出文件
+
+    Returns:
+        Set[str]: 已成功的记录ID
+    """
+    completed: Set[str] = set()
+    if not path.exists():
+        return completed
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # 上次中断时可能留下不完整的最后一行
+                continue
+            if row.get("status") == "success":
+                completed.add(row.get("id"))
+    return completed
+
+
+def _ends_with_newline(path: Path) -> bool:
+    """文件是否为空或以换行结尾"""
+    if not path.exists() or path.stat().st_size == 0:
+        return True
+    with open(path, "rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) == b"\n"
+
+
+class BatchRunner:
+    """批量运行器"""
+
+    def __init__(
+        self,
+        orchestrator,
+        concurrency: int = 4,
+        rate_limits: Optional[Dict[str, float]] = None,
+        provider_override: Optional[str] = None,
+    ):
+        """初始化批量运行器
+
+        Args:
+            orchestrator: 核心调度器
+            concurrency: 同时执行的记录数
+            rate_limits: 各 Provider 每秒请求数上限
+            provider_override: 所有记录统一使用的 Provider, 优先于记录中的配置
+        """
+        self.orchestrator = orchestrator
+        self.concurrency = max(1, concurrency)
+        self.provider_override = provider_override
+        self._limiters = {
+            name: RateLimiter(rate) for name, rate in (rate_limits or {}).items() if rate
+        }
+        self._assistants: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._agents: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def _load_assistant(self, assistant_id: str) -> Optional[Dict[str, Any]]:
+        if assistant_id not in self._assistants:
+            with self.orchestrator.db_manager.get_session() as db_session:
+                assistant = db_session.query(Assistant).filter_by(id=assistant_id).first()
+                self._assistants[assistant_id] = assistant.to_dict() if assistant else None
+        return self._assistants[assistant_id]
+
+    def _load_agent(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        if agent_id not in self._agents:
+            with self.orchestrator.db_manager.get_session() as db_session:
+                agent = db_session.query(Agent).filter_by(id=agent_id).first()
+                self._agents[agent_id] = agent.to_dict() if agent else None
+        return self._agents[agent_id]
+
+    def _resolve_provider(self, record: BatchRecord) -> Optional[str]:
+        """确定记录实际使用的 Provider(用于限速)"""
+        provider = self.provider_override or record.provider
+        if not provider and record.assistant:
+            assistant = self._load_assistant(record.assistant)
+            provider = assistant.get("provider") if assistant else None
+        if not provider and record.agent:
+            agent = self._load_agent(record.agent)
+            provider = agent.get("default_provider") if agent else None
+        manager = self.orchestrator.provider_manager
+        if provider not in manager.providers:
+            provider = manager.get_default_provider_name()
+        return provider
+
+    async def run_record(self, record: BatchRecord) -> Dict[str, Any]:
+        """执行单条记录
+
+        Args:
+            record: 批量任务记录
+
+        Returns:
+            Dict[str, Any]: 结果行
+        """
+        provider = self._resolve_provider(record)
+        limiter = self._limiters.get(provider or "")
+        if limiter:
+            await limiter.acquire()
+
+        row: Dict[str, Any] = {
+            "id": record.record_id,
+            "kind": record.kind,
+            "target": record.agent or record.assistant,
+            "provider": provider,
+        }
+        started = time.perf_counter()
+        try:
+            if record.agent:
+                context = dict(record.context)
+                if self.provider_override or record.provider:
+                    context["provider_override"] = provider
+                if record.model:
+                    context["model_override"] = record.model
+                result = await self.orchestrator.run_agent(
+                    agent_id=record.agent,
+                    goal=record.input,
+                    context=context or None,
+                    priority="batch",
+                )
+                row.update({
+                    "status": "success" if result.get("status") == "success" else "failed",
+                    "output": result.get("summary"),
+                    "job_id": result.get("job_id"),
+                })
+            else:
+                model = record.model
+                if record.assistant:
+                    assistant = self._load_assistant(record.assistant)
+                    if assistant is None:
+                        raise ValueError(f"助手不存在: {record.assistant}")
+                    model = model or (assistant.get("model") if provider == assistant.get("provider") else None)
+                session_id = await self.orchestrator.create_session(
+                    title=f"Batch: {record.record_id}", assistant_id=record.assistant
+                )
+                response = await self.orchestrator.chat(
+                    record.input, session_id=session_id, provider=provider, model=model
+                )
+                if response is None:
+                    raise RuntimeError("Provider 返回空响应")
+                row.update({
+                    "status": "success",
+                    "output": response.content,
+                    "model": response.model,
+                    "usage": response.usage,
+                    "session_id": session_id,
+                })
+        except Exception as e:
+            row.update({"status": "failed", "error": str(e)})
+        row["latency_ms"] = int((time.perf_counter() - started) * 1000)
+        return row
+
+    async def run(
+        self,
+        input_path: Path,
+        output: TextIO,
+        skip_ids: Optional[Set[str]] = None,
+    ) -> Dict[str, Any]:
+        """执行整个输入文件
+
+        Args:
+            input_path: JSONL 输入文件
+            output: 结果输出(每完成一条写入并刷新一行)
+            skip_ids: 需要跳过的记录ID(断点续跑)
+
+        Returns:
+            Dict[str, Any]: 汇总统计
+        """
+        from yfai.server.loadtest import percentile
+
+        skip_ids = skip_ids or set()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        latencies: List[float] = []
+        counts = {"success": 0, "failed": 0, "invalid": 0, "skipped": 0}
+
+        def emit(row: Dict[str, Any]) -> None:
+            output.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            output.flush()
+
+        async def worker() -> None:
+            while True:
+                record = await queue.get()
+                if record is None:
+                    return
+                row = await self.run_record(record)
+                counts[row["status"]] += 1
+                if row["status"] == "success":
+                    latencies.append(row["latency_ms"] / 1000)
+                emit(row)
+
+        started = time.perf_counter()
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            for item in read_records(input_path):
+                if isinstance(item, tuple):
+                    record_id, error = item
+                    counts["invalid"] += 1
+                    emit({"id": record_id, "status": "invalid", "error": error})
+                    continue
+                if item.record_id in skip_ids:
+                    counts["skipped"] += 1
+                    continue
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        elapsed = time.perf_counter() - started
+
+        processed = counts["success"] + counts["failed"]
+        return {
+            **counts,
+            "processed": processed,
+            "elapsed_sec": round(elapsed, 3),
+            "throughput_per_sec": round(processed / elapsed, 3) if elapsed else None,
+            "latency_p50_sec": percentile(latencies, 50),
+            "latency_p95_sec": percentile(latencies, 95),
+        }
+
+
+async def run_batch(
+    orchestrator,
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = 4,
+    rate_limits: Optional[Dict[str, float]] = None,
+    resume: bool = False,
+    provider_override: Optional[str] = None,
+) -> Dict[str, Any]:
+    """运行批量任务并把结果追加写入输出文件
+
+    Args:
+        orchestrator: 核心调度器
+        input_path: JSONL 输入文件
+        output_path: JSONL 输出文件
+        concurrency: 并发数
+        rate_limits: 各 Provider 每秒请求数上限
+        resume: 是否跳过输出文件中已成功的记录
+        provider_override: 所有记录统一使用的 Provider
+
+    Returns:
+        Dict[str, Any]: 汇总统计
+    """
+    skip_ids = load_completed(output_path) if resume else set()
+    runner = BatchRunner(
+        orchestrator,
+        concurrency=concurrency,
+        rate_limits=rate_limits,
+        provider_override=provider_override,
+    )
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # 上次中断时可能留下不完整的最后一行, 先补上换行, 新结果不会接在它后面
+    needs_newline = resume and not _ends_with_newline(output_path)
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as output:
+        if needs_newline:
+            output.write("\n")
+        return await runner.run(input_path, output, skip_ids)
@@ -10,6 +10,8 @@ from typing import Any, Dict, List, Optional, Callable
 from pathlib import Path
 import logging
 
+from yfai.core.context import request_context
+from yfai.core.events import EventType
 from yfai.store.db import DatabaseManager, AutomationTask, Agent
 
 logger = logging.getLogger(__name__)
@@ -30,15 +32,19 @@ class AutomationScheduler:
         self,
         db_manager: DatabaseManager,
         agent_runner_func: Callable,
+        event_bus=None,
     ):
         """初始化调度器
 
         Args:
             db_manager: 数据库管理器
-            agent_runner_func: 智能体运行函数
+            agent_runner_func: 智能体运行函数(如 Orchestrator.run_agent), 以 priority="scheduled" 调用,
+                与界面发起的任务共享任务队列时排在交互任务之后
+            event_bus: 事件总线(可选), 发布任务触发与完成事件
         """
         self.db = db_manager
         self.agent_runner_func = agent_runner_func
+        self.event_bus = event_bus
         self.running = False
         self.tasks: Dict[str, asyncio.Task] = {}
 
@@ -122,6 +128,17 @@ class AutomationScheduler:
 
     async def _execute_automation_task(self, task_id: str):
         """执行自动化任务"""
+        # 每次触发使用独立的追踪ID
+        with request_context(trace_id=uuid.uuid4().hex):
+            await self._run_automation_task(task_id)
+
+    def _publish(self, task_id: str, status: str, **data: Any) -> None:
+        """发布自动化任务事件(未配置总线时忽略)"""
+        if self.event_bus is not None:
+            self.event_bus.publish(EventType.AUTOMATION_RUN, task_id=task_id, status=status, **data)
+
+    async def _run_automation_task(self, task_id: str):
+        """加载任务并运行对应智能体"""
         try:
             with self.db.get_session() as db_session:
                 task = db_session.query(AutomationTask).filter_by(id=task_id).first()
@@ -142,9 +159,10 @@ class AutomationScheduler:
                 task.last_run_at = datetime.utcnow()
                 task.run_count += 1
                 db_session.commit()
+                self._publish(task_id, "running", name=task.name, agent_id=agent_id)
 
             # 运行智能体
-            result = await self.agent_runner_func(agent_id, goal)
+            result = await self.agent_runner_func(agent_id, goal, priority="scheduled")
 
             # 更新任务状态
             with self.db.get_session() as db_session:
@@ -154,6 +172,7 @@ class AutomationScheduler:
                     db_session.commit()
 
             logger.info(f"Automation task {task_id} completed: {result.get('status')}")
+            self._publish(task_id, result.get("status", "unknown"), job_id=result.get("job_id"))
 
         except Exception as e:
             logger.error(f"Failed to execute automation task {task_id}: {e}")
@@ -164,6 +183,7 @@ class AutomationScheduler:
                 if task:
                     task.last_status = "failed"
                     db_session.commit()
+            self._publish(task_id, "failed", error=str(e))
 
     async def trigger_task_manually(self, task_id: str) -> Dict[str, Any]:
         """手动触发任务
@@ -0,0 +1,247 @@
+"""命令行入口
+
+无参数时启动桌面界面; 子命令在不加载 Qt 的情况下运行无界面模式
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def _load_config(config_path: Optional[str]):
+    from .core.config import ConfigManager
+
+    from .core.log import setup_logging
+
+    config_manager = ConfigManager(config_path) if config_path else ConfigManager()
+    config = config_manager.get_all()
+    setup_logging(config)
+    return config
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    from .server import run_server, use_echo_provider
+
+    config = _load_config(args.config)
+    if args.echo:
+        use_echo_provider(config)
+    try:
+        asyncio.run(run_server(config, host=args.host, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _cmd_loadtest(args: argparse.Namespace) -> int:
+    from .server.loadtest import print_report, run_load_test
+
+    report = asyncio.run(
+        run_load_test(
+            base_url=args.url,
+            total=args.requests,
+            concurrency=args.concurrency,
+            stream=args.stream,
+            message=args.message,
+            provider=args.provider,
+            api_token=args.token,
+        )
+    )
+    print_report(report)
+    return 0 if report["succeeded"] == report["requests"] else 1
+
+
+def _parse_rates(values: List[str]) -> Dict[str, float]:
+    rates: Dict[str, float] = {}
+    for value in values or []:
+        name, _, rate = value.partition("=")
+        if not name or not rate:
+            raise SystemExit(f"--rate 格式应为 provider=每秒请求数: {value}")
+        rates[name] = float(rate)
+    return rates
+
+
+def _cmd_batch(args: argparse.Namespace) -> int:
+    from .automation.batch import run_batch
+    from .server import build_orchestrator, use_echo_provider
+
+    config = _load_config(args.config)
+    if args.echo:
+        use_echo_provider(config)
+    batch_config = config.get("batch", {})
+    rate_limits = dict(batch_config.get("rate_limits", {}) or {})
+    rate_limits.update(_parse_rates(args.rate))
+
+    input_path = Path(args.input)
+    output_path = Path(args.output) if args.output else input_path.with_suffix(".out.jsonl")
+
+    async def run() -> Dict[str, Any]:
+        orchestrator = build_orchestrator(config)
+        try:
+            return await run_batch(
+                orchestrator,
+                input_path,
+                output_path,
+                concurrency=args.concurrency or batch_config.get("concurrency", 4),
+                rate_limits=rate_limits,
+                resume=args.resume,
+                provider_override="echo" if args.echo else args.provider,
+            )
+        finally:
+            await orchestrator.shutdown()
+
+    summary = asyncio.run(run())
+    summary["output"] = str(output_path)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0 if summary["failed"] == 0 and summary["invalid"] == 0 else 1
+
+
+def _cmd_agent(args: argparse.Namespace) -> int:
+    import time
+
+    from .core.cassette import Cassette, install_recorder, install_replayer
+    from .security.guard import ApprovalResult, ApprovalStatus
+    from .server import build_orchestrator, use_echo_provider
+    from .server.loadtest import percentile
+
+    config = _load_config(args.config)
+    if args.echo:
+        use_echo_provider(config)
+
+    cassette = Cassette.load(args.replay) if args.replay else None
+    meta = cassette.meta if cassette else {}
+    agent_id = args.agent_id or meta.get("agent_id")
+    goal = args.goal or meta.get("goal")
+    if not agent_id or not goal:
+        raise SystemExit("需要指定智能体ID与目标(回放时可从录像中读取)")
+    # 每次运行都重新规划, 保证回放时请求与录制时一致
+    context = {"plan_cache": False}
+
+    async def run() -> Dict[str, Any]:
+        orchestrator = build_orchestrator(config)
+        if args.approve:
+            orchestrator.security_guard.set_approval_callback(
+                lambda request: ApprovalResult(
+                    request_id=request.id, status=ApprovalStatus.APPROVED, approved_by="cli",
+                )
+            )
+        runner = orchestrator.agent_runner
+        recording = None
+        if args.record:
+            recording = Cassette({"agent_id": agent_id, "goal": goal})
+            install_recorder(runner, recording)
+        elif cassette is not None:
+            install_replayer(runner, cassette, speed=args.speed)
+
+        durations: List[float] = []
+        statuses: List[str] = []
+        try:
+            for _ in range(1 if args.record else max(1, args.repeat)):
+                if cassette is not None:
+                    cassette.rewind()
+                started = time.perf_counter()
+                result = await runner.run_agent(agent_id, goal, context=context)
+                durations.append(time.perf_counter() - started)
+                statuses.append(result.get("status"))
+        finally:
+            await orchestrator.shutdown()
+
+        report: Dict[str, Any] = {
+            "runs": len(durations),
+            "statuses": statuses,
+            "latency_ms": {
+                "p50": round(percentile(durations, 50) * 1000, 2),
+                "p95": round(percentile(durations, 95) * 1000, 2),
+                "max": round(max(durations) * 1000, 2),
+            },
+        }
+        if recording is not None:
+            recording.meta["duration_sec"] = durations[0]
+            recording.save(args.record)
+            report["cassette"] = {"path": args.record, **recording.get_stats()}
+        elif cassette is not None:
+            report["cassette"] = {"path": args.replay, "speed": args.speed, **cassette.get_stats()}
+            if "duration_sec" in meta:
+                report["recorded_ms"] = round(meta["duration_sec"] * 1000, 2)
+        return report
+
+    report = asyncio.run(run())
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    succeeded = all(status == "success" for status in report["statuses"])
+    return 0 if succeeded and not report.get("cassette", {}).get("misses") else 1
+
+
+def _cmd_gui(args: argparse.Namespace) -> int:
+    from .main import main as gui_main
+
+    gui_main()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行解析器"""
+    parser = argparse.ArgumentParser(prog="yfai", description="YFAI 本地对话式控制台")
+    subparsers = parser.add_subparsers(dest="command")
+
+    gui = subparsers.add_parser("gui", help="启动桌面界面(默认)")
+    gui.set_defaults(func=_cmd_gui)
+
+    serve = subparsers.add_parser("serve", help="以无界面模式运行 HTTP/SSE 服务")
+    serve.add_argument("--config", help="配置文件路径")
+    serve.add_argument("--host", help="监听地址, 覆盖 server.host")
+    serve.add_argument("--port", type=int, help="监听端口, 覆盖 server.port")
+    serve.add_argument("--echo", action="store_true", help="使用本地回显 Provider(压测用)")
+    serve.set_defaults(func=_cmd_serve)
+
+    loadtest = subparsers.add_parser("loadtest", help="对本地服务发起压测")
+    loadtest.add_argument("--url", default="http://127.0.0.1:8765", help="服务地址")
+    loadtest.add_argument("-n", "--requests", type=int, default=200, help="请求总数")
+    loadtest.add_argument("-c", "--concurrency", type=int, default=16, help="并发数")
+    loadtest.add_argument("--stream", action="store_true", help="使用 SSE 流式接口")
+    loadtest.add_argument("--message", default="ping", help="发送的消息")
+    loadtest.add_argument("--provider", help="指定 Provider")
+    loadtest.add_argument("--token", help="服务访问令牌")
+    loadtest.set_defaults(func=_cmd_loadtest)
+
+    batch = subparsers.add_parser("batch", help="批量运行 JSONL 中的对话/智能体任务")
+    batch.add_argument("input", help="JSONL 输入文件, 每行 {assistant|agent, input, provider, model}")
+    batch.add_argument("-o", "--output", help="JSONL 输出文件, 默认 <input>.out.jsonl")
+    batch.add_argument("-c", "--concurrency", type=int, help="并发数, 默认 batch.concurrency")
+    batch.add_argument(
+        "--rate", action="append", metavar="PROVIDER=RPS",
+        help="Provider 每秒请求数上限, 可重复指定",
+    )
+    batch.add_argument("--provider", help="所有记录统一使用的 Provider")
+    batch.add_argument("--resume", action="store_true", help="跳过输出文件中已成功的记录")
+    batch.add_argument("--config", help="配置文件路径")
+    batch.add_argument("--echo", action="store_true", help="所有记录使用本地回显 Provider(压测用)")
+    batch.set_defaults(func=_cmd_batch)
+
+    agent = subparsers.add_parser("agent", help="运行智能体, 可录制或回放 Provider 与工具调用")
+    agent.add_argument("agent_id", nargs="?", help="智能体ID, 回放时默认取录像中的值")
+    agent.add_argument("goal", nargs="?", help="目标, 回放时默认取录像中的值")
+    mode = agent.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="FILE", help="把模型请求与工具结果录制到文件")
+    mode.add_argument("--replay", metavar="FILE", help="按录像回放, 不访问网络与本地工具")
+    agent.add_argument("--speed", type=float, default=1.0, help="回放速度倍数, 0 表示不等待(测运行器开销)")
+    agent.add_argument("-n", "--repeat", type=int, default=1, help="回放次数, 用于统计延迟分布")
+    agent.add_argument("--approve", action="store_true", help="自动批准所有需要审批的操作")
+    agent.add_argument("--config", help="配置文件路径")
+    agent.add_argument("--echo", action="store_true", help="使用本地回显 Provider")
+    agent.set_defaults(func=_cmd_agent)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """命令行主函数"""
+    args = build_parser().parse_args(argv)
+    if not getattr(args, "func", None):
+        args.func = _cmd_gui
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
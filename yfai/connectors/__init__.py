@@ -1,6 +1,17 @@
 """连接器模块"""
 
-from .base import BaseConnector
-from .http import HttpConnector
+from typing import TYPE_CHECKING
 
-__all__ = ["BaseConnector", "HttpConnector"]
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    "BaseConnector": ".base",
+    "HttpConnector": ".http",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .base import BaseConnector
+    from .http import HttpConnector
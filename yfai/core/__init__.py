@@ -1,7 +1,22 @@
 """核心模块"""
 
-from .orchestrator import Orchestrator
-from .config import ConfigManager
+from typing import TYPE_CHECKING
 
-__all__ = ["Orchestrator", "ConfigManager"]
+from .._lazy import lazy_exports
 
+_EXPORTS = {
+    "Orchestrator": ".orchestrator",
+    "ConfigManager": ".config",
+    "EventBus": ".events",
+    "EventType": ".events",
+    "Event": ".events",
+    "DropPolicy": ".events",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .orchestrator import Orchestrator
+    from .config import ConfigManager
+    from .events import DropPolicy, Event, EventBus, EventType
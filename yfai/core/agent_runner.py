@@ -5,14 +5,37 @@
 
 import asyncio
 import json
+import logging
+import re
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Callable
+from typing import Any, AsyncIterator, Dict, List, Optional, Callable
 
+from yfai.providers.base import ChatMessage, ChatResponse
 from yfai.providers.manager import ProviderManager
 from yfai.security.guard import SecurityGuard, ApprovalRequest, ApprovalStatus, RiskLevel
 from yfai.security.policy import SecurityPolicy
+from yfai.localops.executor import OperationCancelled
 from yfai.store.db import DatabaseManager, Agent, JobRun, JobStep
+from .budget import BudgetTracker, RunBudget
+from .cancellation import CancelToken, cancel_scope, raise_if_cancelled
+from .context import current_context, request_context
+from .events import Event, EventBus, EventType
+from .job_queue import AgentJobQueue, JobPriority, JobQueueFull
+from .plan_cache import PlanCache
+from .plan_stream import PlanStepParser
+from .stream_buffer import estimate_tokens
+from .tool_cache import ToolResultCache
+
+logger = logging.getLogger(__name__)
+
+# 工具参数中引用前置步骤结果: {{steps.<index>}} 或 {{steps.<index>.<字段>}}
+_STEP_REF = re.compile(r"\{\{\s*steps\.(\d+)(?:\.([\w.]+))?\s*\}\}")
+
+# 总结策略: llm 每次调用模型; template 只用本地模板; on_failure 全部成功时用模板,
+# 失败时调用模型; stream 调用模型并与最终状态落盘并发进行
+SUMMARY_STRATEGIES = ("llm", "template", "on_failure", "stream")
 
 
 class AgentRunner:
@@ -32,6 +55,16 @@ class AgentRunner:
         security_guard: SecurityGuard,
         security_policy: SecurityPolicy,
         tool_executor: Optional[Callable] = None,
+        event_bus: Optional[EventBus] = None,
+        max_parallel_steps: int = 4,
+        stream_planning: bool = True,
+        job_queue: Optional[AgentJobQueue] = None,
+        tool_cache: Optional[ToolResultCache] = None,
+        plan_cache: Optional[PlanCache] = None,
+        budget: Optional[RunBudget] = None,
+        pricing: Optional[Dict[str, Dict[str, float]]] = None,
+        summary_strategy: str = "llm",
+        summary_by_priority: Optional[Dict[str, str]] = None,
     ):
         """初始化 AgentRunner
 
@@ -41,12 +74,75 @@ class AgentRunner:
             security_guard: 安全守卫
             security_policy: 安全策略
             tool_executor: 工具执行器(可选)
+            event_bus: 事件总线(可选), 发布任务与步骤进度
+            max_parallel_steps: 单个任务内同时执行的步骤数上限
+            stream_planning: 是否流式生成计划并在步骤生成后立即执行
+            job_queue: 任务队列(可选), 任务按优先级与并发上限排队执行
+            tool_cache: 工具结果缓存(可选), 任务结束时清除该任务的缓存
+            plan_cache: 计划缓存(可选), 相同智能体与目标复用执行成功的计划
+            budget: 默认运行预算(时长/Token/费用/单步超时), 可被智能体与运行上下文覆盖
+            pricing: 模型单价(每千 Token), 用于费用预算
+            summary_strategy: 默认总结策略(llm / template / on_failure / stream)
+            summary_by_priority: 按排队优先级覆盖的总结策略, 如 {"scheduled": "on_failure"}
         """
         self.db = db_manager
         self.provider_manager = provider_manager
         self.security_guard = security_guard
         self.security_policy = security_policy
         self.tool_executor = tool_executor
+        self.event_bus = event_bus
+        self.max_parallel_steps = max(1, max_parallel_steps)
+        self.stream_planning = stream_planning
+        self.job_queue = job_queue
+        self.tool_cache = tool_cache
+        self.plan_cache = plan_cache
+        self.default_budget = budget or RunBudget()
+        self.pricing = pricing or {}
+        self.summary_strategy = self._check_summary_strategy(summary_strategy)
+        self.summary_by_priority = {
+            JobPriority.parse(name): self._check_summary_strategy(strategy)
+            for name, strategy in (summary_by_priority or {}).items()
+        }
+        # 运行中任务的取消令牌
+        self._job_tokens: Dict[str, CancelToken] = {}
+        # 运行中任务的预算用量
+        self._budgets: Dict[str, BudgetTracker] = {}
+        # run_agent_stream 消费中的任务 -> 事件队列
+        self._streams: Dict[str, asyncio.Queue] = {}
+
+    def _publish(self, event_type: EventType, **data: Any) -> None:
+        """发布事件到总线(未配置时忽略), 并投递给该任务的 run_agent_stream 消费方"""
+        event = self.event_bus.publish(event_type, **data) if self.event_bus is not None else None
+        stream = self._streams.get(data.get("job_id") or current_context().job_id or "")
+        if stream is not None:
+            stream.put_nowait(event or Event.create(event_type, data))
+
+    def _is_streaming(self, job_id: Optional[str] = None) -> bool:
+        """任务是否由 run_agent_stream 消费(模型输出逐片段推送)"""
+        return (job_id or current_context().job_id or "") in self._streams
+
+    def cancel_job(self, job_id: str, reason: str = "用户终止") -> bool:
+        """终止运行中的任务
+
+        正在执行的模型请求、工具与子进程会立即被中断, 剩余步骤不再执行,
+        任务记录标记为已取消
+
+        Args:
+            job_id: JobRun ID
+            reason: 取消原因
+
+        Returns:
+            bool: 任务是否在运行中
+        """
+        token = self._job_tokens.get(job_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+    def running_jobs(self) -> List[str]:
+        """运行中的任务ID列表"""
+        return list(self._job_tokens)
 
     async def run_agent(
         self,
@@ -54,19 +150,223 @@ class AgentRunner:
         goal: str,
         session_id: Optional[str] = None,
         context: Optional[Dict[str, Any]] = None,
+        priority: Any = JobPriority.INTERACTIVE,
     ) -> Dict[str, Any]:
         """运行智能体
 
+        配置了任务队列时, 任务先以 pending 状态排队, 获得执行名额后开始
+
         Args:
             agent_id: 智能体ID
             goal: 用户目标描述
             session_id: 会话ID(可选)
             context: 额外上下文(可选)
+            priority: 排队优先级(interactive / scheduled / batch)
 
         Returns:
             执行结果字典
         """
         # 1. 加载智能体配置
+        agent_dict = self._load_agent(agent_id, context)
+
+        # 已取消或超时的请求不再创建任务
+        raise_if_cancelled()
+
+        # 2. 创建 JobRun 记录
+        job_run = await self._create_job_run(
+            agent_id=agent_id,
+            goal=goal,
+            session_id=session_id,
+        )
+
+        async with self._queue_slot(job_run["id"], agent_dict, priority):
+            return await self._run_job(job_run["id"], agent_dict, goal, session_id, context, priority=priority)
+
+    async def run_agent_stream(
+        self,
+        agent_id: str,
+        goal: str,
+        session_id: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        priority: Any = JobPriority.INTERACTIVE,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> AsyncIterator[Event]:
+        """运行智能体并逐个交出进度事件
+
+        事件依次为 job.status(pending/running)、job.plan(计划就绪, 流式规划时在
+        计划生成完毕后)、job.step(步骤开始/结束)、job.output(模型步骤的输出片段)、
+        job.summary(总结片段)、job.status(最终状态), 最后是携带 run_agent 返回值
+        的 job.result。任务在独立协程中执行, 消费方提前关闭生成器时任务随之取消
+
+        Args:
+            agent_id: 智能体ID
+            goal: 用户目标描述
+            session_id: 会话ID(可选)
+            context: 额外上下文(可选)
+            priority: 排队优先级
+            cancel_token: 取消令牌(可选), 默认从当前上下文的令牌派生
+
+        Yields:
+            Event: 任务进度事件
+        """
+        agent_dict = self._load_agent(agent_id, context)
+        raise_if_cancelled()
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        # 先登记事件队列再创建任务, 不会错过 pending 事件
+        job_id = str(uuid.uuid4())
+        events: asyncio.Queue = asyncio.Queue()
+        self._streams[job_id] = events
+        try:
+            await self._create_job_run(agent_id=agent_id, goal=goal, session_id=session_id, job_id=job_id)
+
+            async def run() -> Dict[str, Any]:
+                async with cancel_scope(token=cancel_token):
+                    async with self._queue_slot(job_id, agent_dict, priority):
+                        return await self._run_job(
+                            job_id, agent_dict, goal, session_id, context, priority=priority
+                        )
+
+            task = asyncio.create_task(run())
+            task.add_done_callback(lambda _: events.put_nowait(None))
+            try:
+                while True:
+                    event = await events.get()
+                    if event is None:
+                        break
+                    yield event
+                result = task.result()
+            finally:
+                if not task.done():
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+        finally:
+            self._streams.pop(job_id, None)
+
+        yield Event.create(EventType.JOB_RESULT, {
+            "job_id": job_id,
+            "agent_id": agent_id,
+            "session_id": session_id,
+            **result,
+        })
+
+    async def resume_job(
+        self,
+        job_id: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: Any = JobPriority.INTERACTIVE,
+    ) -> Dict[str, Any]:
+        """从失败或中断处继续执行任务
+
+        复用已持久化的计划与成功步骤的结果(response_snapshot), 已成功的步骤不再
+        执行, 只执行失败、被取消或中断时仍在执行的步骤及其后续步骤; 重新执行的
+        步骤照常经过安全审批。流式规划的任务按步骤到达时保存的计划继续; 没有保存
+        计划的任务(规划阶段失败)重新生成计划, 步骤位置与原计划无关, 全部重新执行
+
+        Args:
+            job_id: JobRun ID
+            context: 额外上下文(可选), 同 run_agent
+            priority: 排队优先级
+
+        Returns:
+            执行结果字典, 复用的步骤结果带有 resumed 标记
+        """
+        if job_id in self._job_tokens:
+            raise ValueError(f"任务正在运行中: {job_id}")
+
+        with self.db.get_session() as db_session:
+            job_run = db_session.query(JobRun).filter_by(id=job_id).first()
+            if not job_run or job_run.type != "agent":
+                raise ValueError(f"Job not found: {job_id}")
+            if job_run.status == "success":
+                raise ValueError(f"任务已成功完成, 无需继续: {job_id}")
+
+            job = job_run.to_dict()
+            completed: Dict[int, Dict[str, Any]] = {}
+            steps = sorted(job_run.steps, key=lambda s: s.created_at or datetime.min)
+            for job_step in steps:
+                if job_step.status != "success" or not job_step.response_snapshot:
+                    continue
+                # 同一步骤多次执行时取最近一次成功的结果
+                completed[job_step.step_index] = {
+                    "step_id": job_step.id,
+                    "step_index": job_step.step_index,
+                    "status": "success",
+                    "result": json.loads(job_step.response_snapshot),
+                    "duration_ms": job_step.duration_ms,
+                    "resumed": True,
+                }
+
+        # 成功步骤的结果按位置对应已保存的计划, 重新规划时不能复用
+        plan = job["plan"] if job["plan"] and job["plan"].get("steps") else None
+        if plan is None:
+            completed = {}
+
+        agent_dict = self._load_agent(job["agent_id"], context)
+        raise_if_cancelled()
+
+        await self._update_job_run(job_id, {"status": "pending", "error": None, "ended_at": None})
+        async with self._queue_slot(job_id, agent_dict, priority):
+            return await self._run_job(
+                job_id,
+                agent_dict,
+                job["goal"] or "",
+                job["session_id"],
+                context,
+                plan=plan,
+                completed=completed,
+                priority=priority,
+            )
+
+    @asynccontextmanager
+    async def _queue_slot(self, job_id: str, agent: Dict[str, Any], priority: Any) -> AsyncIterator[None]:
+        """在任务队列中等待执行名额(未配置队列时直接执行)
+
+        排队期间任务保持 pending 状态, 可通过 cancel_job 撤销; 撤销或排队已满时
+        记录任务状态后抛出
+
+        Args:
+            job_id: JobRun ID
+            agent: 智能体配置
+            priority: 优先级(interactive / scheduled / batch)
+        """
+        if self.job_queue is None:
+            yield
+            return
+
+        provider = agent.get("default_provider") or self.provider_manager.get_default_provider_name()
+        try:
+            async with cancel_scope() as token:
+                self._job_tokens[job_id] = token
+                try:
+                    ticket = await self.job_queue.acquire(priority, agent_id=agent["id"], provider=provider)
+                finally:
+                    self._job_tokens.pop(job_id, None)
+        except (asyncio.CancelledError, OperationCancelled, JobQueueFull) as e:
+            cancelled = not isinstance(e, JobQueueFull)
+            await self._update_job_run(job_id, {
+                "status": "cancelled" if cancelled else "failed",
+                "error": str(e) or "任务已取消",
+                "ended_at": datetime.utcnow(),
+            })
+            raise
+
+        try:
+            yield
+        finally:
+            self.job_queue.release(ticket)
+
+    def _load_agent(self, agent_id: str, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """加载智能体配置并更新使用统计
+
+        Args:
+            agent_id: 智能体ID
+            context: 额外上下文, 可覆盖 Provider 与模型
+
+        Returns:
+            智能体配置字典
+        """
         with self.db.get_session() as db_session:
             agent = db_session.query(Agent).filter_by(id=agent_id).first()
             if not agent:
@@ -88,75 +388,460 @@ class AgentRunner:
                     agent_dict["default_provider"] = provider_override
                 if model_override:
                     agent_dict["default_model"] = model_override
+        return agent_dict
 
-        # 2. 创建 JobRun 记录
-        job_run = await self._create_job_run(
-            agent_id=agent_id,
-            goal=goal,
-            session_id=session_id,
-        )
+    def _start_budget(
+        self,
+        job_id: str,
+        agent: Dict[str, Any],
+        context: Optional[Dict[str, Any]],
+    ) -> Optional[BudgetTracker]:
+        """合并默认、智能体(stop_condition.budget)与上下文(context.budget)的预算并开始计量
+
+        Args:
+            job_id: JobRun ID
+            agent: 智能体配置
+            context: 额外上下文
+
+        Returns:
+            Optional[BudgetTracker]: 预算用量统计, 未设置任何限制时返回 None
+        """
+        stop_condition = agent.get("stop_condition")
+        budget = self.default_budget.merged(
+            stop_condition.get("budget") if isinstance(stop_condition, dict) else None
+        ).merged((context or {}).get("budget"))
+        if not budget.enabled:
+            return None
+        tracker = BudgetTracker(budget, self.pricing)
+        self._budgets[job_id] = tracker
+        return tracker
+
+    @staticmethod
+    def _check_summary_strategy(strategy: str) -> str:
+        """校验总结策略名称"""
+        if strategy not in SUMMARY_STRATEGIES:
+            raise ValueError(f"未知的总结策略: {strategy}, 可选 {', '.join(SUMMARY_STRATEGIES)}")
+        return strategy
+
+    def _summary_strategy(
+        self,
+        agent: Dict[str, Any],
+        context: Optional[Dict[str, Any]],
+        priority: Any,
+    ) -> str:
+        """选择总结策略: 运行上下文(context.summary) > 智能体(stop_condition.summary) > 按优先级 > 默认
+
+        Args:
+            agent: 智能体配置
+            context: 额外上下文
+            priority: 排队优先级
 
+        Returns:
+            str: 总结策略
+        """
+        stop_condition = agent.get("stop_condition")
+        for strategy in (
+            (context or {}).get("summary"),
+            stop_condition.get("summary") if isinstance(stop_condition, dict) else None,
+        ):
+            if strategy in SUMMARY_STRATEGIES:
+                return strategy
+            if strategy:
+                logger.warning("忽略未知的总结策略: %s", strategy)
         try:
-            # 3. 生成执行计划或使用预设编排
-            workflow_steps = self._get_manual_workflow(agent_dict)
-            if workflow_steps:
-                plan = {"goal": goal, "steps": workflow_steps, "source": "workflow"}
-            else:
-                plan = await self._generate_plan(agent_dict, goal, context)
+            return self.summary_by_priority.get(JobPriority.parse(priority), self.summary_strategy)
+        except ValueError:
+            return self.summary_strategy
 
-            # 更新 JobRun 的计划
-            await self._update_job_run(job_run["id"], {
-                "plan": json.dumps(plan, ensure_ascii=False),
-                "status": "running",
-                "started_at": datetime.utcnow(),
-            })
+    def _record_usage(self, model: Optional[str], response: Any) -> None:
+        """把模型调用的用量计入当前任务的预算"""
+        tracker = self._budgets.get(current_context().job_id or "")
+        if tracker is not None and response is not None:
+            tracker.record(model, response.usage)
 
-            # 4. 执行计划步骤
-            results = []
-            for idx, step in enumerate(plan["steps"]):
-                step_result = await self._execute_step(
-                    job_run["id"],
-                    idx,
-                    step,
-                    agent_dict,
-                )
-                results.append(step_result)
+    async def _run_job(
+        self,
+        job_id: str,
+        agent_dict: Dict[str, Any],
+        goal: str,
+        session_id: Optional[str],
+        context: Optional[Dict[str, Any]],
+        plan: Optional[Dict[str, Any]] = None,
+        completed: Optional[Dict[int, Dict[str, Any]]] = None,
+        priority: Any = JobPriority.INTERACTIVE,
+    ) -> Dict[str, Any]:
+        """生成计划(未提供时)、执行步骤并生成总结
+
+        Args:
+            job_id: JobRun ID
+            agent_dict: 智能体配置
+            goal: 用户目标
+            session_id: 会话ID
+            context: 额外上下文
+            plan: 已有的计划(继续执行时)
+            completed: 已完成步骤位置 -> 结果(继续执行时复用)
+            priority: 排队优先级(选择总结策略)
 
-                # 检查停止条件
-                if step_result["status"] == "failed" and not step.get("continue_on_error"):
+        Returns:
+            执行结果字典
+        """
+        agent_id = agent_dict["id"]
+        # 后续的模型、工具与审计调用都归属到该任务
+        with request_context(session_id=session_id, agent_id=agent_id, job_id=job_id):
+            async with cancel_scope() as token:
+                self._job_tokens[job_id] = token
+                tracker = self._start_budget(job_id, agent_dict, context)
+                try:
+                    parallelism = int((context or {}).get("parallelism") or self.max_parallel_steps)
+                    workflow_steps = self._get_manual_workflow(agent_dict) if plan is None else []
+
+                    # 命中计划缓存时跳过规划
+                    cache_key = None
+                    if (
+                        plan is None
+                        and not workflow_steps
+                        and self.plan_cache is not None
+                        and (context or {}).get("plan_cache", True)
+                    ):
+                        cache_key = self.plan_cache.key(agent_dict, goal)
+                        plan = self._get_cached_plan(cache_key, agent_dict, goal)
+
+                    if plan is None and not workflow_steps and self.stream_planning:
+                        # 3-4. 流式生成计划, 每个步骤生成完毕且依赖已满足即开始执行
+                        plan = {"goal": goal, "steps": []}
+                        await self._update_job_run(job_id, {
+                            "status": "running",
+                            "started_at": datetime.utcnow(),
+                        })
+                        results = await self._run_steps(
+                            job_id,
+                            [],
+                            agent_dict,
+                            parallelism,
+                            incoming=self._stream_plan(
+                                agent_dict, goal, context, plan, agent_dict["max_steps"]
+                            ),
+                        )
+                        await self._update_job_run(job_id, {
+                            "plan": json.dumps(plan, ensure_ascii=False),
+                        })
+                    else:
+                        # 3. 生成执行计划或使用预设编排
+                        if plan is None:
+                            if workflow_steps:
+                                plan = {"goal": goal, "steps": workflow_steps, "source": "workflow"}
+                            else:
+                                plan = await self._generate_plan_within_budget(
+                                    agent_dict, goal, context, tracker
+                                )
+
+                        # 更新 JobRun 的计划
+                        await self._update_job_run(job_id, {
+                            "plan": json.dumps(plan, ensure_ascii=False),
+                            "status": "running",
+                            "started_at": datetime.utcnow(),
+                        })
+                        self._publish(EventType.JOB_PLAN, job_id=job_id, plan=plan)
+
+                        # 4. 按依赖关系执行计划步骤(最多 max_steps 步), 互不依赖的步骤并发执行
+                        results = await self._run_steps(
+                            job_id,
+                            plan["steps"][: agent_dict["max_steps"]],
+                            agent_dict,
+                            parallelism,
+                            completed=completed,
+                        )
+
+                    stop_reason = tracker.exceeded() if tracker is not None else None
+                    final_status = (
+                        "success"
+                        if stop_reason is None and all(r["status"] == "success" for r in results)
+                        else "failed"
+                    )
+                    if cache_key is not None:
+                        if final_status == "success" and not plan.get("source"):
+                            self.plan_cache.put(cache_key, plan)
+                        elif final_status != "success" and plan.get("source") == "cache" and not stop_reason:
+                            # 缓存的计划已不适用, 下次重新规划
+                            self.plan_cache.invalidate(cache_key)
+
+                    # 5-6. 按策略生成总结并更新 JobRun 状态(预算耗尽时不再调用模型)
+                    strategy = self._summary_strategy(agent_dict, context, priority)
+                    final_updates = {
+                        "status": final_status,
+                        "error": f"预算耗尽: {stop_reason}" if stop_reason else None,
+                        "ended_at": datetime.utcnow(),
+                    }
+                    if stop_reason or strategy == "template" or (
+                        strategy == "on_failure" and final_status == "success"
+                    ):
+                        summary = self._template_summary(goal, plan, results, stop_reason)
+                        await self._update_job_run(job_id, {**final_updates, "summary": summary})
+                    elif strategy == "stream":
+                        summary_task = asyncio.create_task(
+                            self._generate_summary(agent_dict, goal, plan, results)
+                        )
+                        try:
+                            # 让总结请求先发出, 再写入最终状态; 总结完成后单独写入
+                            await asyncio.sleep(0)
+                            await self._update_job_run(job_id, final_updates)
+                            summary = await summary_task
+                        finally:
+                            if not summary_task.done():
+                                summary_task.cancel()
+                        await self._update_job_run(job_id, {"summary": summary})
+                    else:
+                        summary = await self._generate_summary(agent_dict, goal, plan, results)
+                        await self._update_job_run(job_id, {**final_updates, "summary": summary})
+
+                    return {
+                        "job_id": job_id,
+                        "status": final_status,
+                        "plan": plan,
+                        "results": results,
+                        "summary": summary,
+                        "stop_reason": stop_reason,
+                        "budget": tracker.snapshot() if tracker is not None else None,
+                    }
+
+                except asyncio.CancelledError:
+                    # 被取消(终止、超时或服务关闭)时记录状态后继续传播
+                    await self._update_job_run(job_id, {
+                        "status": "cancelled",
+                        "error": token.reason or "任务已取消",
+                        "ended_at": datetime.utcnow(),
+                    })
+                    raise
+                except Exception as e:
+                    # 更新失败状态
+                    await self._update_job_run(job_id, {
+                        "status": "failed",
+                        "error": str(e),
+                        "ended_at": datetime.utcnow(),
+                    })
+                    raise
+                finally:
+                    self._job_tokens.pop(job_id, None)
+                    self._budgets.pop(job_id, None)
+                    if self.tool_cache is not None:
+                        self.tool_cache.drop_job(job_id)
+
+    async def _run_steps(
+        self,
+        job_id: str,
+        steps: List[Dict[str, Any]],
+        agent: Dict[str, Any],
+        parallelism: int,
+        incoming: Optional[AsyncIterator[Dict[str, Any]]] = None,
+        completed: Optional[Dict[int, Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """按依赖关系调度执行步骤
+
+        依赖已完成的步骤立即在并发上限内启动, 前置步骤的结果传给依赖它的步骤;
+        未声明 depends_on 的步骤依赖前一步(逐个顺序执行)。某步失败且未设置
+        continue_on_error 时不再启动新步骤, 已在执行的步骤照常完成
+
+        Args:
+            job_id: JobRun ID
+            steps: 计划步骤
+            agent: 智能体配置
+            parallelism: 同时执行的步骤数上限
+            incoming: 仍在生成中的后续步骤(流式计划), 每到达一步解析其依赖
+            completed: 已完成的步骤位置 -> 结果, 不再执行, 结果照常传给后续步骤
+
+        Returns:
+            按步骤顺序排列的已执行步骤结果
+        """
+        steps = list(steps)
+        dependencies = self._resolve_dependencies(steps)
+        done: Dict[int, Dict[str, Any]] = {
+            pos: result for pos, result in (completed or {}).items() if pos < len(steps)
+        }
+        pending = set(range(len(steps))) - set(done)
+        running: Dict[asyncio.Task, int] = {}
+        stopped = False
+        feeder: Optional[asyncio.Task] = None
+        if incoming is not None:
+            feeder = asyncio.ensure_future(incoming.__anext__())
+        tracker = self._budgets.get(job_id)
+        step_timeout = tracker.budget.step_timeout_sec if tracker is not None else None
+
+        try:
+            while pending or running or feeder is not None:
+                reason = tracker.exceeded() if tracker is not None else None
+                if reason is not None:
+                    # 预算耗尽: 终止执行中的步骤与计划生成, 剩余步骤不再执行
+                    for task in running:
+                        task.cancel(reason)
+                    outcomes = await asyncio.gather(*running, return_exceptions=True)
+                    for (task, pos), outcome in zip(running.items(), outcomes):
+                        done[pos] = outcome if isinstance(outcome, dict) else {
+                            "step_index": pos,
+                            "status": "cancelled",
+                            "error": reason,
+                        }
+                    running.clear()
+                    if feeder is not None:
+                        feeder.cancel()
+                        await asyncio.gather(feeder, return_exceptions=True)
+                        feeder = None
                     break
 
-                # 检查是否达到最大步骤数
-                if idx + 1 >= agent_dict["max_steps"]:
+                if not stopped:
+                    ready = sorted(
+                        pos for pos in pending
+                        if all(dep in done for dep in dependencies[pos])
+                    )
+                    for pos in ready:
+                        if len(running) >= max(1, parallelism):
+                            break
+                        pending.discard(pos)
+                        inputs = {dep: done[dep].get("result") for dep in dependencies[pos]}
+                        task = asyncio.create_task(self._execute_step(
+                            job_id, pos, self._bind_step_inputs(steps[pos], inputs), agent,
+                            timeout=step_timeout,
+                        ))
+                        running[task] = pos
+
+                if stopped and not running and feeder is not None:
+                    # 已有步骤失败且没有执行中的步骤: 不再等待计划生成剩余步骤
+                    feeder.cancel()
+                    await asyncio.gather(feeder, return_exceptions=True)
+                    feeder = None
+
+                if not running and feeder is None:
+                    # 剩余步骤的依赖无法满足(引用不存在的步骤或存在环)
+                    for pos in sorted(pending) if not stopped else []:
+                        done[pos] = {
+                            "step_index": pos,
+                            "status": "failed",
+                            "error": "依赖的步骤不存在或存在循环依赖",
+                        }
                     break
 
-            # 5. 生成总结
-            summary = await self._generate_summary(agent_dict, goal, plan, results)
+                waiting = set(running) | ({feeder} if feeder is not None else set())
+                finished, _ = await asyncio.wait(
+                    waiting,
+                    timeout=tracker.remaining_time() if tracker is not None else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not finished:
+                    # 等待超过剩余时长
+                    tracker.time_out()
+                    continue
+                for task in finished:
+                    if task is feeder:
+                        try:
+                            steps.append(task.result())
+                        except StopAsyncIteration:
+                            feeder = None
+                        else:
+                            pending.add(len(steps) - 1)
+                            dependencies = self._resolve_dependencies(steps)
+                            feeder = asyncio.ensure_future(incoming.__anext__())
+                        continue
+                    pos = running.pop(task)
+                    done[pos] = task.result()
+                    if done[pos]["status"] == "failed" and not steps[pos].get("continue_on_error"):
+                        stopped = True
+        except BaseException:
+            # 任务被终止: 取消仍在执行的步骤, 等待它们记录取消状态
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            if feeder is not None:
+                feeder.cancel()
+                await asyncio.gather(feeder, return_exceptions=True)
+            raise
+        finally:
+            if incoming is not None:
+                await incoming.aclose()
 
-            # 6. 更新 JobRun 状态
-            final_status = "success" if all(r["status"] == "success" for r in results) else "failed"
-            await self._update_job_run(job_run["id"], {
-                "status": final_status,
-                "summary": summary,
-                "ended_at": datetime.utcnow(),
-            })
+        return [done[pos] for pos in sorted(done)]
 
-            return {
-                "job_id": job_run["id"],
-                "status": final_status,
-                "plan": plan,
-                "results": results,
-                "summary": summary,
-            }
+    @staticmethod
+    def _resolve_dependencies(steps: List[Dict[str, Any]]) -> List[List[int]]:
+        """把 depends_on(步骤 index 或名称)解析为步骤位置
 
-        except Exception as e:
-            # 更新失败状态
-            await self._update_job_run(job_run["id"], {
-                "status": "failed",
-                "error": str(e),
-                "ended_at": datetime.utcnow(),
-            })
-            raise
+        未声明 depends_on 的步骤依赖前一步(顺序执行), 只有显式的空列表表示不依赖任何步骤
+        """
+        positions: Dict[Any, int] = {}
+        for pos, step in enumerate(steps):
+            positions.setdefault(step.get("index", pos), pos)
+            if step.get("name"):
+                positions.setdefault(step["name"], pos)
+
+        dependencies: List[List[int]] = []
+        for pos, step in enumerate(steps):
+            refs = step.get("depends_on")
+            if refs is None:
+                dependencies.append([pos - 1] if pos else [])
+                continue
+            if not isinstance(refs, list):
+                refs = [refs]
+            # 找不到的引用保留为 -1, 使该步骤不会被调度
+            dependencies.append(sorted({positions.get(ref, -1) for ref in refs} - {pos}))
+        return dependencies
+
+    @classmethod
+    def _bind_step_inputs(cls, step: Dict[str, Any], inputs: Dict[int, Any]) -> Dict[str, Any]:
+        """把前置步骤的结果传入步骤
+
+        工具参数中的 {{steps.<index>}} / {{steps.<index>.<字段>}} 替换为对应结果;
+        模型与分析步骤在提示词后附上前置步骤的结果
+
+        Args:
+            step: 步骤配置
+            inputs: 前置步骤位置 -> 执行结果
+
+        Returns:
+            Dict[str, Any]: 绑定输入后的步骤配置(不修改原计划)
+        """
+        if not inputs:
+            return step
+
+        bound = dict(step)
+        if step.get("type") == "tool":
+            bound["params"] = cls._substitute_refs(step.get("params", {}), inputs)
+        else:
+            context = json.dumps(
+                {f"步骤 {pos}": result for pos, result in inputs.items()},
+                ensure_ascii=False,
+                default=str,
+            )
+            prompt = step.get("prompt", step.get("description", ""))
+            bound["prompt"] = f"{prompt}\n\n前置步骤结果:\n{context[:4000]}"
+        return bound
+
+    @classmethod
+    def _substitute_refs(cls, value: Any, inputs: Dict[int, Any]) -> Any:
+        """递归替换参数中的步骤结果引用"""
+        if isinstance(value, dict):
+            return {key: cls._substitute_refs(item, inputs) for key, item in value.items()}
+        if isinstance(value, list):
+            return [cls._substitute_refs(item, inputs) for item in value]
+        if not isinstance(value, str) or "{{" not in value:
+            return value
+
+        def lookup(match: "re.Match") -> Any:
+            result: Any = inputs.get(int(match.group(1)))
+            for key in (match.group(2) or "").split("."):
+                if key and isinstance(result, dict):
+                    result = result.get(key)
+                elif key and isinstance(result, list) and key.isdigit() and int(key) < len(result):
+                    result = result[int(key)]
+            return result
+
+        whole = _STEP_REF.fullmatch(value.strip())
+        if whole:
+            # 整个参数就是一个引用时保留原始类型
+            return lookup(whole)
+
+        def render(match: "re.Match") -> str:
+            result = lookup(match)
+            return result if isinstance(result, str) else json.dumps(result, ensure_ascii=False, default=str)
+
+        return _STEP_REF.sub(render, value)
 
     async def _generate_plan(
         self,
@@ -174,6 +859,149 @@ class AgentRunner:
         Returns:
             计划字典
         """
+        provider, model, messages = self._build_planning_request(agent, goal)
+
+        response = await self.provider_manager.chat(
+            messages=messages,
+            provider_name=provider,
+            model=model,
+            temperature=0.3,
+        )
+        self._record_usage(model, response)
+
+        return self._parse_plan(response.content if response else "", goal)
+
+    async def _generate_plan_within_budget(
+        self,
+        agent: Dict[str, Any],
+        goal: str,
+        context: Optional[Dict[str, Any]],
+        tracker: Optional[BudgetTracker],
+    ) -> Dict[str, Any]:
+        """在时长预算内生成计划, 超时时返回空计划(预算耗尽原因记录在 tracker 中)
+
+        Args:
+            agent: 智能体配置
+            goal: 用户目标
+            context: 额外上下文
+            tracker: 预算用量统计
+
+        Returns:
+            计划字典
+        """
+        remaining = tracker.remaining_time() if tracker is not None else None
+        deadline = asyncio.timeout(remaining)
+        try:
+            async with deadline:
+                return await self._generate_plan(agent, goal, context)
+        except TimeoutError:
+            if not deadline.expired():
+                raise
+            tracker.time_out()
+            return {"goal": goal, "steps": []}
+
+    async def _stream_plan(
+        self,
+        agent: Dict[str, Any],
+        goal: str,
+        context: Optional[Dict[str, Any]],
+        plan: Dict[str, Any],
+        limit: int,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """流式生成执行计划, 每个步骤生成完毕即交出
+
+        每交出一个步骤前把已生成的步骤写入 plan 并保存到 JobRun, 任务中途失败或被
+        终止时保留已执行步骤对应的计划; 结束后 plan 为完整计划。流式请求在交出任何
+        步骤前失败时退回一次性生成, 中途失败时保留已生成的步骤
+
+        Args:
+            agent: 智能体配置
+            goal: 用户目标
+            context: 额外上下文
+            plan: 计划字典, 随步骤到达填入 goal 与 steps
+            limit: 最多交出的步骤数(max_steps)
+
+        Yields:
+            Dict[str, Any]: 计划步骤
+        """
+        provider, model, messages = self._build_planning_request(agent, goal)
+        parser = PlanStepParser()
+        streamed: List[Dict[str, Any]] = []
+        # 流式响应没有 usage, 按文本估算计入预算
+        tracker = self._budgets.get(current_context().job_id or "")
+        prompt_text = "".join(message.content for message in messages)
+
+        try:
+            try:
+                async for chunk in self.provider_manager.stream_chat(
+                    messages=messages,
+                    provider_name=provider,
+                    model=model,
+                    temperature=0.3,
+                ):
+                    for step in parser.feed(chunk):
+                        streamed.append(step)
+                        if len(streamed) <= limit:
+                            # 交出前先保存, 中断或失败后可从已执行的步骤继续
+                            await self._save_plan(plan, self._partial_plan(goal, streamed))
+                            yield step
+            except Exception as e:
+                if tracker is not None:
+                    tracker.record_text(model, prompt_text, parser.text)
+                if streamed:
+                    logger.warning("计划流式生成中断, 使用已生成的 %d 个步骤: %s", len(streamed), e)
+                    await self._save_plan(plan, self._partial_plan(goal, streamed))
+                    return
+                logger.warning("计划流式生成失败, 改为一次性生成: %s", e)
+                await self._save_plan(plan, await self._generate_plan(agent, goal, context))
+                for step in plan["steps"][:limit]:
+                    yield step
+                return
+
+            if tracker is not None:
+                tracker.record_text(model, prompt_text, parser.text)
+            parsed = self._parse_plan(parser.text, goal)
+            if len(parsed.get("steps", [])) < len(streamed):
+                parsed = {"goal": goal, "steps": list(streamed)}
+            await self._save_plan(plan, parsed)
+            # 增量解析未能识别的步骤(如未按格式输出)在生成结束后补上
+            for step in parsed["steps"][len(streamed):limit]:
+                yield step
+        finally:
+            # 被取消或关闭时(如步骤失败后不再等待计划)也保留已生成的步骤
+            if len(plan.get("steps", [])) < len(streamed):
+                plan.clear()
+                plan.update(self._partial_plan(goal, streamed))
+
+    @staticmethod
+    def _partial_plan(goal: str, streamed: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """已生成部分步骤的计划"""
+        return {"goal": goal, "steps": list(streamed), "source": "partial"}
+
+    async def _save_plan(self, plan: Dict[str, Any], updated: Dict[str, Any]) -> None:
+        """替换计划内容, 保存到当前任务的 JobRun 并发布计划事件
+
+        Args:
+            plan: 与调用方共享的计划字典
+            updated: 新的计划内容
+        """
+        plan.clear()
+        plan.update(updated)
+        job_id = current_context().job_id
+        if job_id:
+            await self._update_job_run(job_id, {"plan": json.dumps(plan, ensure_ascii=False)})
+        self._publish(EventType.JOB_PLAN, plan=dict(plan, steps=list(plan.get("steps", []))))
+
+    def _build_planning_request(self, agent: Dict[str, Any], goal: str) -> tuple:
+        """构建规划请求
+
+        Args:
+            agent: 智能体配置
+            goal: 用户目标
+
+        Returns:
+            (provider, model, messages)
+        """
         # 构建规划提示词
         planning_prompt = f"""
 你是一个智能任务规划助手。根据以下信息生成详细的执行计划:
@@ -205,32 +1033,37 @@ class AgentRunner:
             "tool": "工具名称(如果type是tool)",
             "params": {{"参数": "值"}},
             "expected_output": "预期输出",
+            "depends_on": [],
             "continue_on_error": false
         }}
     ]
 }}
+
+depends_on 填写该步骤依赖的前置步骤 index 列表, 省略时依赖前一步, 填 [] 表示不依赖任何步骤;
+互不依赖的步骤(如分别采集进程、端口、IP 信息)会并发执行。工具参数中可用 "{{{{steps.<index>.<字段>}}}}" 引用前置步骤的结果
 """
 
-        # 调用 LLM 生成计划
         provider = agent.get("default_provider") or "bailian"
         model = agent.get("default_model") or "qwen-plus"
 
         messages = [
-            {"role": "system", "content": agent["system_prompt"]},
-            {"role": "user", "content": planning_prompt},
+            ChatMessage(role="system", content=agent["system_prompt"]),
+            ChatMessage(role="user", content=planning_prompt),
         ]
+        return provider, model, messages
 
-        response = await self.provider_manager.chat(
-            provider=provider,
-            model=model,
-            messages=messages,
-            temperature=0.3,
-        )
+    @staticmethod
+    def _parse_plan(content: str, goal: str) -> Dict[str, Any]:
+        """从模型输出中解析计划, 解析失败时返回单步分析计划
 
-        # 解析计划
+        Args:
+            content: 模型输出
+            goal: 用户目标
+
+        Returns:
+            计划字典
+        """
         try:
-            # 尝试从响应中提取 JSON
-            content = response.get("content", "")
             # 查找 JSON 代码块
             if "```json" in content:
                 json_start = content.find("```json") + 7
@@ -247,6 +1080,7 @@ class AgentRunner:
             # 如果解析失败,返回简单计划
             return {
                 "goal": goal,
+                "source": "fallback",
                 "steps": [
                     {
                         "index": 0,
@@ -258,12 +1092,61 @@ class AgentRunner:
                 ],
             }
 
+    def _get_cached_plan(self, key: str, agent: Dict[str, Any], goal: str) -> Optional[Dict[str, Any]]:
+        """从计划缓存取出计划并校验, 校验失败时移除该计划
+
+        Args:
+            key: 缓存键
+            agent: 智能体配置
+            goal: 用户目标
+
+        Returns:
+            Optional[Dict[str, Any]]: 可直接执行的计划, 未命中或校验失败时返回 None
+        """
+        plan = self.plan_cache.get(key)
+        if plan is None:
+            return None
+        error = self._validate_plan(plan, agent)
+        if error:
+            logger.info("缓存的计划校验失败, 重新规划: %s", error)
+            self.plan_cache.invalidate(key)
+            return None
+        plan["goal"] = goal
+        plan["source"] = "cache"
+        return plan
+
+    @classmethod
+    def _validate_plan(cls, plan: Dict[str, Any], agent: Dict[str, Any]) -> Optional[str]:
+        """校验计划能否在智能体当前配置下执行
+
+        Args:
+            plan: 计划字典
+            agent: 智能体配置
+
+        Returns:
+            Optional[str]: 错误描述, 校验通过时返回 None
+        """
+        steps = plan.get("steps")
+        if not isinstance(steps, list) or not steps:
+            return "计划没有步骤"
+        if not all(isinstance(step, dict) for step in steps):
+            return "步骤格式错误"
+        for step in steps:
+            if step.get("type") not in ("tool", "model", "analysis"):
+                return f"未知的步骤类型: {step.get('type')}"
+            if step["type"] == "tool" and step.get("tool") not in agent["allowed_tools"]:
+                return f"工具不在允许列表中: {step.get('tool')}"
+        if any(-1 in deps for deps in cls._resolve_dependencies(steps)):
+            return "步骤依赖无法解析"
+        return None
+
     async def _execute_step(
         self,
         job_id: str,
         step_index: int,
         step: Dict[str, Any],
         agent: Dict[str, Any],
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """执行单个步骤
 
@@ -272,6 +1155,7 @@ class AgentRunner:
             step_index: 步骤索引
             step: 步骤配置
             agent: 智能体配置
+            timeout: 单步超时(秒), 超时后中断该步骤并记为失败
 
         Returns:
             步骤执行结果
@@ -294,18 +1178,47 @@ class AgentRunner:
             db_session.add(job_step)
             db_session.commit()
 
+        step_name = step.get("name", f"Step {step_index}")
+        self._publish(
+            EventType.JOB_STEP,
+            job_id=job_id,
+            step_id=step_id,
+            step_index=step_index,
+            step_type=step.get("type", "unknown"),
+            step_name=step_name,
+            status="running",
+        )
+
         try:
             # 执行步骤
-            if step["type"] == "tool":
-                result = await self._execute_tool_step(step, agent)
-            elif step["type"] == "model":
-                result = await self._execute_model_step(step, agent)
-            elif step["type"] == "analysis":
-                result = await self._execute_analysis_step(step, agent)
-            else:
-                result = {"error": f"Unknown step type: {step['type']}"}
-
-            # 更新 JobStep 状态
+            on_chunk = None
+            if self._is_streaming(job_id):
+                def on_chunk(text: str) -> None:
+                    self._publish(
+                        EventType.JOB_OUTPUT,
+                        job_id=job_id,
+                        step_id=step_id,
+                        step_index=step_index,
+                        text=text,
+                    )
+
+            deadline = asyncio.timeout(timeout)
+            try:
+                async with deadline:
+                    if step["type"] == "tool":
+                        result = await self._execute_tool_step(step, agent)
+                    elif step["type"] == "model":
+                        result = await self._execute_model_step(step, agent, on_chunk)
+                    elif step["type"] == "analysis":
+                        result = await self._execute_analysis_step(step, agent, on_chunk)
+                    else:
+                        result = {"error": f"Unknown step type: {step['type']}"}
+            except TimeoutError:
+                if not deadline.expired():
+                    raise
+                result = {"error": f"步骤超时({timeout:g}s)"}
+
+            # 更新 JobStep 状态(命中工具结果缓存时响应快照中带有 cached 字段)
             ended_at = datetime.utcnow()
             duration_ms = int((ended_at - started_at).total_seconds() * 1000)
 
@@ -319,14 +1232,55 @@ class AgentRunner:
                     job_step.duration_ms = duration_ms
                     db_session.commit()
 
+            self._publish(
+                EventType.JOB_STEP,
+                job_id=job_id,
+                step_id=step_id,
+                step_index=step_index,
+                step_type=step.get("type", "unknown"),
+                step_name=step_name,
+                status="success" if not result.get("error") else "failed",
+                error=result.get("error"),
+                duration_ms=duration_ms,
+                cache_hit=bool(result.get("cached")),
+            )
+
             return {
                 "step_id": step_id,
                 "step_index": step_index,
                 "status": "success" if not result.get("error") else "failed",
                 "result": result,
                 "duration_ms": duration_ms,
+                "cache_hit": bool(result.get("cached")),
             }
 
+        except asyncio.CancelledError as e:
+            # 任务被终止或预算耗尽: 记录步骤状态后继续传播, 剩余步骤不再执行
+            ended_at = datetime.utcnow()
+            duration_ms = int((ended_at - started_at).total_seconds() * 1000)
+
+            with self.db.get_session() as db_session:
+                job_step = db_session.query(JobStep).filter_by(id=step_id).first()
+                if job_step:
+                    job_step.status = "cancelled"
+                    job_step.error = str(e) or None
+                    job_step.ended_at = ended_at
+                    job_step.duration_ms = duration_ms
+                    db_session.commit()
+
+            self._publish(
+                EventType.JOB_STEP,
+                job_id=job_id,
+                step_id=step_id,
+                step_index=step_index,
+                step_type=step.get("type", "unknown"),
+                step_name=step_name,
+                status="cancelled",
+                error=str(e) or None,
+                duration_ms=duration_ms,
+            )
+            raise
+
         except Exception as e:
             # 更新失败状态
             ended_at = datetime.utcnow()
@@ -341,6 +1295,18 @@ class AgentRunner:
                     job_step.duration_ms = duration_ms
                     db_session.commit()
 
+            self._publish(
+                EventType.JOB_STEP,
+                job_id=job_id,
+                step_id=step_id,
+                step_index=step_index,
+                step_type=step.get("type", "unknown"),
+                step_name=step_name,
+                status="failed",
+                error=str(e),
+                duration_ms=duration_ms,
+            )
+
             return {
                 "step_id": step_id,
                 "step_index": step_index,
@@ -467,12 +1433,14 @@ class AgentRunner:
         self,
         step: Dict[str, Any],
         agent: Dict[str, Any],
+        on_chunk: Optional[Callable[[str], None]] = None,
     ) -> Dict[str, Any]:
         """执行模型调用步骤
 
         Args:
             step: 步骤配置
             agent: 智能体配置
+            on_chunk: 输出片段回调(可选), 提供时以流式请求调用模型
 
         Returns:
             执行结果
@@ -484,15 +1452,11 @@ class AgentRunner:
             model = "qwen-plus"
 
         messages = [
-            {"role": "system", "content": agent["system_prompt"]},
-            {"role": "user", "content": prompt},
+            ChatMessage(role="system", content=agent["system_prompt"]),
+            ChatMessage(role="user", content=prompt),
         ]
 
-        response = await self.provider_manager.chat(
-            messages=messages,
-            provider_name=provider,
-            model=model,
-        )
+        response = await self._chat(messages, provider, model, on_chunk)
         if not response:
             return {"error": "模型调用失败"}
         return {"content": response.content, "model": response.model}
@@ -501,18 +1465,68 @@ class AgentRunner:
         self,
         step: Dict[str, Any],
         agent: Dict[str, Any],
+        on_chunk: Optional[Callable[[str], None]] = None,
     ) -> Dict[str, Any]:
         """执行分析步骤
 
         Args:
             step: 步骤配置
             agent: 智能体配置
+            on_chunk: 输出片段回调(可选)
 
         Returns:
             分析结果
         """
         # 分析步骤通常是调用 LLM 进行思考和规划
-        return await self._execute_model_step(step, agent)
+        return await self._execute_model_step(step, agent, on_chunk)
+
+    async def _chat(
+        self,
+        messages: List[ChatMessage],
+        provider: str,
+        model: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        **kwargs: Any,
+    ) -> Optional[ChatResponse]:
+        """调用模型并把用量计入预算
+
+        提供 on_chunk 时以流式请求调用, 每个片段到达即回调, 用量按文本估算
+
+        Args:
+            messages: 消息列表
+            provider: Provider 名称
+            model: 模型名称
+            on_chunk: 输出片段回调(可选)
+            **kwargs: 其他模型参数(如 temperature)
+
+        Returns:
+            Optional[ChatResponse]: 模型响应
+        """
+        if on_chunk is None:
+            response = await self.provider_manager.chat(
+                messages=messages, provider_name=provider, model=model, **kwargs
+            )
+            self._record_usage(model, response)
+            return response
+
+        parts: List[str] = []
+        async for chunk in self.provider_manager.stream_chat(
+            messages=messages, provider_name=provider, model=model, **kwargs
+        ):
+            parts.append(chunk)
+            on_chunk(chunk)
+        content = "".join(parts)
+        response = ChatResponse(
+            content=content,
+            model=model,
+            provider=provider,
+            usage={
+                "prompt_tokens": estimate_tokens("".join(message.content for message in messages)),
+                "completion_tokens": estimate_tokens(content),
+            },
+        )
+        self._record_usage(model, response)
+        return response
 
     async def _generate_summary(
         self,
@@ -555,23 +1569,80 @@ class AgentRunner:
             model = "qwen-plus"
 
         messages = [
-            {"role": "system", "content": "你是一个任务总结助手,擅长归纳和总结。"},
-            {"role": "user", "content": summary_prompt},
+            ChatMessage(role="system", content="你是一个任务总结助手,擅长归纳和总结。"),
+            ChatMessage(role="user", content=summary_prompt),
         ]
 
+        on_chunk = None
+        if self._is_streaming():
+            def on_chunk(text: str) -> None:
+                self._publish(EventType.JOB_SUMMARY, text=text)
+
         try:
-            response = await self.provider_manager.chat(
-                messages=messages,
-                provider_name=provider,
-                model=model,
-                temperature=0.5,
-            )
-            return response.get("content", "执行完成")
+            response = await self._chat(messages, provider, model, on_chunk, temperature=0.5)
+            if not response:
+                raise RuntimeError("模型调用失败")
+            return response.content or "执行完成"
         except Exception:
             # 如果总结失败,返回简单总结
-            success_count = sum(1 for r in results if r.get("status") == "success")
-            total_count = len(results)
-            return f"执行了 {total_count} 个步骤,其中 {success_count} 个成功。"
+            return self._fallback_summary(plan, results)
+
+    @staticmethod
+    def _fallback_summary(
+        plan: Dict[str, Any],
+        results: List[Dict[str, Any]],
+        stop_reason: Optional[str] = None,
+    ) -> str:
+        """不调用模型的简单总结"""
+        success_count = sum(1 for r in results if r.get("status") == "success")
+        total_count = len(results)
+        summary = f"执行了 {total_count} 个步骤,其中 {success_count} 个成功。"
+        if stop_reason:
+            skipped = max(0, len(plan.get("steps", [])) - total_count)
+            summary += f"因{stop_reason}提前结束,{skipped} 个步骤未执行。"
+        return summary
+
+    @classmethod
+    def _template_summary(
+        cls,
+        goal: str,
+        plan: Dict[str, Any],
+        results: List[Dict[str, Any]],
+        stop_reason: Optional[str] = None,
+    ) -> str:
+        """由步骤结果生成的确定性总结(不调用模型)
+
+        Args:
+            goal: 用户目标
+            plan: 执行计划
+            results: 执行结果列表
+            stop_reason: 提前结束的原因
+
+        Returns:
+            总结文本
+        """
+        steps = plan.get("steps", [])
+        labels = {"success": "成功", "failed": "失败", "cancelled": "取消"}
+        lines = [f"目标: {goal}", cls._fallback_summary(plan, results, stop_reason)]
+        for result in sorted(results, key=lambda r: r.get("step_index", 0)):
+            index = result.get("step_index", 0)
+            step = steps[index] if 0 <= index < len(steps) else {}
+            name = step.get("name") or step.get("tool") or step.get("type") or f"步骤{index + 1}"
+            status = result.get("status", "unknown")
+            line = f"{index + 1}. [{labels.get(status, status)}] {name}"
+            output = result.get("result") if isinstance(result.get("result"), dict) else {}
+            error = result.get("error") or output.get("error")
+            if error:
+                line += f" - 错误: {error}"
+            else:
+                detail = next(
+                    (output[key] for key in ("content", "message", "stdout") if output.get(key)), None
+                )
+                if detail:
+                    text = " ".join(str(detail).split())
+                    line += f" - {text[:80]}{'...' if len(text) > 80 else ''}"
+            lines.append(line)
+        return "\n".join(lines)
 
     def _get_manual_workflow(self, agent: Dict[str, Any]) -> List[Dict[str, Any]]:
         """解析智能体预设的多步骤编排"""
@@ -596,6 +1667,10 @@ class AgentRunner:
                 normalized_step["params"] = step.get("params", {})
             elif step.get("prompt"):
                 normalized_step["prompt"] = step["prompt"]
+            if step.get("depends_on") is not None:
+                normalized_step["depends_on"] = step["depends_on"]
+            if step.get("continue_on_error"):
+                normalized_step["continue_on_error"] = True
 
             normalized.append(normalized_step)
 
@@ -606,6 +1681,7 @@ class AgentRunner:
         agent_id: str,
         goal: str,
         session_id: Optional[str] = None,
+        job_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """创建 JobRun 记录
 
@@ -613,11 +1689,12 @@ class AgentRunner:
             agent_id: 智能体ID
             goal: 用户目标
             session_id: 会话ID
+            job_id: 预先分配的 JobRun ID(可选)
 
         Returns:
             JobRun 字典
         """
-        job_id = str(uuid.uuid4())
+        job_id = job_id or str(uuid.uuid4())
 
         with self.db.get_session() as db_session:
             agent = db_session.query(Agent).filter_by(id=agent_id).first()
@@ -633,8 +1710,17 @@ class AgentRunner:
             )
             db_session.add(job_run)
             db_session.commit()
+            job_dict = job_run.to_dict()
 
-            return job_run.to_dict()
+        self._publish(
+            EventType.JOB_STATUS,
+            job_id=job_id,
+            agent_id=agent_id,
+            session_id=session_id,
+            name=job_dict.get("name"),
+            status="pending",
+        )
+        return job_dict
 
     async def _update_job_run(
         self,
@@ -653,3 +1739,12 @@ class AgentRunner:
                 for key, value in updates.items():
                     setattr(job_run, key, value)
                 db_session.commit()
+
+        if "status" in updates:
+            self._publish(
+                EventType.JOB_STATUS,
+                job_id=job_id,
+                status=updates["status"],
+                error=updates.get("error"),
+                summary=updates.get("summary"),
+            )
@@ -0,0 +1,149 @@
+"""智能体运行预算
+
+单次智能体运行除 max_steps 外还可限制总时长、Token 用量、费用与单步超时。
+预算来自全局默认配置(app.agent_budget)、智能体配置(stop_condition.budget)
+与运行上下文(context.budget), 后者覆盖前者; 运行器据此提前结束任务并记录原因
+"""
+
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from .stream_buffer import estimate_tokens
+
+
+@dataclass
+class RunBudget:
+    """单次运行的预算, None 表示不限"""
+
+    max_duration_sec: Optional[float] = None
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+    step_timeout_sec: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "RunBudget":
+        """从配置字典解析预算, 忽略未知字段"""
+        return cls().merged(data)
+
+    def merged(self, override: Optional[Dict[str, Any]]) -> "RunBudget":
+        """用 override 中出现的字段覆盖当前预算
+
+        Args:
+            override: 预算配置字典, 字段值为 0 或 null 时取消该项限制
+
+        Returns:
+            RunBudget: 合并后的预算
+        """
+        values = asdict(self)
+        for key, value in (override or {}).items():
+            if key in values:
+                values[key] = value or None
+        return RunBudget(**values)
+
+    @property
+    def enabled(self) -> bool:
+        """是否设置了任何限制"""
+        return any(value is not None for value in asdict(self).values())
+
+
+class BudgetTracker:
+    """统计单次运行的用量并判断预算是否耗尽"""
+
+    def __init__(self, budget: RunBudget, pricing: Optional[Dict[str, Dict[str, float]]] = None):
+        """初始化统计
+
+        Args:
+            budget: 运行预算
+            pricing: 模型单价, 模型名 -> {"input": 每千输入Token, "output": 每千输出Token}
+        """
+        self.budget = budget
+        self.pricing = pricing or {}
+        self.started_at = time.monotonic()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        # 预算耗尽的原因, 首次耗尽时记录
+        self.stop_reason: Optional[str] = None
+
+    @property
+    def total_tokens(self) -> int:
+        """累计 Token 数"""
+        return self.prompt_tokens + self.completion_tokens
+
+    def elapsed(self) -> float:
+        """已运行的秒数"""
+        return time.monotonic() - self.started_at
+
+    def remaining_time(self) -> Optional[float]:
+        """距时长上限的剩余秒数, 未设置时返回 None"""
+        if self.budget.max_duration_sec is None:
+            return None
+        return max(0.0, self.budget.max_duration_sec - self.elapsed())
+
+    def record(self, model: Optional[str], usage: Optional[Dict[str, int]]) -> None:
+        """记录一次模型调用的用量
+
+        Args:
+            model: 模型名称(计算费用)
+            usage: ChatResponse.usage
+        """
+        if not usage:
+            return
+        prompt = int(usage.get("prompt_tokens") or 0)
+        completion = int(usage.get("completion_tokens") or 0)
+        if not prompt and not completion:
+            completion = int(usage.get("total_tokens") or 0)
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        price = self.pricing.get(model or "")
+        if price:
+            self.cost += (
+                prompt * float(price.get("input", 0)) + completion * float(price.get("output", 0))
+            ) / 1000
+
+    def record_text(self, model: Optional[str], prompt: str, completion: str) -> None:
+        """按文本估算并记录用量(流式响应没有 usage 时)"""
+        self.record(model, {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(completion),
+        })
+
+    def exceeded(self) -> Optional[str]:
+        """检查预算是否耗尽
+
+        Returns:
+            Optional[str]: 耗尽的原因, 未耗尽时返回 None
+        """
+        if self.stop_reason is not None:
+            return self.stop_reason
+        budget = self.budget
+        if budget.max_duration_sec is not None and self.elapsed() >= budget.max_duration_sec:
+            self.time_out()
+        elif budget.max_tokens is not None and self.total_tokens >= budget.max_tokens:
+            self.stop_reason = f"超过 Token 预算({self.total_tokens}/{budget.max_tokens})"
+        elif budget.max_cost is not None and self.cost >= budget.max_cost:
+            self.stop_reason = f"超过费用预算({self.cost:.4f}/{budget.max_cost:g})"
+        return self.stop_reason
+
+    def time_out(self) -> str:
+        """记录时长预算耗尽(调用方的超时已触发时)
+
+        Returns:
+            str: 预算耗尽的原因
+        """
+        if self.stop_reason is None:
+            self.stop_reason = f"超过时长预算({self.budget.max_duration_sec:g}s)"
+        return self.stop_reason
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前用量与预算"""
+        return {
+            "budget": asdict(self.budget),
+            "elapsed_sec": round(self.elapsed(), 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cost": round(self.cost, 6),
+            "stop_reason": self.stop_reason,
+        }
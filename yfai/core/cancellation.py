@@ -0,0 +1,228 @@
+"""取消令牌与截止时间
+
+一次对话、工具调用或智能体任务持有一个 CancelToken, 经 contextvars 传递到
+Orchestrator、AgentRunner、ProviderManager 与 ShellOps。令牌被取消或到达截止
+时间时, 处于 cancel_scope 中的任务会立即被取消: 进行中的 HTTP 流随之关闭、
+子进程组被结束、任务记录标记为已取消, 占用的并发名额随即释放
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from yfai.localops.executor import OperationCancelled
+
+
+DEADLINE_REASON = "已超过截止时间"
+
+
+class DeadlineExceeded(OperationCancelled):
+    """操作超过截止时间"""
+
+
+class CancelToken:
+    """取消令牌
+
+    子令牌继承父令牌的截止时间, 父令牌取消时子令牌一并取消
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        parent: Optional["CancelToken"] = None,
+    ):
+        """初始化令牌
+
+        Args:
+            timeout: 从现在起的超时时间(秒), None 表示不限
+            parent: 父令牌
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if parent is not None and parent.deadline is not None:
+            deadline = parent.deadline if deadline is None else min(deadline, parent.deadline)
+        self.deadline: Optional[float] = deadline
+        self.reason: Optional[str] = None
+        self._callbacks: List[Callable[[str], Any]] = []
+        if parent is not None:
+            if parent.reason is not None:
+                self.reason = parent.reason
+            else:
+                parent.add_callback(self.cancel)
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消或已超过截止时间"""
+        return self.reason is not None or self.expired
+
+    @property
+    def expired(self) -> bool:
+        """是否已超过截止时间"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self) -> Optional[float]:
+        """距截止时间的剩余秒数, 未设置截止时间时返回 None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self, reason: str = "已取消") -> None:
+        """取消令牌, 重复调用无效
+
+        Args:
+            reason: 取消原因
+        """
+        if self.reason is not None:
+            return
+        self.reason = reason
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(reason)
+
+    def add_callback(self, callback: Callable[[str], Any]) -> None:
+        """注册取消回调, 令牌已取消时立即调用"""
+        if self.reason is not None:
+            callback(self.reason)
+        else:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[str], Any]) -> None:
+        """移除取消回调"""
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self) -> None:
+        """已取消时抛出 OperationCancelled, 超时时抛出 DeadlineExceeded"""
+        if self.reason == DEADLINE_REASON or (self.reason is None and self.expired):
+            raise DeadlineExceeded(DEADLINE_REASON)
+        if self.reason is not None:
+            raise OperationCancelled(self.reason)
+
+
+_current_token: ContextVar[Optional[CancelToken]] = ContextVar(
+    "yfai_cancel_token", default=None
+)
+
+
+def current_token() -> Optional[CancelToken]:
+    """获取当前上下文的取消令牌"""
+    return _current_token.get()
+
+
+def remaining_time(default: Optional[float] = None) -> Optional[float]:
+    """结合当前截止时间计算可用的超时时间
+
+    Args:
+        default: 调用方自身的超时时间
+
+    Returns:
+        Optional[float]: 两者中较小的一个, 都未设置时返回 None
+    """
+    token = _current_token.get()
+    remaining = token.remaining() if token is not None else None
+    if remaining is None:
+        return default
+    return remaining if default is None else min(default, remaining)
+
+
+def raise_if_cancelled() -> None:
+    """当前令牌已取消或超时时抛出异常"""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class cancel_scope:
+    """取消作用域
+
+    `async with cancel_scope(timeout=30) as token:` 内的代码在令牌取消或超时时被
+    立即取消, 退出作用域时转换为 OperationCancelled / DeadlineExceeded;
+    外部对任务的取消照常以 CancelledError 传播
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        token: Optional[CancelToken] = None,
+    ):
+        """初始化作用域
+
+        Args:
+            timeout: 超时时间(秒)
+            token: 调用方持有的令牌, 未提供时从当前上下文的令牌派生
+        """
+        self.timeout = timeout
+        self.token = token
+        self._task: Optional[asyncio.Task] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._fired = False
+        self._parent: Optional[CancelToken] = None
+        self._reset = None
+
+    async def __aenter__(self) -> CancelToken:
+        if self.token is None or self.timeout is not None:
+            self._parent = self.token or _current_token.get()
+            self.token = CancelToken(self.timeout, self._parent)
+        self.token.raise_if_cancelled()
+
+        self._task = asyncio.current_task()
+        remaining = self.token.remaining()
+        if remaining is not None:
+            self._handle = asyncio.get_running_loop().call_later(
+                remaining, self.token.cancel, DEADLINE_REASON
+            )
+        self.token.add_callback(self._on_cancel)
+        self._reset = _current_token.set(self.token)
+        return self.token
+
+    def _on_cancel(self, reason: str) -> None:
+        if not self._fired and self._task is not None:
+            self._fired = True
+            self._task.cancel()
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if self._handle is not None:
+            self._handle.cancel()
+        self.token.remove_callback(self._on_cancel)
+        if self._parent is not None:
+            self._parent.remove_callback(self.token.cancel)
+        _current_token.reset(self._reset)
+
+        if self._fired and self._task.uncancel() == 0 and exc_type is not None and issubclass(
+            exc_type, asyncio.CancelledError
+        ):
+            self.token.raise_if_cancelled()
+        return False
+
+
+async def iterate(source: AsyncIterator[Any], token: Optional[CancelToken]) -> AsyncIterator[Any]:
+    """按令牌逐项读取异步迭代器
+
+    等待每一项时处于取消作用域内, 令牌取消或超时会立即中断并关闭上游;
+    产出的片段交给调用方处理期间不受影响
+
+    Args:
+        source: 异步迭代器(如流式响应)
+        token: 取消令牌, None 时直接透传
+
+    Yields:
+        Any: 上游产出的每一项
+    """
+    if token is None:
+        async for item in source:
+            yield item
+        return
+
+    iterator = source.__aiter__()
+    try:
+        while True:
+            async with cancel_scope(token=token):
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield item
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,366 @@
+"""智能体运行的录制与回放
+
+录制模式下包装 Provider 与工具执行器, 把每次模型请求与响应(含流式片段的时间
+间隔)和每次工具结果写入录像文件(cassette); 回放模式用录像替代真实 Provider 与
+工具, 按录制时的节奏或加速重现同一次运行, 不访问网络。以 0 倍延迟回放时测得的
+耗时即运行器自身的开销, 可用于可重复的延迟基准与回归测试
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from ..providers.base import BaseProvider, ChatMessage, ChatResponse, ProviderType
+from ..providers.singleflight import request_key
+from .tool_cache import canonical_key
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(LookupError):
+    """回放时录像中没有匹配的请求"""
+
+
+class CassetteReplayError(RuntimeError):
+    """回放录制时上游抛出的异常"""
+
+
+class Cassette:
+    """录像: 按调用顺序保存的模型请求与工具调用
+
+    条目以请求键匹配, 相同请求按录制顺序依次取出, 因此并发步骤的完成顺序
+    与录制时不同也能正确回放
+    """
+
+    def __init__(self, meta: Optional[Dict[str, Any]] = None):
+        """初始化录像
+
+        Args:
+            meta: 运行信息(智能体、目标、Provider 类型等)
+        """
+        self.meta: Dict[str, Any] = dict(meta or {})
+        self.entries: List[Dict[str, Any]] = []
+        self._pending: Optional[Dict[Tuple[str, str], Deque[Dict[str, Any]]]] = None
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Cassette":
+        """读取录像文件
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            Cassette: 录像
+        """
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"不支持的录像版本: {data.get('version')}")
+        cassette = cls(data.get("meta"))
+        cassette.entries = list(data.get("entries", []))
+        return cassette
+
+    def save(self, path: Union[str, Path]) -> None:
+        """写入录像文件
+
+        Args:
+            path: 文件路径
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": CASSETTE_VERSION, "meta": self.meta, "entries": self.entries}
+        path.write_text(json.dumps(payload, ensure_ascii=False, indent=1, default=str), encoding="utf-8")
+
+    def record(self, kind: str, key: str, **data: Any) -> None:
+        """追加一条录制记录
+
+        Args:
+            kind: 类型 chat/stream/tool
+            key: 请求键
+            **data: 响应、耗时等
+        """
+        self.entries.append({"kind": kind, "key": key, **data})
+
+    def rewind(self) -> None:
+        """重置回放位置, 从头重放"""
+        self._pending = None
+        self.misses = 0
+
+    def take(self, kind: str, key: str) -> Dict[str, Any]:
+        """取出下一条匹配的记录
+
+        Args:
+            kind: 类型 chat/stream/tool
+            key: 请求键
+
+        Returns:
+            Dict[str, Any]: 录制记录
+
+        Raises:
+            CassetteMiss: 没有匹配的记录
+        """
+        if self._pending is None:
+            self._pending = defaultdict(deque)
+            for entry in self.entries:
+                self._pending[(entry["kind"], entry["key"])].append(entry)
+        queue = self._pending.get((kind, key))
+        if not queue:
+            self.misses += 1
+            raise CassetteMiss(f"录像中没有匹配的{kind}请求: {key[:80]}")
+        return queue.popleft()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取录像统计信息
+
+        Returns:
+            Dict[str, Any]: 各类条目数、未回放条目数与未命中次数
+        """
+        counts: Dict[str, int] = defaultdict(int)
+        for entry in self.entries:
+            counts[entry["kind"]] += 1
+        unused = (
+            sum(len(queue) for queue in self._pending.values())
+            if self._pending is not None else len(self.entries)
+        )
+        return {"entries": dict(counts), "unused": unused, "misses": self.misses}
+
+
+def _error_of(entry: Dict[str, Any]) -> Optional[CassetteReplayError]:
+    error = entry.get("error")
+    return CassetteReplayError(error) if error is not None else None
+
+
+async def _pause(delay: float, speed: float) -> None:
+    """按回放速度等待录制时的间隔, speed 为 0 时不等待"""
+    if speed > 0 and delay > 0:
+        await asyncio.sleep(delay / speed)
+
+
+class RecordingProvider(BaseProvider):
+    """包装真实 Provider, 把请求与响应写入录像"""
+
+    def __init__(self, name: str, inner: BaseProvider, cassette: Cassette):
+        """初始化录制 Provider
+
+        Args:
+            name: Provider 名称(请求键的一部分)
+            inner: 真实 Provider
+            cassette: 录像
+        """
+        super().__init__(inner.api_base, inner.api_key, inner.default_model, inner.timeout, inner.max_retries)
+        self.name = name
+        self.inner = inner
+        self.cassette = cassette
+
+    def get_provider_type(self) -> ProviderType:
+        return self.inner.get_provider_type()
+
+    async def chat(self, messages: List[ChatMessage], **kwargs) -> ChatResponse:
+        """发送聊天请求并录制响应与耗时"""
+        key = request_key(self.name, messages, **kwargs)
+        started = time.monotonic()
+        try:
+            response = await self.inner.chat(messages, **kwargs)
+        except Exception as e:
+            self.cassette.record("chat", key, latency=time.monotonic() - started, error=str(e))
+            raise
+        self.cassette.record(
+            "chat", key,
+            latency=time.monotonic() - started,
+            response=response.model_dump() if response is not None else None,
+        )
+        return response
+
+    async def stream_chat(self, messages: List[ChatMessage], **kwargs) -> AsyncIterator[str]:
+        """流式聊天并录制每个片段与其间隔"""
+        key = request_key(self.name, messages, **kwargs)
+        chunks: List[List[Any]] = []
+        error: Optional[str] = None
+        last = time.monotonic()
+        try:
+            async for chunk in self.inner.stream_chat(messages, **kwargs):
+                now = time.monotonic()
+                chunks.append([now - last, chunk])
+                last = now
+                yield chunk
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            # 调用方提前结束时只录到已收到的片段
+            self.cassette.record(
+                "stream", key, chunks=chunks, tail=time.monotonic() - last, error=error
+            )
+
+    async def health_check(self) -> bool:
+        return await self.inner.health_check()
+
+    async def list_models(self) -> List[str]:
+        return await self.inner.list_models()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayProvider(BaseProvider):
+    """按录像回放模型响应, 不访问网络"""
+
+    def __init__(
+        self,
+        name: str,
+        cassette: Cassette,
+        speed: float = 1.0,
+        provider_type: ProviderType = ProviderType.ECHO,
+        default_model: str = "default",
+    ):
+        """初始化回放 Provider
+
+        Args:
+            name: Provider 名称(需与录制时一致)
+            cassette: 录像
+            speed: 回放速度倍数, 1 为录制时的节奏, 0 为不等待
+            provider_type: 录制时的 Provider 类型
+            default_model: 默认模型
+        """
+        super().__init__(f"replay://{name}", None, default_model, timeout=0, max_retries=0)
+        self.name = name
+        self.cassette = cassette
+        self.speed = speed
+        self.provider_type = provider_type
+
+    def get_provider_type(self) -> ProviderType:
+        return self.provider_type
+
+    async def chat(self, messages: List[ChatMessage], **kwargs) -> ChatResponse:
+        """回放聊天响应"""
+        entry = self.cassette.take("chat", request_key(self.name, messages, **kwargs))
+        await _pause(entry.get("latency", 0), self.speed)
+        error = _error_of(entry)
+        if error is not None:
+            raise error
+        response = entry.get("response")
+        return ChatResponse(**response) if response is not None else None
+
+    async def stream_chat(self, messages: List[ChatMessage], **kwargs) -> AsyncIterator[str]:
+        """按录制的间隔回放流式片段"""
+        entry = self.cassette.take("stream", request_key(self.name, messages, **kwargs))
+        for delay, chunk in entry.get("chunks", []):
+            await _pause(delay, self.speed)
+            yield chunk
+        await _pause(entry.get("tail", 0), self.speed)
+        error = _error_of(entry)
+        if error is not None:
+            raise error
+
+    async def health_check(self) -> bool:
+        return True
+
+    async def list_models(self) -> List[str]:
+        return [self.default_model]
+
+
+ToolExecutor = Callable[[str, Dict[str, Any]], Any]
+
+
+class RecordingToolExecutor:
+    """包装工具执行器, 把每次工具结果与耗时写入录像"""
+
+    def __init__(self, executor: ToolExecutor, cassette: Cassette):
+        """初始化录制执行器
+
+        Args:
+            executor: 真实工具执行器
+            cassette: 录像
+        """
+        self.executor = executor
+        self.cassette = cassette
+
+    async def __call__(self, tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        key = canonical_key(tool_name, params)
+        started = time.monotonic()
+        try:
+            result = await self.executor(tool_name, params)
+        except Exception as e:
+            self.cassette.record("tool", key, duration=time.monotonic() - started, error=str(e))
+            raise
+        self.cassette.record(
+            "tool", key, duration=time.monotonic() - started, result=copy.deepcopy(result)
+        )
+        return result
+
+
+class ReplayToolExecutor:
+    """按录像回放工具结果"""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0):
+        """初始化回放执行器
+
+        Args:
+            cassette: 录像
+            speed: 回放速度倍数, 0 为不等待
+        """
+        self.cassette = cassette
+        self.speed = speed
+
+    async def __call__(self, tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        entry = self.cassette.take("tool", canonical_key(tool_name, params))
+        await _pause(entry.get("duration", 0), self.speed)
+        error = _error_of(entry)
+        if error is not None:
+            raise error
+        return copy.deepcopy(entry.get("result"))
+
+
+def install_recorder(runner: Any, cassette: Cassette) -> None:
+    """让运行器的所有 Provider 与工具调用写入录像
+
+    Args:
+        runner: AgentRunner
+        cassette: 录像
+    """
+    providers = runner.provider_manager.providers
+    for name, provider in list(providers.items()):
+        if not isinstance(provider, RecordingProvider):
+            providers[name] = RecordingProvider(name, provider, cassette)
+    cassette.meta["providers"] = {
+        name: provider.get_provider_type().value for name, provider in providers.items()
+    }
+    cassette.meta["tool_executor"] = runner.tool_executor is not None
+    if runner.tool_executor is not None:
+        runner.tool_executor = RecordingToolExecutor(runner.tool_executor, cassette)
+
+
+def install_replayer(runner: Any, cassette: Cassette, speed: float = 1.0) -> None:
+    """用录像替换运行器的所有 Provider 与工具执行器
+
+    录像中出现的 Provider 即使当前配置未启用也会注册, 保证降级顺序与录制时一致
+
+    Args:
+        runner: AgentRunner
+        cassette: 录像
+        speed: 回放速度倍数, 0 为不等待
+    """
+    manager = runner.provider_manager
+    types = dict(cassette.meta.get("providers", {}))
+    for name in manager.providers:
+        types.setdefault(name, manager.providers[name].get_provider_type().value)
+    for name, provider_type in types.items():
+        current = manager.providers.get(name)
+        manager.providers[name] = ReplayProvider(
+            name,
+            cassette,
+            speed=speed,
+            provider_type=ProviderType(provider_type),
+            default_model=current.default_model if current is not None else "default",
+        )
+        manager.health_status[name] = True
+    if cassette.meta.get("tool_executor", True):
+        runner.tool_executor = ReplayToolExecutor(cassette, speed=speed)
+    logger.info("回放录像: %s 条记录, 速度 %sx", len(cassette.entries), speed)
@@ -0,0 +1,67 @@
+"""请求上下文
+
+基于 contextvars 在一次请求(对话、工具调用、智能体任务)内传递会话、智能体、
+任务和追踪ID, 使多个会话与任务可以在同一进程中并行而不互相串号
+"""
+
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, Iterator, Optional
+
+
+def _new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """请求上下文"""
+
+    session_id: Optional[str] = None
+    agent_id: Optional[str] = None
+    job_id: Optional[str] = None
+    trace_id: str = field(default_factory=_new_trace_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_current_context: ContextVar[Optional[RequestContext]] = ContextVar(
+    "yfai_request_context", default=None
+)
+
+
+_EMPTY_CONTEXT = RequestContext(trace_id="")
+
+
+def current_context() -> RequestContext:
+    """获取当前请求上下文, 不在任何请求中时返回空上下文"""
+    return _current_context.get() or _EMPTY_CONTEXT
+
+
+@contextmanager
+def request_context(**fields: Any) -> Iterator[RequestContext]:
+    """在当前上下文基础上设置字段, 退出时恢复
+
+    值为 None 的字段沿用外层上下文
+
+    Args:
+        **fields: session_id / agent_id / job_id / trace_id
+
+    Yields:
+        RequestContext: 新的请求上下文
+    """
+    parent = _current_context.get() or RequestContext()
+    updates = {key: value for key, value in fields.items() if value is not None}
+    ctx = replace(parent, **updates)
+    token = _current_context.set(ctx)
+    try:
+        yield ctx
+    finally:
+        try:
+            _current_context.reset(token)
+        except ValueError:
+            # 异步生成器在其他上下文中被关闭(如被回收时), 原上下文已不再使用
+            pass
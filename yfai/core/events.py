@@ -0,0 +1,263 @@
+"""进程内事件总线
+
+AgentRunner、Orchestrator、AutomationScheduler、SecurityGuard 发布类型化事件,
+界面与无界面服务订阅事件获得实时进度, 不再轮询数据库。
+
+每个订阅持有独立的有界队列; 发布方从不等待, 订阅方消费过慢时按丢弃策略
+丢掉最旧或最新的事件, 慢订阅者不会拖慢任务执行
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+from .context import current_context
+
+
+class EventType(str, Enum):
+    """事件类型(以 `.` 分隔的命名空间, 订阅时可按前缀匹配)"""
+
+    JOB_STATUS = "job.status"
+    JOB_STEP = "job.step"
+    JOB_PLAN = "job.plan"
+    JOB_OUTPUT = "job.output"
+    JOB_SUMMARY = "job.summary"
+    JOB_RESULT = "job.result"
+    STREAM_CHUNK = "stream.chunk"
+    STREAM_DONE = "stream.done"
+    TOOL_CALL = "tool.call"
+    PROVIDER_HEALTH = "provider.health"
+    AUTOMATION_RUN = "automation.run"
+    APPROVAL_REQUESTED = "approval.requested"
+    APPROVAL_DECIDED = "approval.decided"
+
+
+class DropPolicy(str, Enum):
+    """订阅队列已满时的丢弃策略"""
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+
+@dataclass(frozen=True)
+class Event:
+    """总线事件"""
+
+    type: str
+    data: Dict[str, Any]
+    session_id: Optional[str] = None
+    agent_id: Optional[str] = None
+    job_id: Optional[str] = None
+    trace_id: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+    @classmethod
+    def create(cls, event_type: str, data: Dict[str, Any]) -> "Event":
+        """创建事件, 会话/智能体/任务/追踪ID 取自当前请求上下文, 可在 data 中显式覆盖"""
+        ctx = current_context()
+        return cls(
+            type=str(event_type.value if isinstance(event_type, EventType) else event_type),
+            data=data,
+            session_id=data.get("session_id") or ctx.session_id,
+            agent_id=data.get("agent_id") or ctx.agent_id,
+            job_id=data.get("job_id") or ctx.job_id,
+            trace_id=ctx.trace_id,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        return {
+            "type": self.type,
+            "data": self.data,
+            "session_id": self.session_id,
+            "agent_id": self.agent_id,
+            "job_id": self.job_id,
+            "trace_id": self.trace_id,
+            "timestamp": self.timestamp,
+        }
+
+
+_CLOSED = object()
+
+
+class Subscription:
+    """事件订阅
+
+    可用 `async for event in subscription` 消费, 关闭后迭代结束
+    """
+
+    def __init__(
+        self,
+        bus: "EventBus",
+        types: Sequence[str],
+        maxsize: int,
+        policy: DropPolicy,
+        predicate: Optional[Callable[[Event], bool]] = None,
+    ):
+        self.bus = bus
+        self.types = tuple(str(t.value if isinstance(t, EventType) else t) for t in types)
+        self.policy = policy
+        self.predicate = predicate
+        self.dropped = 0
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+
+    def matches(self, event: Event) -> bool:
+        """判断事件是否属于该订阅"""
+        if self.types and not any(
+            event.type == t or event.type.startswith(t.rstrip(".") + ".") for t in self.types
+        ):
+            return False
+        return self.predicate is None or self.predicate(event)
+
+    def _offer(self, event: Event) -> None:
+        """非阻塞投递, 队列已满时按策略丢弃"""
+        if self._queue.full():
+            self.dropped += 1
+            if self.policy == DropPolicy.DROP_NEWEST:
+                return
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """获取下一个事件
+
+        Args:
+            timeout: 等待超时(秒), None 表示一直等待
+
+        Returns:
+            Optional[Event]: 事件, 超时或订阅已关闭时返回 None
+        """
+        if self.closed and self._queue.empty():
+            return None
+        try:
+            item = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return None if item is _CLOSED else item
+
+    def drain(self) -> List[Event]:
+        """立即取出队列中已有的全部事件, 不等待"""
+        events: List[Event] = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is _CLOSED:
+                # 保留关闭标记, 让迭代正常结束
+                self._queue.put_nowait(item)
+                break
+            events.append(item)
+        return events
+
+    def close(self) -> None:
+        """取消订阅并唤醒等待中的消费者"""
+        if self.closed:
+            return
+        self.closed = True
+        self.bus.unsubscribe(self)
+        # 队列已满时不会有等待中的消费者, 取完剩余事件后依据 closed 结束
+        if not self._queue.full():
+            self._queue.put_nowait(_CLOSED)
+
+    def __aiter__(self) -> AsyncIterator[Event]:
+        return self
+
+    async def __anext__(self) -> Event:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class EventBus:
+    """进程内发布/订阅总线
+
+    发布与订阅均需在事件循环所在线程中调用
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 256,
+        policy: DropPolicy = DropPolicy.DROP_OLDEST,
+    ):
+        """初始化事件总线
+
+        Args:
+            queue_size: 每个订阅的默认队列长度
+            policy: 默认丢弃策略
+        """
+        self.queue_size = queue_size
+        self.policy = DropPolicy(policy)
+        self.published = 0
+        self._subscriptions: List[Subscription] = []
+
+    def subscribe(
+        self,
+        *types: str,
+        maxsize: Optional[int] = None,
+        policy: Optional[DropPolicy] = None,
+        predicate: Optional[Callable[[Event], bool]] = None,
+    ) -> Subscription:
+        """订阅事件
+
+        Args:
+            *types: 事件类型或前缀(如 "job" 匹配 job.status/job.step), 为空时订阅全部
+            maxsize: 队列长度, 默认使用总线配置
+            policy: 丢弃策略, 默认使用总线配置
+            predicate: 额外的过滤函数
+
+        Returns:
+            Subscription: 订阅对象, 用完需调用 close()
+        """
+        subscription = Subscription(
+            self,
+            types,
+            maxsize or self.queue_size,
+            DropPolicy(policy) if policy else self.policy,
+            predicate,
+        )
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """移除订阅"""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def publish(self, event_type: str, **data: Any) -> Event:
+        """发布事件, 不会阻塞
+
+        会话/智能体/任务/追踪ID 取自当前请求上下文, 也可在 data 中显式覆盖
+
+        Args:
+            event_type: 事件类型
+            **data: 事件数据
+
+        Returns:
+            Event: 已发布的事件
+        """
+        event = Event.create(event_type, data)
+        self.published += 1
+        for subscription in list(self._subscriptions):
+            if subscription.matches(event):
+                subscription._offer(event)
+        return event
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取总线统计
+
+        Returns:
+            Dict[str, Any]: 已发布事件数、订阅数与丢弃数
+        """
+        return {
+            "published": self.published,
+            "subscribers": len(self._subscriptions),
+            "dropped": sum(s.dropped for s in self._subscriptions),
+        }
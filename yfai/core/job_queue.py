@@ -0,0 +1,262 @@
+"""智能体任务队列
+
+界面、自动化调度、批量运行与无界面服务发起的智能体任务都经由同一个有界队列
+获得执行名额: 按优先级(交互 > 定时 > 批量)分配, 同时受总并发数、单个智能体
+并发数与单个 Provider 并发数限制。受限的任务不会挡住队列中其后可执行的任务;
+可为交互任务保留名额, 定时与批量任务最多占用其余名额, 后台自动化占满时交互任务
+仍能立即开始
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+
+class JobPriority(IntEnum):
+    """任务优先级, 数值越小越先执行"""
+
+    INTERACTIVE = 0
+    SCHEDULED = 1
+    BATCH = 2
+
+    @classmethod
+    def parse(cls, value: Any) -> "JobPriority":
+        """从名称("interactive"/"scheduled"/"batch")或数值解析优先级"""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            try:
+                return cls[value.upper()]
+            except KeyError:
+                raise ValueError(f"未知的任务优先级: {value}") from None
+        return cls(value)
+
+
+class JobQueueFull(RuntimeError):
+    """排队任务数已达上限"""
+
+
+@dataclass
+class _Entry:
+    """排队中的任务"""
+
+    priority: JobPriority
+    agent_id: Optional[str]
+    provider: Optional[str]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class AgentJobQueue:
+    """有界优先级任务队列
+
+    调用方通过 `async with queue.slot(...)` 等待名额, 任务在调用方自己的协程中
+    执行, 请求上下文与取消令牌照常生效; 等待期间被取消时直接出队
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queued: int = 100,
+        per_agent_limit: Optional[int] = 2,
+        provider_limits: Optional[Dict[str, int]] = None,
+        reserved_interactive: int = 0,
+    ):
+        """初始化任务队列
+
+        Args:
+            workers: 同时执行的任务数
+            max_queued: 最大排队任务数, 超过时抛出 JobQueueFull
+            per_agent_limit: 单个智能体同时执行的任务数, None 表示不限
+            provider_limits: 各 Provider 同时执行的任务数
+            reserved_interactive: 只分配给交互任务的名额数, 至少为后台任务留一个名额
+        """
+        self.workers = max(1, workers)
+        self.reserved_interactive = min(max(0, reserved_interactive), self.workers - 1)
+        self.max_queued = max_queued
+        self.per_agent_limit = per_agent_limit or None
+        self.provider_limits = dict(provider_limits or {})
+        self._queues: Dict[JobPriority, Deque[_Entry]] = {p: deque() for p in JobPriority}
+        self._running = 0
+        self._running_background = 0
+        self._running_by_agent: Dict[str, int] = {}
+        self._running_by_provider: Dict[str, int] = {}
+        # 统计
+        self._submitted = 0
+        self._granted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def queued(self) -> int:
+        """排队中的任务数"""
+        return sum(len(entries) for entries in self._queues.values())
+
+    async def acquire(
+        self,
+        priority: Any = JobPriority.INTERACTIVE,
+        agent_id: Optional[str] = None,
+        provider: Optional[str] = None,
+    ) -> _Entry:
+        """排队等待一个执行名额, 执行结束后需调用 release 归还
+
+        Args:
+            priority: 优先级
+            agent_id: 智能体ID(单个智能体并发限制)
+            provider: Provider 名称(单个 Provider 并发限制)
+
+        Returns:
+            名额凭据
+        """
+        entry = self._enqueue(JobPriority.parse(priority), agent_id, provider)
+        try:
+            await entry.future
+        except asyncio.CancelledError:
+            if entry.future.done() and not entry.future.cancelled():
+                # 名额已分配但调用方同时被取消, 归还名额
+                self._release(entry)
+            elif entry in self._queues[entry.priority]:
+                self._queues[entry.priority].remove(entry)
+            self._cancelled += 1
+            raise
+        return entry
+
+    def release(self, ticket: _Entry) -> None:
+        """归还执行名额
+
+        Args:
+            ticket: acquire 返回的凭据
+        """
+        self._completed += 1
+        self._release(ticket)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: Any = JobPriority.INTERACTIVE,
+        agent_id: Optional[str] = None,
+        provider: Optional[str] = None,
+    ) -> AsyncIterator[float]:
+        """等待并占用一个执行名额, 退出时释放
+
+        Args:
+            priority: 优先级
+            agent_id: 智能体ID(单个智能体并发限制)
+            provider: Provider 名称(单个 Provider 并发限制)
+
+        Yields:
+            float: 排队等待的秒数
+        """
+        ticket = await self.acquire(priority, agent_id, provider)
+        try:
+            yield ticket.future.result()
+        finally:
+            self.release(ticket)
+
+    def _enqueue(self, priority: JobPriority, agent_id: Optional[str], provider: Optional[str]) -> _Entry:
+        if self.queued >= self.max_queued:
+            self._rejected += 1
+            raise JobQueueFull(f"智能体任务排队已满({self.max_queued})")
+        entry = _Entry(
+            priority=priority,
+            agent_id=agent_id,
+            provider=provider,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._queues[priority].append(entry)
+        self._submitted += 1
+        self._dispatch()
+        return entry
+
+    def _eligible(self, entry: _Entry) -> bool:
+        if (
+            entry.priority != JobPriority.INTERACTIVE
+            and self._running_background >= self.workers - self.reserved_interactive
+        ):
+            # 保留的名额只给交互任务
+            return False
+        if (
+            entry.agent_id is not None
+            and self.per_agent_limit is not None
+            and self._running_by_agent.get(entry.agent_id, 0) >= self.per_agent_limit
+        ):
+            return False
+        limit = self.provider_limits.get(entry.provider) if entry.provider else None
+        if limit is not None and self._running_by_provider.get(entry.provider, 0) >= limit:
+            return False
+        return True
+
+    def _dispatch(self) -> None:
+        """按优先级把空闲名额分配给可执行的任务"""
+        for priority in JobPriority:
+            entries = self._queues[priority]
+            for entry in list(entries):
+                if self._running >= self.workers:
+                    return
+                if entry.future.done():
+                    # 等待方已被取消
+                    entries.remove(entry)
+                    continue
+                if not self._eligible(entry):
+                    continue
+                entries.remove(entry)
+                self._acquire(entry)
+                waited = time.monotonic() - entry.enqueued_at
+                self._granted += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                entry.future.set_result(waited)
+
+    def _acquire(self, entry: _Entry) -> None:
+        self._running += 1
+        if entry.priority != JobPriority.INTERACTIVE:
+            self._running_background += 1
+        if entry.agent_id is not None:
+            self._running_by_agent[entry.agent_id] = self._running_by_agent.get(entry.agent_id, 0) + 1
+        if entry.provider:
+            self._running_by_provider[entry.provider] = self._running_by_provider.get(entry.provider, 0) + 1
+
+    def _release(self, entry: _Entry) -> None:
+        self._running -= 1
+        if entry.priority != JobPriority.INTERACTIVE:
+            self._running_background -= 1
+        for counts, key in (
+            (self._running_by_agent, entry.agent_id),
+            (self._running_by_provider, entry.provider),
+        ):
+            if key is None or key not in counts:
+                continue
+            counts[key] -= 1
+            if counts[key] <= 0:
+                del counts[key]
+        self._dispatch()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息
+
+        Returns:
+            Dict[str, Any]: 排队深度、执行中任务数与等待时间
+        """
+        return {
+            "workers": self.workers,
+            "reserved_interactive": self.reserved_interactive,
+            "running": self._running,
+            "running_background": self._running_background,
+            "queued": self.queued,
+            "queued_by_priority": {p.name.lower(): len(self._queues[p]) for p in JobPriority},
+            "running_by_agent": dict(self._running_by_agent),
+            "running_by_provider": dict(self._running_by_provider),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "cancelled": self._cancelled,
+            "wait_avg_ms": round(self._wait_total / self._granted * 1000, 1) if self._granted else 0.0,
+            "wait_max_ms": round(self._wait_max * 1000, 1),
+        }
@@ -0,0 +1,258 @@
+"""结构化日志
+
+日志记录在调用线程中只做格式化与入队(不做任何 IO), 由后台线程的
+QueueListener 写出 JSON 行或文本行, 终端或磁盘缓慢时不会阻塞事件循环与流式输出。
+
+- 每条记录附带当前请求上下文的会话/智能体/任务/追踪ID
+- 支持按模块设置级别(如 yfai.providers: DEBUG, httpx: WARNING)
+- 相同来源的重复告警/错误在时间窗口内限流, 窗口结束后的下一条附带被抑制的次数
+- 队列满时直接丢弃并计数, 从不等待
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from .context import current_context
+
+
+_CONTEXT_FIELDS = ("session_id", "agent_id", "job_id", "trace_id")
+
+# LogRecord 的标准属性, 其余属性视为通过 extra 传入的结构化字段
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", *_CONTEXT_FIELDS, "suppressed",
+}
+
+
+class ContextFilter(logging.Filter):
+    """在调用线程中把请求上下文写入日志记录"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = current_context()
+        for name in _CONTEXT_FIELDS:
+            if not hasattr(record, name):
+                setattr(record, name, getattr(ctx, name) or None)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """重复告警/错误限流
+
+    以 (logger, 级别, 消息模板) 为键, 每个时间窗口内最多放行 burst 条,
+    其余丢弃; 窗口结束后放行的第一条记录带有 suppressed 字段
+    """
+
+    def __init__(self, window_sec: float = 60.0, burst: int = 5, min_level: int = logging.WARNING):
+        """初始化限流器
+
+        Args:
+            window_sec: 时间窗口(秒)
+            burst: 每个窗口放行的条数
+            min_level: 参与限流的最低级别
+        """
+        super().__init__()
+        self.window_sec = window_sec
+        self.burst = burst
+        self.min_level = min_level
+        self._lock = threading.Lock()
+        # 键 -> [窗口开始时间, 已放行条数, 已抑制条数]
+        self._state: Dict[Tuple[str, int, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level or self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or now - state[0] >= self.window_sec:
+                suppressed = state[2] if state else 0
+                self._state[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                if len(self._state) > 1024:
+                    self._prune(now)
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+    def _prune(self, now: float) -> None:
+        """清理已过期且没有被抑制记录的键"""
+        for key in [k for k, s in self._state.items() if now - s[0] >= self.window_sec and not s[2]]:
+            del self._state[key]
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in _CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value:
+                entry[name] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """便于终端阅读的文本格式, 附带追踪ID与抑制次数"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        ids = [f"{name}={getattr(record, name)}" for name in ("job_id", "trace_id") if getattr(record, name, None)]
+        if ids:
+            line += f" [{' '.join(ids)}]"
+        if getattr(record, "suppressed", 0):
+            line += f" (期间另有 {record.suppressed} 条相同日志被抑制)"
+        return line
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """非阻塞入队的 QueueHandler
+
+    在调用线程中完成消息格式化与异常文本渲染, 队列满时丢弃并计数
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# 未在配置中指定时使用的模块级别(httpx 在 INFO 级别会为每个请求输出一行)
+_DEFAULT_LEVELS = {"httpx": "WARNING", "httpcore": "WARNING"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[AsyncQueueHandler] = None
+
+
+def setup_logging(config: Dict[str, Any]) -> Optional[logging.handlers.QueueListener]:
+    """按配置初始化日志管道, 重复调用时先停止旧的后台线程
+
+    Args:
+        config: 完整配置字典, 读取其中的 logging 段
+
+    Returns:
+        Optional[logging.handlers.QueueListener]: 后台写出线程, 未启用时返回 None
+    """
+    global _listener, _queue_handler
+
+    log_config = config.get("logging", {}) or {}
+    shutdown_logging()
+    if not log_config.get("enabled", True):
+        return None
+
+    if log_config.get("format", "text") == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = TextFormatter()
+
+    handlers = []
+    if log_config.get("console", True):
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(formatter)
+        handlers.append(console)
+    if log_config.get("file"):
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_config["file"],
+            maxBytes=int(log_config.get("max_bytes", 10 * 1024 * 1024)),
+            backupCount=int(log_config.get("backup_count", 5)),
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(log_config.get("queue_size", 10000)))
+    _queue_handler = AsyncQueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter())
+    rate_limit = log_config.get("rate_limit", {}) or {}
+    if rate_limit.get("enabled", True):
+        _queue_handler.addFilter(RateLimitFilter(
+            window_sec=float(rate_limit.get("window_sec", 60)),
+            burst=int(rate_limit.get("burst", 5)),
+        ))
+
+    root = logging.getLogger()
+    root.setLevel(log_config.get("level", "INFO").upper())
+    root.addHandler(_queue_handler)
+    levels = {**_DEFAULT_LEVELS, **(log_config.get("levels", {}) or {})}
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(str(level).upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """停止后台写出线程, 写完队列中剩余的日志"""
+    global _listener, _queue_handler
+
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """日志管道统计
+
+    Returns:
+        Dict[str, Any]: 队列积压与丢弃条数
+    """
+    if _queue_handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+    }
+
+
+atexit.register(shutdown_logging)
@@ -3,17 +3,57 @@
 负责对话编排、工具路由、计划执行等核心逻辑
 """
 
+import asyncio
+import json
+import logging
+import time
 import uuid
+from collections import OrderedDict
+from contextlib import aclosing
 from datetime import datetime
-from typing import Any, AsyncIterator, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from ..providers import ChatMessage, ChatResponse, ProviderManager
-from ..mcp import McpClient, McpRegistry
-from ..localops import FileSystemOps, ShellOps, ProcessOps, NetworkOps
-from ..security import SecurityGuard, SecurityPolicy, ApprovalRequest, ApprovalResult, RiskLevel
+from sqlalchemy import or_
+
+from ..providers import ChatMessage, ChatResponse, CompactMessage, ProviderManager
+from ..localops import FileSystemOps, ShellOps, ProcessOps, NetworkOps, LocalOpsExecutor
+from ..security import SecurityGuard, SecurityPolicy, ApprovalRequest, RiskLevel
 from ..store import Assistant, DatabaseManager, Message, Session, ToolCall, ProviderStatus
-from ..search import SearchManager
+from ..store.db import AuditLog
 from .agent_runner import AgentRunner
+from .budget import RunBudget
+from .cancellation import CancelToken, OperationCancelled, cancel_scope, current_token, iterate
+from .context import current_context, request_context
+from .events import Event, EventBus, EventType
+from .job_queue import AgentJobQueue, JobPriority
+from .plan_cache import PlanCache
+from .stream_buffer import StreamBuffer
+from .tool_cache import ToolResultCache, path_resource
+from .tools import ParamValidator, ToolRegistry, ToolSpec
+
+logger = logging.getLogger(__name__)
+
+
+def _path_resources(params: Dict[str, Any]) -> List[str]:
+    """文件工具涉及的路径资源"""
+    return [path_resource(params["path"])]
+
+
+def _process_resources(params: Dict[str, Any]) -> List[str]:
+    """进程工具涉及的资源(进程表整体)"""
+    return ["process:"]
+
+
+def _is_http_get(params: Dict[str, Any]) -> bool:
+    """HTTP 请求是否为可缓存的 GET"""
+    return str(params.get("method", "GET")).upper() == "GET"
+
+
+def _http_resources(params: Dict[str, Any]) -> List[str]:
+    """HTTP 请求涉及的资源: GET 只依赖该 URL, 其他方法可能影响同一服务的任意 URL"""
+    if _is_http_get(params):
+        return [f"net:{params.get('url', '')}"]
+    return ["net:"]
 
 
 class Orchestrator:
@@ -22,12 +62,20 @@ class Orchestrator:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
 
+        # 进程内事件总线, 界面与无界面服务订阅任务进度/流式片段/状态变化
+        bus_config = config.get("app", {}).get("event_bus", {})
+        self.event_bus = EventBus(
+            queue_size=bus_config.get("queue_size", 256),
+            policy=bus_config.get("drop_policy", "drop_oldest"),
+        )
+
         # 初始化各模块
         self.provider_manager = ProviderManager(config)
-        self.mcp_registry = McpRegistry()
-        self.security_guard = SecurityGuard(config)
+        self.security_guard = SecurityGuard(config, event_bus=self.event_bus)
         self.security_policy = SecurityPolicy(config)
-        self.search_manager = SearchManager(config)
+        # MCP 注册中心与搜索管理器在首次使用时创建
+        self._mcp_registry = None
+        self._search_manager = None
 
         # 初始化数据库
         db_path = config.get("database", {}).get("path", "data/yfai.db")
@@ -44,6 +92,56 @@ class Orchestrator:
         self.process_ops = ProcessOps()
         self.network_ops = NetworkOps()
 
+        # 同步本地工具在有界线程池中执行, 不阻塞事件循环
+        executor_config = config.get("local_ops", {}).get("executor", {})
+        self.local_executor = LocalOpsExecutor(
+            max_workers=executor_config.get("max_workers", 4),
+            per_tool_limits=executor_config.get("per_tool_limits", {}),
+        )
+
+        # 幂等工具结果缓存: 任务内复用, 可选按 TTL 跨任务共享, 写入后按资源失效
+        cache_config = config.get("app", {}).get("tool_cache", {})
+        self.tool_cache = (
+            ToolResultCache(
+                shared_ttl=cache_config.get("shared_ttl_sec", 0),
+                max_entries=cache_config.get("max_entries", 1024),
+            )
+            if cache_config.get("enabled", True)
+            else None
+        )
+
+        # 注册工具
+        self.tool_registry = ToolRegistry(executor=self.local_executor, cache=self.tool_cache)
+        self._register_local_tools()
+        self.tool_registry.add_loader(self._register_mcp_tools)
+
+        # 智能体任务队列: 界面、定时、批量与服务发起的任务按优先级共享执行名额
+        queue_config = config.get("app", {}).get("agent_queue", {})
+        self.job_queue = AgentJobQueue(
+            workers=queue_config.get("workers", 4),
+            max_queued=queue_config.get("max_queued", 100),
+            per_agent_limit=queue_config.get("per_agent_limit", 2),
+            provider_limits=queue_config.get("provider_limits", {}),
+            reserved_interactive=queue_config.get("reserved_interactive", 1),
+        )
+
+        # 计划缓存(默认关闭): 相同智能体与目标的重复任务复用执行成功的计划
+        plan_cache_config = config.get("app", {}).get("plan_cache", {})
+        self.plan_cache = (
+            PlanCache(
+                ttl=plan_cache_config.get("ttl_sec", 86400),
+                max_entries=plan_cache_config.get("max_entries", 256),
+            )
+            if plan_cache_config.get("enabled", False)
+            else None
+        )
+
+        # 智能体运行预算默认值与模型单价
+        budget_config = config.get("app", {}).get("agent_budget", {})
+
+        # 智能体运行结束时的总结策略, 可按排队优先级覆盖
+        summary_config = config.get("app", {}).get("agent_summary", {})
+
         # 初始化 AgentRunner
         self.agent_runner = AgentRunner(
             db_manager=self.db_manager,
@@ -51,18 +149,69 @@ class Orchestrator:
             security_guard=self.security_guard,
             security_policy=self.security_policy,
             tool_executor=self._execute_tool_internal,
+            event_bus=self.event_bus,
+            max_parallel_steps=config.get("app", {}).get("agent_step_parallelism", 4),
+            stream_planning=config.get("app", {}).get("agent_stream_planning", True),
+            job_queue=self.job_queue,
+            tool_cache=self.tool_cache,
+            plan_cache=self.plan_cache,
+            budget=RunBudget.from_dict(budget_config),
+            pricing=budget_config.get("pricing", {}),
+            summary_strategy=summary_config.get("strategy", "llm"),
+            summary_by_priority=summary_config.get("by_priority", {}),
         )
 
-        # 当前会话
-        self.current_session_id: Optional[str] = None
+        # 函数调用: 单轮内独立工具调用的并发上限(审批由 SecurityGuard 逐个处理)
+        self.tool_parallelism = config.get("app", {}).get("tool_parallelism", 4)
+
+        # 流式响应落盘间隔
+        stream_config = config.get("app", {}).get("stream_checkpoint", {})
+        self.stream_checkpoint_interval = stream_config.get("interval_sec", 2.0)
+        self.stream_checkpoint_bytes = stream_config.get("bytes", 2048)
+        self._recover_interrupted_streams()
+
+        # 会话历史消息缓存(消息ID -> CompactMessage), 复用已编码的 JSON 片段
+        self.message_cache_size = config.get("app", {}).get("message_cache_size", 5000)
+        self._message_cache: "OrderedDict[str, CompactMessage]" = OrderedDict()
+
+        # 启动预热任务(由界面或服务在事件循环启动后触发)
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    @property
+    def mcp_registry(self):
+        """MCP 注册中心(首次访问时加载)"""
+        if self._mcp_registry is None:
+            from ..mcp import McpRegistry
+
+            self._mcp_registry = McpRegistry()
+        return self._mcp_registry
+
+    @property
+    def search_manager(self):
+        """搜索管理器(首次访问时创建)"""
+        if self._search_manager is None:
+            from ..search import SearchManager
+
+            self._search_manager = SearchManager(self.config)
+        return self._search_manager
+
+    @property
+    def current_session_id(self) -> Optional[str]:
+        """当前请求上下文中的会话ID"""
+        return current_context().session_id
 
     def update_config(self, new_config: Dict[str, Any]) -> None:
         """刷新运行时配置并重新初始化依赖"""
 
         self.config = new_config
-        self.provider_manager = ProviderManager(new_config)
+        old_manager, self.provider_manager = self.provider_manager, ProviderManager(new_config)
+        try:
+            asyncio.get_running_loop().create_task(old_manager.aclose())
+        except RuntimeError:
+            pass
         self.security_guard.apply_config(new_config)
         self.security_policy = SecurityPolicy(new_config)
+        self._search_manager = None
         self.agent_runner.provider_manager = self.provider_manager
         self.agent_runner.security_guard = self.security_guard
         self.agent_runner.security_policy = self.security_policy
@@ -114,7 +263,6 @@ class Orchestrator:
                         db_session.add(system_message)
                 db_session.commit()
 
-        self.current_session_id = session_id
         return session_id
 
     async def chat(
@@ -124,6 +272,8 @@ class Orchestrator:
         provider: Optional[str] = None,
         model: Optional[str] = None,
         stream: bool = False,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> ChatResponse:
         """发送聊天消息
 
@@ -133,80 +283,84 @@ class Orchestrator:
             provider: Provider名称
             model: 模型名称
             stream: 是否流式输出
+            timeout: 截止时间(秒), 超过后中断并抛出 DeadlineExceeded
+            cancel_token: 取消令牌, 调用 cancel() 可随时终止
 
         Returns:
             ChatResponse: 响应
         """
-        session_id = session_id or self.current_session_id
+        session_id = session_id or current_context().session_id
 
         if not session_id:
             session_id = await self.create_session()
 
-        requested_provider = provider or self.provider_manager.get_default_provider_name()
-        requested_model = model or self.provider_manager.get_default_model(requested_provider)
+        async with cancel_scope(timeout, cancel_token):
+            with request_context(session_id=session_id):
+                requested_provider = provider or self.provider_manager.get_default_provider_name()
+                requested_model = model or self.provider_manager.get_default_model(requested_provider)
 
-        # 保存用户消息
-        user_msg_id = str(uuid.uuid4())
-        with self.db_manager.get_session() as db_session:
-            message = Message(
-                id=user_msg_id,
-                session_id=session_id,
-                role="user",
-                content=user_message,
-                provider=requested_provider,
-                model=requested_model,
-            )
-            db_session.add(message)
-            db_session.commit()
+                # 保存用户消息
+                user_msg_id = str(uuid.uuid4())
+                with self.db_manager.get_session() as db_session:
+                    message = Message(
+                        id=user_msg_id,
+                        session_id=session_id,
+                        role="user",
+                        content=user_message,
+                        provider=requested_provider,
+                        model=requested_model,
+                    )
+                    db_session.add(message)
+                    db_session.commit()
 
-        # 获取会话历史
-        messages = await self._get_session_messages(session_id)
+                # 获取会话历史
+                messages = await self._get_session_messages(session_id)
 
-        # 添加当前消息
-        messages.append(ChatMessage(role="user", content=user_message))
+                # 添加当前消息
+                messages.append(ChatMessage(role="user", content=user_message))
 
-        # 调用Provider
-        response = await self.provider_manager.chat(
-            messages=messages,
-            provider_name=provider,
-            model=model,
-            stream=stream,
-        )
+                # 调用Provider
+                response = await self.provider_manager.chat(
+                    messages=messages,
+                    provider_name=provider,
+                    model=model,
+                    stream=stream,
+                )
 
-        if response:
-            provider_used = response.provider or requested_provider
-            model_used = response.model or requested_model
+                if response:
+                    provider_used = response.provider or requested_provider
+                    model_used = response.model or requested_model
 
-            # 更新 Provider 使用统计
-            await self._update_provider_usage(
-                provider_name=provider_used,
-                model_name=model_used,
-                success=True,
-            )
+                    # 更新 Provider 使用统计
+                    await self._update_provider_usage(
+                        provider_name=provider_used,
+                        model_name=model_used,
+                        success=True,
+                    )
 
-            # 保存助手消息
-            assistant_msg_id = str(uuid.uuid4())
-            with self.db_manager.get_session() as db_session:
-                message = Message(
-                    id=assistant_msg_id,
-                    session_id=session_id,
-                    role="assistant",
-                    content=response.content,
-                    provider=provider_used,
-                    model=model_used,
-                )
-                db_session.add(message)
-                db_session.commit()
-        else:
-            # 记录失败
-            await self._update_provider_usage(
-                provider_name=requested_provider,
-                model_name=requested_model,
-                success=False,
-                error="Provider 返回空响应",
-            )
+                    # 保存助手消息
+                    assistant_msg_id = str(uuid.uuid4())
+                    with self.db_manager.get_session() as db_session:
+                        message = Message(
+                            id=assistant_msg_id,
+                            session_id=session_id,
+                            role="assistant",
+                            content=response.content,
+                            provider=provider_used,
+                            model=model_used,
+                        )
+                        db_session.add(message)
+                        db_session.commit()
+                else:
+                    # 记录失败
+                    await self._update_provider_usage(
+                        provider_name=requested_provider,
+                        model_name=requested_model,
+                        success=False,
+                        error="Provider 返回空响应",
+                    )
 
-        return response
+                return response
 
     async def stream_chat(
         self,
@@ -215,6 +369,8 @@ class Orchestrator:
         provider: Optional[str] = None,
         model: Optional[str] = None,
         context: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> AsyncIterator[str]:
         """流式聊天
 
@@ -224,76 +380,561 @@ class Orchestrator:
             provider: Provider名称
             model: 模型名称
             context: 附加的系统/检索上下文
+            timeout: 截止时间(秒), 超过后中断并抛出 DeadlineExceeded
+            cancel_token: 取消令牌, 调用 cancel() 可随时终止
 
         Yields:
             str: 流式输出的文本片段
         """
-        session_id = session_id or self.current_session_id
+        session_id = session_id or current_context().session_id
 
         if not session_id:
             session_id = await self.create_session()
 
-        requested_provider = provider or self.provider_manager.get_default_provider_name()
-        requested_model = model or self.provider_manager.get_default_model(requested_provider)
+        with request_context(session_id=session_id):
+            requested_provider = provider or self.provider_manager.get_default_provider_name()
+            requested_model = model or self.provider_manager.get_default_model(requested_provider)
 
-        # 保存用户消息
-        user_msg_id = str(uuid.uuid4())
-        with self.db_manager.get_session() as db_session:
-            message = Message(
-                id=user_msg_id,
-                session_id=session_id,
-                role="user",
-                content=user_message,
-                provider=requested_provider,
-                model=requested_model,
+            # 保存用户消息
+            user_msg_id = str(uuid.uuid4())
+            with self.db_manager.get_session() as db_session:
+                message = Message(
+                    id=user_msg_id,
+                    session_id=session_id,
+                    role="user",
+                    content=user_message,
+                    provider=requested_provider,
+                    model=requested_model,
+                )
+                db_session.add(message)
+                db_session.commit()
+
+            # 获取会话历史
+            messages = await self._get_session_messages(session_id)
+            if context:
+                messages.append(ChatMessage(role="system", content=context))
+            messages.append(ChatMessage(role="user", content=user_message))
+
+            # 获取Provider
+            provider_obj = self.provider_manager.get_provider(provider)
+            provider_used = provider or self.provider_manager.get_default_provider_name()
+            if not provider_obj:
+                yield "错误: Provider不可用"
+                return
+
+            # 流式输出: 片段累积在缓冲区, 按间隔写入标记为进行中的助手消息,
+            # 取消或失败时保留已收到的内容
+            buffer = StreamBuffer(
+                checkpoint_interval=self.stream_checkpoint_interval,
+                checkpoint_bytes=self.stream_checkpoint_bytes,
             )
-            db_session.add(message)
-            db_session.commit()
+            assistant_msg_id = str(uuid.uuid4())
+            resolved_model = model or provider_obj.default_model
+            status = "complete"
+            error: Optional[str] = None
+            # 生成器跨 yield 无法包在单个取消作用域里, 改为逐片段等待时检查令牌
+            token = cancel_token or current_token()
+            if timeout is not None:
+                token = CancelToken(timeout, token)
+            try:
+                async for chunk in iterate(
+                    self.provider_manager.stream_chat(
+                        messages, provider_name=provider_used, model=model
+                    ),
+                    token,
+                ):
+                    buffer.append(chunk)
+                    self.event_bus.publish(
+                        EventType.STREAM_CHUNK,
+                        session_id=session_id,
+                        message_id=assistant_msg_id,
+                        chunk=chunk,
+                    )
+                    yield chunk
+                    if buffer.should_checkpoint():
+                        self._save_stream_message(
+                            assistant_msg_id, session_id, buffer, "streaming",
+                            provider_used, resolved_model,
+                        )
+                        buffer.mark_checkpoint()
+            except (asyncio.CancelledError, GeneratorExit):
+                status = "cancelled"
+                raise
+            except OperationCancelled as e:
+                status = "cancelled"
+                error = str(e)
+                raise
+            except Exception as e:
+                status = "failed"
+                error = str(e)
+                raise
+            finally:
+                buffer.finish()
+                if buffer.chunks or status == "complete":
+                    self._save_stream_message(
+                        assistant_msg_id, session_id, buffer, status,
+                        provider_used, resolved_model, error=error,
+                    )
+                self.event_bus.publish(
+                    EventType.STREAM_DONE,
+                    session_id=session_id,
+                    message_id=assistant_msg_id,
+                    status=status,
+                    error=error,
+                )
+                if status != "cancelled":
+                    # 更新 Provider 使用统计
+                    await self._update_provider_usage(
+                        provider_name=provider_used,
+                        model_name=resolved_model,
+                        success=status == "complete",
+                        error=error,
+                    )
+
+    async def compare_chat(
+        self,
+        user_message: str,
+        targets: List[Tuple[str, Optional[str]]],
+        session_id: Optional[str] = None,
+        context: Optional[str] = None,
+        winner: str = "fastest",
+        keep_alternates: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """对比模式: 同一上下文并发发给多个 Provider/模型, 合并输出各自的流
+
+        总耗时取决于最慢的模型而非各模型之和; 胜出的回复作为正常助手消息保存,
+        其余回复可选择以备选消息保存(不进入后续对话历史)
+
+        Args:
+            user_message: 用户消息
+            targets: (Provider名称, 模型名称) 列表, 模型为 None 时使用默认模型
+            session_id: 会话ID
+            context: 附加的系统/检索上下文
+            winner: 胜出规则: fastest(总耗时最短) / first_token(首字最快) / first(按 targets 顺序)
+            keep_alternates: 是否保存未胜出的回复
+
+        Yields:
+            Dict[str, Any]: 事件, type 为 chunk(片段) / done(单路结束, 含 TTFT 与 tokens/s) /
+            result(全部结束, 含胜出者)
+        """
+        if not targets:
+            raise ValueError("targets 不能为空")
+        if winner not in ("fastest", "first_token", "first"):
+            raise ValueError(f"未知的胜出规则: {winner}")
+
+        session_id = session_id or current_context().session_id
+        if not session_id:
+            session_id = await self.create_session()
+
+        with request_context(session_id=session_id):
+            with self.db_manager.get_session() as db_session:
+                db_session.add(Message(
+                    id=str(uuid.uuid4()),
+                    session_id=session_id,
+                    role="user",
+                    content=user_message,
+                    provider=targets[0][0],
+                    model=targets[0][1],
+                ))
+                db_session.commit()
+
+            # 上下文只组装一次, 各路共享
+            messages = await self._get_session_messages(session_id)
+            if context:
+                messages.append(ChatMessage(role="system", content=context))
+            messages.append(ChatMessage(role="user", content=user_message))
+
+            queue: asyncio.Queue = asyncio.Queue()
+            outcomes: List[Dict[str, Any]] = []
+            for index, (provider_name, model) in enumerate(targets):
+                # 对比需要明确的 Provider, 不回退到默认 Provider
+                provider_obj = self.provider_manager.providers.get(provider_name)
+                outcomes.append({
+                    "index": index,
+                    "message_id": str(uuid.uuid4()),
+                    "provider": provider_name,
+                    "model": model or (provider_obj.default_model if provider_obj else None),
+                    "buffer": StreamBuffer(),
+                    "error": None if provider_obj else f"Provider 不可用: {provider_name}",
+                })
+
+            async def run_target(outcome: Dict[str, Any]) -> None:
+                buffer: StreamBuffer = outcome["buffer"]
+                try:
+                    if outcome["error"]:
+                        return
+                    async for chunk in self.provider_manager.stream_chat(
+                        messages, provider_name=outcome["provider"], model=outcome["model"]
+                    ):
+                        buffer.append(chunk)
+                        self.event_bus.publish(
+                            EventType.STREAM_CHUNK,
+                            message_id=outcome["message_id"],
+                            chunk=chunk,
+                        )
+                        queue.put_nowait({"type": "chunk", "index": outcome["index"], "text": chunk})
+                except Exception as e:
+                    outcome["error"] = str(e) or type(e).__name__
+                finally:
+                    buffer.finish()
+                    queue.put_nowait({"type": "done", "index": outcome["index"]})
+
+            tasks = [asyncio.create_task(run_target(outcome)) for outcome in outcomes]
+            try:
+                remaining = len(tasks)
+                while remaining:
+                    event = await queue.get()
+                    if event["type"] == "done":
+                        remaining -= 1
+                        outcome = outcomes[event["index"]]
+                        event.update(self._compare_outcome(outcome))
+                    else:
+                        outcome = outcomes[event["index"]]
+                        event["provider"] = outcome["provider"]
+                        event["model"] = outcome["model"]
+                    yield event
+            finally:
+                # 调用方提前退出时取消仍在进行的流
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            succeeded = [o for o in outcomes if not o["error"] and o["buffer"].chunks]
+            chosen: Optional[Dict[str, Any]] = None
+            if succeeded:
+                if winner == "fastest":
+                    chosen = min(succeeded, key=lambda o: o["buffer"].ended_at)
+                elif winner == "first_token":
+                    chosen = min(succeeded, key=lambda o: o["buffer"].first_chunk_at)
+                else:
+                    chosen = succeeded[0]
+
+            group_id = str(uuid.uuid4())
+            for outcome in outcomes:
+                is_winner = outcome is chosen
+                if is_winner or (keep_alternates and outcome["buffer"].chunks):
+                    compare_meta = {
+                        "group_id": group_id,
+                        "winner": is_winner,
+                        "targets": len(outcomes),
+                    }
+                    self._save_stream_message(
+                        outcome["message_id"], session_id, outcome["buffer"],
+                        "complete" if not outcome["error"] else "failed",
+                        outcome["provider"], outcome["model"], error=outcome["error"],
+                        extra_metadata={"compare": compare_meta, "alternate": not is_winner},
+                    )
+                if outcome["provider"] in self.provider_manager.providers:
+                    await self._update_provider_usage(
+                        provider_name=outcome["provider"],
+                        model_name=outcome["model"],
+                        success=not outcome["error"],
+                        error=outcome["error"],
+                    )
+                self.event_bus.publish(
+                    EventType.STREAM_DONE,
+                    message_id=outcome["message_id"],
+                    status="complete" if not outcome["error"] else "failed",
+                    error=outcome["error"],
+                )
+
+            yield {
+                "type": "result",
+                "session_id": session_id,
+                "winner": chosen["index"] if chosen else None,
+                "message_id": chosen["message_id"] if chosen else None,
+                "results": [self._compare_outcome(o) for o in outcomes],
+            }
+
+    @staticmethod
+    def _compare_outcome(outcome: Dict[str, Any]) -> Dict[str, Any]:
+        """对比模式单路结果摘要"""
+        stats = outcome["buffer"].stats()
+        return {
+            "index": outcome["index"],
+            "provider": outcome["provider"],
+            "model": outcome["model"],
+            "content": outcome["buffer"].text(),
+            "error": outcome["error"],
+            "ttft_ms": stats.get("ttft_ms"),
+            "tokens_per_sec": stats.get("tokens_per_sec"),
+            "tokens_est": stats.get("tokens_est", 0),
+            "duration_ms": stats["duration_ms"],
+        }
+
+    def _save_stream_message(
+        self,
+        message_id: str,
+        session_id: str,
+        buffer: StreamBuffer,
+        status: str,
+        provider_name: Optional[str],
+        model_name: Optional[str],
+        error: Optional[str] = None,
+        extra_metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """写入或更新流式助手消息
+
+        Args:
+            message_id: 消息ID
+            session_id: 会话ID
+            buffer: 流式缓冲区
+            status: streaming / complete / cancelled / failed
+            provider_name: Provider名称
+            model_name: 模型名称
+            error: 错误信息
+            extra_metadata: 附加元数据
+        """
+        metadata: Dict[str, Any] = {"status": status, "usage": buffer.stats()}
+        if error:
+            metadata["error"] = error
+        if extra_metadata:
+            metadata.update(extra_metadata)
 
-        # 获取会话历史
-        messages = await self._get_session_messages(session_id)
-        if context:
-            messages.append(ChatMessage(role="system", content=context))
-        messages.append(ChatMessage(role="user", content=user_message))
-
-        # 获取Provider
-        provider_obj = self.provider_manager.get_provider(provider)
-        provider_used = provider or self.provider_manager.get_default_provider_name()
-        if not provider_obj:
-            yield "错误: Provider不可用"
-            return
-
-        # 流式输出
-        full_response = ""
-        async for chunk in provider_obj.stream_chat(messages, model=model):
-            full_response += chunk
-            yield chunk
-
-        # 保存完整响应
-        assistant_msg_id = str(uuid.uuid4())
-        resolved_model = model or provider_obj.default_model
         with self.db_manager.get_session() as db_session:
-            message = Message(
-                id=assistant_msg_id,
-                session_id=session_id,
-                role="assistant",
-                content=full_response,
-                provider=provider_used,
-                model=resolved_model,
-            )
-            db_session.add(message)
+            message = db_session.query(Message).filter(Message.id == message_id).first()
+            if not message:
+                message = Message(
+                    id=message_id,
+                    session_id=session_id,
+                    role="assistant",
+                    provider=provider_name,
+                    model=model_name,
+                )
+                db_session.add(message)
+            message.content = buffer.text()
+            message.message_metadata = json.dumps(metadata, ensure_ascii=False)
             db_session.commit()
 
-        # 更新 Provider 使用统计
-        await self._update_provider_usage(
-            provider_name=provider_used,
-            model_name=resolved_model,
-            success=True,
-        )
+    def _recover_interrupted_streams(self) -> None:
+        """将上次进程退出时仍处于进行中的流式消息标记为中断"""
+        try:
+            with self.db_manager.get_session() as db_session:
+                pending = (
+                    db_session.query(Message)
+                    .filter(Message.message_metadata.like('%"status": "streaming"%'))
+                    .all()
+                )
+                for message in pending:
+                    metadata = json.loads(message.message_metadata)
+                    metadata["status"] = "interrupted"
+                    message.message_metadata = json.dumps(metadata, ensure_ascii=False)
+                if pending:
+                    db_session.commit()
+        except Exception as e:
+            logger.warning("恢复中断的流式消息失败: %s", e)
+
+    async def chat_with_tools(
+        self,
+        user_message: str,
+        session_id: Optional[str] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        tools: Optional[List[str]] = None,
+        max_rounds: int = 5,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Optional[ChatResponse]:
+        """带函数调用的聊天
+
+        将工具定义随请求发送给模型; 模型一次返回的多个工具调用中, 互不冲突的
+        并发执行, 全部结果在下一次请求中一并回传, 直到模型给出最终回答
+
+        Args:
+            user_message: 用户消息
+            session_id: 会话ID
+            provider: Provider名称
+            model: 模型名称
+            tools: 可用工具名称, None 表示全部已注册工具
+            max_rounds: 最多的工具调用轮数
+            timeout: 截止时间(秒), 超过后中断并抛出 DeadlineExceeded
+            cancel_token: 取消令牌, 调用 cancel() 可随时终止
+
+        Returns:
+            ChatResponse: 最终响应
+        """
+        session_id = session_id or current_context().session_id
+
+        if not session_id:
+            session_id = await self.create_session()
+
+        async with cancel_scope(timeout, cancel_token):
+            with request_context(session_id=session_id):
+                requested_provider = provider or self.provider_manager.get_default_provider_name()
+                requested_model = model or self.provider_manager.get_default_model(requested_provider)
+
+                # 保存用户消息
+                with self.db_manager.get_session() as db_session:
+                    message = Message(
+                        id=str(uuid.uuid4()),
+                        session_id=session_id,
+                        role="user",
+                        content=user_message,
+                        provider=requested_provider,
+                        model=requested_model,
+                    )
+                    db_session.add(message)
+                    db_session.commit()
+
+                # 会话历史已包含刚保存的用户消息
+                messages = await self._get_session_messages(session_id)
+                schemas = self.tool_registry.get_schemas(tools)
+
+                response: Optional[ChatResponse] = None
+                for round_index in range(max_rounds + 1):
+                    # 最后一轮不再提供工具, 强制模型给出回答
+                    offer_tools = schemas if round_index < max_rounds else None
+                    response = await self.provider_manager.chat(
+                        messages=messages,
+                        provider_name=provider,
+                        model=model,
+                        tools=offer_tools,
+                        tool_choice="auto" if offer_tools else None,
+                    )
+                    if not response or not response.tool_calls:
+                        break
+
+                    messages.append(
+                        ChatMessage(
+                            role="assistant",
+                            content=response.content or "",
+                            tool_calls=response.tool_calls,
+                        )
+                    )
+                    results = await self._run_tool_calls(response.tool_calls, session_id)
+                    for call, result in zip(response.tool_calls, results):
+                        messages.append(
+                            ChatMessage(
+                                role="tool",
+                                content=json.dumps(result, ensure_ascii=False, default=str),
+                                tool_call_id=call.get("id"),
+                            )
+                        )
+
+                if response:
+                    provider_used = response.provider or requested_provider
+                    model_used = response.model or requested_model
+                    await self._update_provider_usage(
+                        provider_name=provider_used,
+                        model_name=model_used,
+                        success=True,
+                    )
+                    with self.db_manager.get_session() as db_session:
+                        message = Message(
+                            id=str(uuid.uuid4()),
+                            session_id=session_id,
+                            role="assistant",
+                            content=response.content or "",
+                            provider=provider_used,
+                            model=model_used,
+                        )
+                        db_session.add(message)
+                        db_session.commit()
+                else:
+                    await self._update_provider_usage(
+                        provider_name=requested_provider,
+                        model_name=requested_model,
+                        success=False,
+                        error="Provider 返回空响应",
+                    )
+
+                return response
+
+    async def _run_tool_calls(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        session_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """执行模型返回的一批工具调用
+
+        操作同一资源且含写入的调用按原顺序串行, 其余调用在并发上限内同时执行
+
+        Args:
+            tool_calls: 工具调用列表 (OpenAI 格式)
+            session_id: 会话ID
+
+        Returns:
+            List[Dict[str, Any]]: 与 tool_calls 顺序一致的执行结果
+        """
+        parsed = [self._parse_tool_call(call) for call in tool_calls]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(parsed)
+        semaphore = asyncio.Semaphore(max(1, self.tool_parallelism))
+
+        async def run_group(indexes: List[int]) -> None:
+            for index in indexes:
+                tool_name, params, error = parsed[index]
+                if error:
+                    results[index] = {"success": False, "error": error}
+                    continue
+                async with semaphore:
+                    try:
+                        results[index] = await self.execute_tool(tool_name, params, session_id)
+                    except Exception as e:
+                        results[index] = {"success": False, "error": str(e)}
+
+        await asyncio.gather(*(run_group(group) for group in self._group_tool_calls(parsed)))
+        return results
+
+    def _parse_tool_call(
+        self, call: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any], Optional[str]]:
+        """解析工具调用, 返回 (工具名称, 参数, 错误信息)"""
+        function = call.get("function") or {}
+        spec = self.tool_registry.get(function.get("name", ""))
+        if not spec:
+            return function.get("name", ""), {}, f"未知工具: {function.get('name')}"
+
+        arguments = function.get("arguments") or {}
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            except json.JSONDecodeError as e:
+                return spec.name, {}, f"工具参数不是合法JSON: {e}"
+        if not isinstance(arguments, dict):
+            return spec.name, {}, "工具参数必须是对象"
+        return spec.name, arguments, None
+
+    def _group_tool_calls(
+        self, parsed: List[Tuple[str, Dict[str, Any], Optional[str]]]
+    ) -> List[List[int]]:
+        """按资源冲突对工具调用分组
+
+        同一路径/进程上存在非只读调用时, 这些调用归为一组串行执行; 路径先规范化,
+        "./a.txt" 与 "a.txt" 视为同一资源。无法确定资源的非只读调用(如 shell.exec)
+        可能写入任意文件, 彼此之间也串行执行
+        """
+        keyed: Dict[str, List[int]] = {}
+        writes = set()
+        groups: List[List[int]] = []
+        for index, (tool_name, params, _error) in enumerate(parsed):
+            spec = self.tool_registry.get(tool_name)
+            write = not spec or not spec.is_idempotent(params)
+            if params.get("path"):
+                key = path_resource(params["path"])
+            elif params.get("pid") is not None:
+                key = f"process:{params['pid']}"
+            elif write:
+                key = "*"
+            else:
+                groups.append([index])
+                continue
+            keyed.setdefault(key, []).append(index)
+            if write:
+                writes.add(key)
+
+        for key, indexes in keyed.items():
+            if key in writes:
+                groups.append(indexes)
+            else:
+                groups.extend([index] for index in indexes)
+        return groups
 
     async def _get_session_messages(self, session_id: str) -> List[ChatMessage]:
         """获取会话消息历史
 
+        返回轻量的 CompactMessage; 已加载过的消息复用缓存对象, 其 JSON 片段
+        无需在每轮请求时重新编码
+
         Args:
             session_id: 会话ID
 
@@ -301,22 +942,39 @@ class Orchestrator:
             List[ChatMessage]: 消息列表
         """
         with self.db_manager.get_session() as db_session:
-            messages = (
-                db_session.query(Message)
+            # 对比模式未胜出的备选回复不进入对话历史
+            rows = (
+                db_session.query(Message.id, Message.role, Message.content)
                 .filter(Message.session_id == session_id)
+                .filter(or_(
+                    Message.message_metadata.is_(None),
+                    ~Message.message_metadata.contains('"alternate": true'),
+                ))
                 .order_by(Message.created_at)
                 .all()
             )
 
-            return [
-                ChatMessage(role=msg.role, content=msg.content) for msg in messages
-            ]
+        cache = self._message_cache
+        messages: List[ChatMessage] = []
+        for message_id, role, content in rows:
+            cached = cache.get(message_id)
+            if cached is None or cached.role != role or cached.content != content:
+                cached = CompactMessage(role=role, content=content)
+                cache[message_id] = cached
+            else:
+                cache.move_to_end(message_id)
+            messages.append(cached)
+        while len(cache) > self.message_cache_size:
+            cache.popitem(last=False)
+        return messages
 
     async def execute_tool(
         self,
         tool_name: str,
         params: Dict[str, Any],
         session_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
         """执行工具
 
@@ -324,88 +982,112 @@ class Orchestrator:
             tool_name: 工具名称
             params: 参数
             session_id: 会话ID
+            timeout: 截止时间(秒), 超过后中断并抛出 DeadlineExceeded
+            cancel_token: 取消令牌, 调用 cancel() 可随时终止
 
         Returns:
             Dict[str, Any]: 执行结果
         """
-        session_id = session_id or self.current_session_id
+        session_id = session_id or current_context().session_id
 
-        # 记录工具调用
-        tool_call_id = str(uuid.uuid4())
+        async with cancel_scope(timeout, cancel_token):
+            with request_context(session_id=session_id):
+                # 记录工具调用
+                tool_call_id = str(uuid.uuid4())
 
-        # 判断工具类型和风险等级
-        tool_type = self._get_tool_type(tool_name)
-        risk_level = self._get_risk_level(tool_name, params)
+                # 判断工具类型和风险等级
+                tool_type = self._get_tool_type(tool_name)
+                risk_level = self._get_risk_level(tool_name, params)
 
-        # 创建工具调用记录
-        with self.db_manager.get_session() as db_session:
-            tool_call = ToolCall(
-                id=tool_call_id,
-                session_id=session_id,
-                tool_name=tool_name,
-                tool_type=tool_type,
-                params=str(params),
-                risk_level=risk_level,
-                status="pending",
-                started_at=datetime.utcnow(),
-            )
-            db_session.add(tool_call)
-            db_session.commit()
+                # 创建工具调用记录
+                with self.db_manager.get_session() as db_session:
+                    tool_call = ToolCall(
+                        id=tool_call_id,
+                        session_id=session_id,
+                        tool_name=tool_name,
+                        tool_type=tool_type,
+                        params=str(params),
+                        risk_level=risk_level,
+                        status="pending",
+                        started_at=datetime.utcnow(),
+                    )
+                    db_session.add(tool_call)
+                    db_session.commit()
+                self.event_bus.publish(
+                    EventType.TOOL_CALL,
+                    tool_call_id=tool_call_id,
+                    tool_name=tool_name,
+                    risk_level=risk_level,
+                    status="pending",
+                )
 
-        # 检查是否需要审批
-        if self.security_guard._needs_approval(RiskLevel(risk_level)):
-            # 请求审批
-            approval_request = ApprovalRequest(
-                tool_name=tool_name,
-                tool_type=tool_type,
-                params=params,
-                risk_level=RiskLevel(risk_level),
-                description=f"执行工具: {tool_name}",
-            )
+                # 检查是否需要审批
+                if self.security_guard._needs_approval(RiskLevel(risk_level)):
+                    # 请求审批
+                    approval_request = ApprovalRequest(
+                        tool_name=tool_name,
+                        tool_type=tool_type,
+                        params=params,
+                        risk_level=RiskLevel(risk_level),
+                        description=f"执行工具: {tool_name}",
+                    )
 
-            approval_result = await self.security_guard.request_approval(
-                approval_request
-            )
+                    approval_result = await self.security_guard.request_approval(
+                        approval_request
+                    )
+
+                    if approval_result.status != "approved":
+                        # 更新工具调用记录
+                        with self.db_manager.get_session() as db_session:
+                            tool_call = (
+                                db_session.query(ToolCall)
+                                .filter(ToolCall.id == tool_call_id)
+                                .first()
+                            )
+                            if tool_call:
+                                tool_call.status = "rejected"
+                                tool_call.approved_by = approval_result.approved_by
+                                tool_call.ended_at = datetime.utcnow()
+                                db_session.commit()
+                        self.event_bus.publish(
+                            EventType.TOOL_CALL,
+                            tool_call_id=tool_call_id,
+                            tool_name=tool_name,
+                            status="rejected",
+                        )
+
+                        return {
+                            "success": False,
+                            "error": "操作被拒绝",
+                            "reason": approval_result.reason,
+                        }
+
+                # 执行工具
+                result = await self._execute_tool_internal(tool_name, params)
 
-            if approval_result.status != "approved":
                 # 更新工具调用记录
                 with self.db_manager.get_session() as db_session:
                     tool_call = (
-                        db_session.query(ToolCall)
-                        .filter(ToolCall.id == tool_call_id)
-                        .first()
+                        db_session.query(ToolCall).filter(ToolCall.id == tool_call_id).first()
                     )
                     if tool_call:
-                        tool_call.status = "rejected"
-                        tool_call.approved_by = approval_result.approved_by
+                        tool_call.status = "success" if result.get("success") else "failed"
+                        tool_call.stdout = str(result.get("stdout", ""))
+                        tool_call.stderr = str(result.get("stderr", ""))
+                        tool_call.error = result.get("error")
+                        tool_call.exit_code = result.get("exit_code", 0)
                         tool_call.ended_at = datetime.utcnow()
+                        tool_call.approved_by = "user"
                         db_session.commit()
+                self.event_bus.publish(
+                    EventType.TOOL_CALL,
+                    tool_call_id=tool_call_id,
+                    tool_name=tool_name,
+                    status="success" if result.get("success") else "failed",
+                    error=result.get("error"),
+                )
 
-                return {
-                    "success": False,
-                    "error": "操作被拒绝",
-                    "reason": approval_result.reason,
-                }
-
-        # 执行工具
-        result = await self._execute_tool_internal(tool_name, params)
-
-        # 更新工具调用记录
-        with self.db_manager.get_session() as db_session:
-            tool_call = (
-                db_session.query(ToolCall).filter(ToolCall.id == tool_call_id).first()
-            )
-            if tool_call:
-                tool_call.status = "success" if result.get("success") else "failed"
-                tool_call.stdout = str(result.get("stdout", ""))
-                tool_call.stderr = str(result.get("stderr", ""))
-                tool_call.error = result.get("error")
-                tool_call.exit_code = result.get("exit_code", 0)
-                tool_call.ended_at = datetime.utcnow()
-                tool_call.approved_by = "user"
-                db_session.commit()
-
-        return result
+                return result
 
     async def get_last_assistant_metadata(self, session_id: Optional[str]) -> Optional[Dict[str, Optional[str]]]:
         """获取指定会话最近一次助手消息的 Provider/模型信息"""
@@ -422,6 +1104,96 @@ class Orchestrator:
                 return None
             return {"provider": message.provider, "model": message.model}
 
+    def _register_local_tools(self) -> None:
+        """注册本地操作工具
+
+        风险等级沿用按名称推断的规则: 删除/终止为 high, 读取/列出为 low, 其余为 medium
+        """
+        self.tool_registry.register_many([
+            # 文件系统操作
+            ToolSpec("fs.read", self.fs_ops.read, risk_level="low",
+                     description="读取文件内容", aliases=["fs.read_file"],
+                     idempotent=True, resources=_path_resources),
+            ToolSpec("fs.write", self.fs_ops.write, risk_level="medium",
+                     description="写入文件", aliases=["fs.write_file"],
+                     resources=_path_resources),
+            ToolSpec("fs.list", self.fs_ops.list_dir, risk_level="low",
+                     description="列出目录内容", aliases=["fs.list_directory"],
+                     max_concurrency=2, idempotent=True, resources=_path_resources),
+            ToolSpec("fs.delete", self.fs_ops.delete, risk_level="high",
+                     description="删除文件或目录", resources=_path_resources),
+            ToolSpec("fs.search", self.fs_ops.search, risk_level="medium",
+                     description="按模式搜索文件", aliases=["fs.search_files"],
+                     max_concurrency=2, idempotent=True, resources=_path_resources),
+            # Shell操作(影响范围未知, 执行后清空缓存)
+            ToolSpec("shell.exec", self.shell_ops.execute, risk_level="medium",
+                     description="执行Shell命令", aliases=["shell.execute"]),
+            # 进程操作
+            ToolSpec("process.list", self.process_ops.list_processes, risk_level="low",
+                     description="列出进程", max_concurrency=1,
+                     idempotent=True, resources=_process_resources),
+            ToolSpec("process.get", self.process_ops.get_process, risk_level="medium",
+                     description="获取进程信息", idempotent=True, resources=_process_resources),
+            ToolSpec("process.kill", self.process_ops.kill_process, risk_level="high",
+                     description="终止进程", resources=_process_resources),
+            ToolSpec("process.system_info", self.process_ops.get_system_info, risk_level="medium",
+                     description="获取系统信息", aliases=["process.info"],
+                     max_concurrency=1, idempotent=True, resources=_process_resources),
+            # 网络操作(仅 GET 请求可缓存)
+            ToolSpec("net.http", self.network_ops.http_request, risk_level="medium",
+                     description="发送HTTP请求", aliases=["net.http_request"],
+                     on_result=self._on_net_http_result,
+                     idempotent=_is_http_get, resources=_http_resources),
+            ToolSpec("net.check_port", self.network_ops.check_port, risk_level="medium",
+                     description="检查端口是否开放", resources=lambda params: ["port:"]),
+            ToolSpec("net.local_ip", self.network_ops.get_local_ip, risk_level="medium",
+                     description="获取本机IP地址", aliases=["net.get_local_ip"],
+                     idempotent=True, resources=lambda params: ["host:"]),
+            ToolSpec("net.search", self._web_search, risk_level="medium",
+                     description="网络搜索", on_result=self._on_net_search_result,
+                     resources=lambda params: ["search:"]),
+        ])
+
+    def _register_mcp_tools(self) -> None:
+        """注册已启用 MCP 服务器声明的工具
+
+        与本地工具同名时以本地实现为准; 在首次需要未知工具或列出全部工具时执行
+        """
+        from ..mcp import McpClient
+
+        for server in self.mcp_registry.list_servers(enabled_only=True):
+            client = McpClient(
+                server.endpoint,
+                auth_token=server.get_auth_token(),
+                timeout=server.get_timeout(),
+            )
+            for tool_name in server.get_tools():
+                self.tool_registry.register(
+                    ToolSpec(
+                        tool_name,
+                        self._make_mcp_handler(client, tool_name),
+                        risk_level=self.mcp_registry.get_tool_risk_level(tool_name),
+                        tool_type="mcp",
+                        description=f"{server.name}: {tool_name}",
+                        is_async=True,
+                        validator=ParamValidator.permissive(),
+                    ),
+                    replace=False,
+                )
+
+    @staticmethod
+    def _make_mcp_handler(client, tool_name: str):
+        """构造调用 MCP 工具的处理函数"""
+
+        async def handler(**params) -> Dict[str, Any]:
+            result = await client.call_tool(tool_name, params)
+            if result is None:
+                return {"success": False, "error": f"MCP工具调用失败: {tool_name}"}
+            result.setdefault("success", True)
+            return result
+
+        return handler
+
     def _get_tool_type(self, tool_name: str) -> str:
         """获取工具类型
 
@@ -431,16 +1203,8 @@ class Orchestrator:
         Returns:
             str: 工具类型
         """
-        if tool_name.startswith("fs."):
-            return "local"
-        elif tool_name.startswith("shell."):
-            return "local"
-        elif tool_name.startswith("process."):
-            return "local"
-        elif tool_name.startswith("net."):
-            return "local"
-        else:
-            return "mcp"
+        spec = self.tool_registry.get(tool_name)
+        return spec.tool_type if spec else "mcp"
 
     def _get_risk_level(self, tool_name: str, params: Dict[str, Any]) -> str:
         """获取风险等级
@@ -452,15 +1216,8 @@ class Orchestrator:
         Returns:
             str: 风险等级
         """
-        # 根据工具名称判断
-        if "delete" in tool_name or "kill" in tool_name:
-            return "high"
-        elif "write" in tool_name or "exec" in tool_name:
-            return "medium"
-        elif "read" in tool_name or "list" in tool_name:
-            return "low"
-        else:
-            return "medium"
+        spec = self.tool_registry.get(tool_name)
+        return spec.risk_level if spec else "medium"
 
     async def _execute_tool_internal(
         self, tool_name: str, params: Dict[str, Any]
@@ -474,53 +1231,17 @@ class Orchestrator:
         Returns:
             Dict[str, Any]: 执行结果
         """
-        # 文件系统操作
-        if tool_name == "fs.read":
-            return self.fs_ops.read(**params)
-        elif tool_name == "fs.write":
-            return self.fs_ops.write(**params)
-        elif tool_name == "fs.list":
-            return self.fs_ops.list_dir(**params)
-        elif tool_name == "fs.delete":
-            return self.fs_ops.delete(**params)
-        elif tool_name == "fs.search":
-            return self.fs_ops.search(**params)
-
-        # Shell操作
-        elif tool_name == "shell.exec":
-            return await self.shell_ops.execute(**params)
-
-        # 进程操作
-        elif tool_name == "process.list":
-            return self.process_ops.list_processes(**params)
-        elif tool_name == "process.get":
-            return self.process_ops.get_process(**params)
-        elif tool_name == "process.kill":
-            return self.process_ops.kill_process(**params)
-        elif tool_name == "process.system_info":
-            return self.process_ops.get_system_info()
-
-        # 网络操作
-        elif tool_name == "net.http":
-            result = await self.network_ops.http_request(**params)
-            # 持久化网络内容到审计日志
-            if result.get("success") and result.get("body"):
-                await self._persist_web_content(params.get("url", ""), result.get("body", ""), params)
-            return result
-        elif tool_name == "net.check_port":
-            return self.network_ops.check_port(**params)
-        elif tool_name == "net.local_ip":
-            return self.network_ops.get_local_ip()
-        elif tool_name == "net.search":
-            # 网络搜索（假设后续会添加）
-            result = await self._web_search(**params)
-            # 持久化搜索结果
-            if result.get("success") and result.get("results"):
-                await self._persist_search_results(params.get("query", ""), result.get("results", []))
-            return result
+        return await self.tool_registry.invoke(tool_name, params)
 
-        else:
-            return {"success": False, "error": f"未知工具: {tool_name}"}
+    async def _on_net_http_result(self, params: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """持久化网络内容到审计日志"""
+        if result.get("body"):
+            await self._persist_web_content(params.get("url", ""), result.get("body", ""), params)
+
+    async def _on_net_search_result(self, params: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """持久化搜索结果"""
+        if result.get("results"):
+            await self._persist_search_results(params.get("query", ""), result.get("results", []))
 
     async def run_agent(
         self,
@@ -528,29 +1249,206 @@ class Orchestrator:
         goal: str,
         session_id: Optional[str] = None,
         context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+        priority: Any = JobPriority.INTERACTIVE,
     ) -> Dict[str, Any]:
         """运行智能体
 
+        任务经由任务队列按优先级与并发上限排队执行, 排队时间计入截止时间
+
         Args:
             agent_id: 智能体ID
             goal: 用户目标描述
             session_id: 会话ID(可选)
             context: 额外上下文(可选)
+            timeout: 截止时间(秒), 超过后中断并抛出 DeadlineExceeded
+            cancel_token: 取消令牌, 调用 cancel() 可随时终止
+            priority: 排队优先级(interactive / scheduled / batch)
 
         Returns:
             执行结果字典
         """
-        session_id = session_id or self.current_session_id
+        session_id = session_id or current_context().session_id
+
+        if not session_id:
+            session_id = await self.create_session(title=f"Agent: {goal[:50]}")
+
+        async with cancel_scope(timeout, cancel_token):
+            with request_context(session_id=session_id, agent_id=agent_id):
+                return await self.agent_runner.run_agent(
+                    agent_id=agent_id,
+                    goal=goal,
+                    session_id=session_id,
+                    context=context,
+                    priority=priority,
+                )
+
+    async def run_agent_stream(
+        self,
+        agent_id: str,
+        goal: str,
+        session_id: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+        priority: Any = JobPriority.INTERACTIVE,
+    ) -> AsyncIterator[Event]:
+        """运行智能体并实时交出计划、步骤、输出片段与总结事件
+
+        Args:
+            agent_id: 智能体ID
+            goal: 用户目标描述
+            session_id: 会话ID(可选)
+            context: 额外上下文(可选)
+            timeout: 截止时间(秒), 超过后中断并抛出 DeadlineExceeded
+            cancel_token: 取消令牌, 调用 cancel() 可随时终止
+            priority: 排队优先级(interactive / scheduled / batch)
+
+        Yields:
+            Event: 任务进度事件, 最后一个为携带执行结果的 job.result
+        """
+        session_id = session_id or current_context().session_id
 
         if not session_id:
             session_id = await self.create_session(title=f"Agent: {goal[:50]}")
 
-        return await self.agent_runner.run_agent(
+        # 生成器跨 yield 无法包在单个取消作用域里, 令牌交给执行任务的协程
+        token = cancel_token or current_token()
+        if timeout is not None:
+            token = CancelToken(timeout, token)
+        stream = self.agent_runner.run_agent_stream(
             agent_id=agent_id,
             goal=goal,
             session_id=session_id,
             context=context,
+            priority=priority,
+            cancel_token=token,
+        )
+        async with aclosing(stream):
+            async for event in stream:
+                yield event
+
+    async def resume_job(
+        self,
+        job_id: str,
+        context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+        priority: Any = JobPriority.INTERACTIVE,
+    ) -> Dict[str, Any]:
+        """从失败或中断处继续执行智能体任务, 已成功的步骤不再执行
+
+        Args:
+            job_id: JobRun ID
+            context: 额外上下文(可选)
+            timeout: 截止时间(秒), 超过后中断并抛出 DeadlineExceeded
+            cancel_token: 取消令牌, 调用 cancel() 可随时终止
+            priority: 排队优先级
+
+        Returns:
+            执行结果字典
+        """
+        async with cancel_scope(timeout, cancel_token):
+            return await self.agent_runner.resume_job(job_id, context=context, priority=priority)
+
+    def cancel_job(self, job_id: str, reason: str = "用户终止") -> bool:
+        """终止运行中的智能体任务
+
+        Args:
+            job_id: JobRun ID
+            reason: 取消原因
+
+        Returns:
+            bool: 任务是否在运行中
+        """
+        return self.agent_runner.cancel_job(job_id, reason)
+
+    def start_warmup(self) -> Optional[asyncio.Task]:
+        """在后台启动预热, 需在事件循环运行时调用
+
+        Returns:
+            Optional[asyncio.Task]: 预热任务, 未启用时返回 None
+        """
+        if not self.config.get("app", {}).get("warmup", {}).get("enabled", True):
+            return None
+        if self._warmup_task is None or self._warmup_task.done():
+            self._warmup_task = asyncio.get_running_loop().create_task(self.warmup())
+        return self._warmup_task
+
+    async def warmup(self) -> Dict[str, Any]:
+        """并发预热 Provider 连接、本地模型、MCP 服务器与搜索引擎
+
+        各项互不阻塞, 任一失败只记录在结果中; 首次对话复用已建立的连接和缓存的模型列表
+
+        Returns:
+            Dict[str, Any]: 各项预热结果与耗时
+        """
+        warmup_config = self.config.get("app", {}).get("warmup", {})
+        timeout = warmup_config.get("timeout_sec", 15)
+        started = time.perf_counter()
+
+        jobs = {
+            "providers": self.provider_manager.warmup(
+                preload_models=warmup_config.get("preload_ollama_model", True),
+                timeout=timeout,
+            )
+        }
+        if warmup_config.get("probe_mcp", True):
+            jobs["mcp"] = asyncio.wait_for(self._probe_mcp_servers(), timeout)
+        if warmup_config.get("probe_search", True):
+            jobs["search"] = asyncio.wait_for(self.search_manager.health_check_all(), timeout)
+
+        results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        summary: Dict[str, Any] = {}
+        for name, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                logger.warning("预热 %s 失败: %s", name, result or type(result).__name__)
+                summary[name] = {"error": str(result) or type(result).__name__}
+            else:
+                summary[name] = result
+
+        providers = summary.get("providers", {})
+        if "error" not in providers:
+            await self._update_provider_health_status(
+                {name: item.get("healthy", False) for name, item in providers.items()}
+            )
+        summary["elapsed_sec"] = round(time.perf_counter() - started, 3)
+        return summary
+
+    async def _probe_mcp_servers(self) -> Dict[str, bool]:
+        """注册 MCP 工具并探测已启用服务器的连通性
+
+        Returns:
+            Dict[str, bool]: 服务器名称 -> 是否可用
+        """
+        from ..mcp import McpClient
+
+        # 触发延迟注册, 首次调用 MCP 工具时无需再加载
+        self.tool_registry.names()
+        servers = self.mcp_registry.list_servers(enabled_only=True)
+        results = await asyncio.gather(
+            *(
+                McpClient(
+                    server.endpoint,
+                    auth_token=server.get_auth_token(),
+                    timeout=server.get_timeout(),
+                ).health_check()
+                for server in servers
+            ),
+            return_exceptions=True,
         )
+        return {
+            server.name: result is True for server, result in zip(servers, results)
+        }
+
+    async def shutdown(self) -> None:
+        """释放运行时资源"""
+        if self._warmup_task and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        await self.provider_manager.aclose()
+        self.local_executor.shutdown(wait=False)
+        self.db_manager.engine.dispose()
 
     async def health_check(self) -> Dict[str, Any]:
         """健康检查
@@ -600,7 +1498,8 @@ class Orchestrator:
 
                 db_session.commit()
         except Exception as e:
-            print(f"更新 Provider 健康状态失败: {e}")
+            logger.warning("更新 Provider 健康状态失败: %s", e)
+        self.event_bus.publish(EventType.PROVIDER_HEALTH, providers=dict(health_status))
 
     async def _update_provider_usage(
         self,
@@ -644,7 +1543,7 @@ class Orchestrator:
 
                 db_session.commit()
         except Exception as e:
-            print(f"更新 Provider 使用统计失败: {e}")
+            logger.warning("更新 Provider 使用统计失败: %s", e)
 
     async def _persist_web_content(
         self,
@@ -659,8 +1558,8 @@ class Orchestrator:
             content: 网页内容
             params: 请求参数
         """
+        ctx = current_context()
         try:
-            import json
             with self.db_manager.get_session() as db_session:
                 log = AuditLog(
                     id=str(uuid.uuid4()),
@@ -672,18 +1571,21 @@ class Orchestrator:
                         "url": url,
                         "method": params.get("method", "GET"),
                         "headers": params.get("headers"),
+                        "trace_id": ctx.trace_id,
+                        "agent_id": ctx.agent_id,
+                        "job_id": ctx.job_id,
                     }, ensure_ascii=False),
                     result_data=json.dumps({
                         "url": url,
                         "content_length": len(content),
                         "content_preview": content[:500] if len(content) > 500 else content,
                     }, ensure_ascii=False),
-                    session_id=self.current_session_id,
+                    session_id=ctx.session_id,
                 )
                 db_session.add(log)
                 db_session.commit()
         except Exception as e:
-            print(f"持久化网络内容失败: {e}")
+            logger.warning("持久化网络内容失败: %s", e)
 
     async def _persist_search_results(
         self,
@@ -696,8 +1598,8 @@ class Orchestrator:
             query: 搜索查询
             results: 搜索结果列表
         """
+        ctx = current_context()
         try:
-            import json
             with self.db_manager.get_session() as db_session:
                 log = AuditLog(
                     id=str(uuid.uuid4()),
@@ -707,18 +1609,21 @@ class Orchestrator:
                     risk_level="low",
                     request_data=json.dumps({
                         "query": query,
+                        "trace_id": ctx.trace_id,
+                        "agent_id": ctx.agent_id,
+                        "job_id": ctx.job_id,
                     }, ensure_ascii=False),
                     result_data=json.dumps({
                         "query": query,
                         "result_count": len(results),
                         "results": results[:5],  # 只保存前5个结果
                     }, ensure_ascii=False),
-                    session_id=self.current_session_id,
+                    session_id=ctx.session_id,
                 )
                 db_session.add(log)
                 db_session.commit()
         except Exception as e:
-            print(f"持久化搜索结果失败: {e}")
+            logger.warning("持久化搜索结果失败: %s", e)
 
     async def _web_search(self, query: str, count: int = 5, engine: Optional[str] = None) -> Dict[str, Any]:
         """执行网络搜索
@@ -0,0 +1,161 @@
+"""计划缓存
+
+定时或批量的自动化任务每次以相同目标运行同一智能体, 每次都要付出一次完整的
+规划调用。缓存按 (智能体ID, 智能体配置指纹, 可用工具, 规范化目标) 保存执行成功
+的计划, 在 TTL 内直接复用; 智能体配置或可用工具变化后键随之变化, 旧计划不再命中
+"""
+
+import copy
+import hashlib
+import json
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# 影响计划生成的智能体配置字段
+_PLANNING_FIELDS = (
+    "name",
+    "description",
+    "system_prompt",
+    "default_provider",
+    "default_model",
+    "max_steps",
+    "stop_condition",
+    "risk_level",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_goal(goal: str) -> str:
+    """规范化目标文本: 全角转半角、忽略大小写并合并空白"""
+    text = unicodedata.normalize("NFKC", goal or "")
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def agent_fingerprint(agent: Dict[str, Any]) -> str:
+    """智能体中影响规划的配置的摘要"""
+    payload = json.dumps(
+        {name: agent.get(name) for name in _PLANNING_FIELDS},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class _CachedPlan:
+    plan: Dict[str, Any]
+    stored_at: float
+
+
+class PlanCache:
+    """按智能体与目标缓存执行计划
+
+    只缓存执行成功的计划; 取出的计划由调用方校验, 校验失败或再次执行失败时
+    调用 invalidate 移除, 下次重新规划
+    """
+
+    def __init__(self, ttl: float = 86400.0, max_entries: int = 256):
+        """初始化缓存
+
+        Args:
+            ttl: 计划有效期(秒), 0 表示不过期
+            max_entries: 最大条目数, 超过时淘汰最久未使用的计划
+        """
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, _CachedPlan]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(agent: Dict[str, Any], goal: str) -> str:
+        """生成缓存键
+
+        Args:
+            agent: 智能体配置
+            goal: 用户目标
+
+        Returns:
+            str: 缓存键
+        """
+        payload = json.dumps(
+            [
+                agent.get("id"),
+                agent_fingerprint(agent),
+                sorted(agent.get("allowed_tools") or []),
+                normalize_goal(goal),
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查找计划
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[Dict[str, Any]]: 计划副本, 未命中或已过期时返回 None
+        """
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl > 0 and time.monotonic() - entry.stored_at > self.ttl:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry.plan)
+
+    def put(self, key: str, plan: Dict[str, Any]) -> None:
+        """保存计划
+
+        Args:
+            key: 缓存键
+            plan: 执行成功的计划
+        """
+        self._entries[key] = _CachedPlan(copy.deepcopy(plan), time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> bool:
+        """移除计划
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            bool: 是否存在并已移除
+        """
+        if self._entries.pop(key, None) is None:
+            return False
+        self.invalidations += 1
+        return True
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+
+        Returns:
+            Dict[str, Any]: 命中/未命中/失效次数与条目数
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,109 @@
+"""流式计划解析
+
+规划模型逐段输出计划 JSON 时, 每当 "steps" 数组中的一个步骤对象闭合就立即
+解析并交出该步骤, 调用方无需等待整个计划生成完毕即可开始执行
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# "steps" 数组的起始位置
+_STEPS_START = re.compile(r'"steps"\s*:\s*\[')
+# 结尾处尚未输出完整的 "steps" 键
+_STEPS_PARTIAL = re.compile(r'"steps"\s*(?::\s*)?$')
+
+
+class PlanStepParser:
+    """增量解析计划中的步骤
+
+    只跟踪字符串/转义状态与括号深度, 每个片段只扫描新增的字符; 已输出的片段
+    保存在列表中, 读取 text 时才拼接。单个步骤对象解析失败时跳过该步骤, 不影响后续步骤
+    """
+
+    def __init__(self):
+        self.finished = False
+        self._chunks: List[str] = []
+        self._head = ""
+        self._in_steps = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # 当前未闭合步骤已收到的部分
+        self._step_parts: Optional[List[str]] = None
+
+    @property
+    def text(self) -> str:
+        """已收到的完整输出"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """追加一段输出
+
+        Args:
+            chunk: 模型输出的文本片段
+
+        Returns:
+            List[Dict[str, Any]]: 本次新闭合的步骤
+        """
+        self._chunks.append(chunk)
+        if self.finished:
+            return []
+
+        if not self._in_steps:
+            self._head += chunk
+            match = _STEPS_START.search(self._head)
+            if not match:
+                # 只保留可能是 "steps" 键开头的结尾部分
+                partial = _STEPS_PARTIAL.search(self._head)
+                self._head = self._head[partial.start() if partial else -6:]
+                return []
+            self._in_steps = True
+            chunk = self._head[match.end():]
+            self._head = ""
+
+        return self._scan(chunk)
+
+    def _scan(self, data: str) -> List[Dict[str, Any]]:
+        """扫描新增文本, 返回其中闭合的步骤"""
+        steps: List[Dict[str, Any]] = []
+        start = 0
+        for i, char in enumerate(data):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._step_parts = []
+                    start = i
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # steps 数组结束
+                    self.finished = True
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._step_parts is not None:
+                    step = self._load("".join(self._step_parts) + data[start:i + 1])
+                    self._step_parts = None
+                    if step is not None:
+                        steps.append(step)
+        if self._step_parts is not None and not self.finished:
+            self._step_parts.append(data[start:])
+        return steps
+
+    @staticmethod
+    def _load(raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            step = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        return step if isinstance(step, dict) else None
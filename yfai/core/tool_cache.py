@@ -0,0 +1,181 @@
+"""工具结果缓存
+
+智能体计划中经常以相同参数重复调用只读工具(fs.read、fs.list、process.list、
+net.http GET 等)。声明为幂等的工具的成功结果按 "工具 + 规范化参数" 缓存在当前
+任务内, 可选地以 TTL 在任务之间共享; 写入类工具执行后, 与其资源重叠的缓存
+(如 fs.write 同一路径或其上级目录的列表)立即失效
+"""
+
+import copy
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def canonical_key(tool_name: str, params: Dict[str, Any]) -> str:
+    """生成缓存键: 工具名 + 按键排序的参数 JSON"""
+    return tool_name + ":" + json.dumps(
+        params or {}, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+
+
+def path_resource(path: Any) -> str:
+    """文件路径对应的资源标识"""
+    normalized = os.path.normcase(os.path.abspath(str(path))).replace("\\", "/")
+    return f"fs:{normalized.rstrip('/') or '/'}"
+
+
+def resources_overlap(a: str, b: str) -> bool:
+    """两个资源是否重叠
+
+    资源形如 "<类别>:<路径>", 同类别下路径相同或互为上下级即重叠;
+    只有类别(如 "process:")时覆盖该类别的全部资源
+    """
+    kind_a, _, path_a = a.partition(":")
+    kind_b, _, path_b = b.partition(":")
+    if kind_a != kind_b:
+        return False
+    if not path_a or not path_b or path_a == path_b:
+        return True
+    shorter, longer = sorted((path_a, path_b), key=len)
+    return longer.startswith(shorter if shorter.endswith("/") else shorter + "/")
+
+
+@dataclass
+class _CacheEntry:
+    result: Dict[str, Any]
+    resources: Optional[List[str]]
+    stored_at: float
+
+
+class ToolResultCache:
+    """幂等工具结果缓存
+
+    任务内缓存在任务结束时清除; shared_ttl 大于 0 时结果同时写入跨任务共享缓存,
+    超过 TTL 后失效
+    """
+
+    def __init__(self, shared_ttl: float = 0.0, max_entries: int = 1024):
+        """初始化缓存
+
+        Args:
+            shared_ttl: 跨任务共享缓存的有效期(秒), 0 表示只在任务内缓存
+            max_entries: 每个缓存域的最大条目数
+        """
+        self.shared_ttl = shared_ttl
+        self.max_entries = max_entries
+        self._jobs: Dict[str, Dict[str, _CacheEntry]] = {}
+        self._shared: Dict[str, _CacheEntry] = {}
+        # 每次失效递增, 用于丢弃与写入并发执行的读取结果
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def epoch(self) -> int:
+        """失效计数, 读取开始前记录, 写入缓存时比对"""
+        return self._epoch
+
+    def get(self, job_id: Optional[str], key: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """查找缓存
+
+        Args:
+            job_id: 当前任务ID, None 时只查共享缓存
+            key: 缓存键
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], str]]: (结果副本, 命中的缓存域 job/shared)
+        """
+        entry = self._jobs.get(job_id, {}).get(key) if job_id else None
+        scope = "job"
+        if entry is None and self.shared_ttl > 0:
+            entry = self._shared.get(key)
+            scope = "shared"
+            if entry is not None and time.monotonic() - entry.stored_at > self.shared_ttl:
+                del self._shared[key]
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(entry.result), scope
+
+    def put(
+        self,
+        job_id: Optional[str],
+        key: str,
+        result: Dict[str, Any],
+        resources: Optional[List[str]],
+        epoch: int,
+    ) -> bool:
+        """写入缓存
+
+        Args:
+            job_id: 当前任务ID
+            key: 缓存键
+            result: 工具结果
+            resources: 结果依赖的资源, None 表示依赖全部资源
+            epoch: 调用开始前的失效计数, 期间发生过失效时不写入
+
+        Returns:
+            bool: 是否写入
+        """
+        if epoch != self._epoch:
+            return False
+        entry = _CacheEntry(copy.deepcopy(result), resources, time.monotonic())
+        stores = []
+        if job_id:
+            stores.append(self._jobs.setdefault(job_id, {}))
+        if self.shared_ttl > 0:
+            stores.append(self._shared)
+        for store in stores:
+            if len(store) >= self.max_entries:
+                store.pop(next(iter(store)))
+            store[key] = entry
+        return bool(stores)
+
+    def invalidate(self, resources: Optional[List[str]] = None) -> int:
+        """使与资源重叠的缓存失效(所有任务与共享缓存)
+
+        Args:
+            resources: 被写入的资源, None 表示全部
+
+        Returns:
+            int: 失效的条目数
+        """
+        self._epoch += 1
+        removed = 0
+        for store in [*self._jobs.values(), self._shared]:
+            for key in [
+                key for key, entry in store.items()
+                if resources is None or entry.resources is None or any(
+                    resources_overlap(a, b) for a in resources for b in entry.resources
+                )
+            ]:
+                del store[key]
+                removed += 1
+        self.invalidations += removed
+        return removed
+
+    def drop_job(self, job_id: str) -> None:
+        """任务结束时清除其缓存"""
+        self._jobs.pop(job_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+
+        Returns:
+            Dict[str, Any]: 命中/未命中/失效次数与条目数
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "jobs": len(self._jobs),
+            "job_entries": sum(len(store) for store in self._jobs.values()),
+            "shared_entries": len(self._shared),
+            "shared_ttl": self.shared_ttl,
+        }
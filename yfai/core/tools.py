@@ -0,0 +1,415 @@
+"""工具注册表
+
+以表驱动方式管理可调用工具: 名称 -> 处理函数、同步/异步、风险等级、参数校验器,
+查找为 O(1), 本地操作与 MCP 工具在启动时注册
+"""
+
+import inspect
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Union
+
+from ..localops import LocalOpsExecutor
+from .context import current_context
+from .tool_cache import ToolResultCache, canonical_key
+
+logger = logging.getLogger(__name__)
+
+
+class ParamValidator:
+    """预编译的参数校验器
+
+    注册时根据处理函数签名计算出允许的参数和必填参数, 调用时只做集合运算
+    """
+
+    def __init__(
+        self,
+        allowed: Optional[FrozenSet[str]] = None,
+        required: FrozenSet[str] = frozenset(),
+    ):
+        """初始化校验器
+
+        Args:
+            allowed: 允许的参数名, None 表示不限制
+            required: 必填参数名
+        """
+        self.allowed = allowed
+        self.required = required
+
+    @classmethod
+    def from_callable(cls, func: Callable[..., Any]) -> "ParamValidator":
+        """根据函数签名生成校验器
+
+        Args:
+            func: 处理函数
+
+        Returns:
+            ParamValidator: 校验器
+        """
+        try:
+            signature = inspect.signature(func)
+        except (TypeError, ValueError):
+            return cls.permissive()
+
+        allowed = set()
+        required = set()
+        for name, param in signature.parameters.items():
+            if param.kind == inspect.Parameter.VAR_KEYWORD:
+                return cls(None, frozenset(required))
+            if param.kind in (
+                inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                inspect.Parameter.KEYWORD_ONLY,
+            ):
+                allowed.add(name)
+                if param.default is inspect.Parameter.empty:
+                    required.add(name)
+        return cls(frozenset(allowed), frozenset(required))
+
+    @classmethod
+    def permissive(cls) -> "ParamValidator":
+        """不做限制的校验器(用于参数未知的远程工具)"""
+        return cls(None, frozenset())
+
+    def validate(self, params: Dict[str, Any]) -> Optional[str]:
+        """校验参数
+
+        Args:
+            params: 参数字典
+
+        Returns:
+            Optional[str]: 错误信息, 通过时返回 None
+        """
+        keys = params.keys()
+        missing = self.required - keys
+        if missing:
+            return f"缺少参数: {', '.join(sorted(missing))}"
+        if self.allowed is not None:
+            unknown = keys - self.allowed
+            if unknown:
+                return f"未知参数: {', '.join(sorted(unknown))}"
+        return None
+
+
+_JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    dict: "object",
+    list: "array",
+}
+
+
+def _json_type(annotation: Any) -> Optional[str]:
+    """将类型注解映射为 JSON Schema 类型"""
+    origin = getattr(annotation, "__origin__", None)
+    if origin is not None and origin not in _JSON_TYPES:
+        # Optional[X] / Union[X, None]
+        args = [arg for arg in getattr(annotation, "__args__", ()) if arg is not type(None)]
+        return _json_type(args[0]) if len(args) == 1 else None
+    return _JSON_TYPES.get(origin or annotation)
+
+
+def build_parameters_schema(func: Callable[..., Any]) -> Dict[str, Any]:
+    """根据函数签名生成函数调用所需的参数 JSON Schema
+
+    Args:
+        func: 处理函数
+
+    Returns:
+        Dict[str, Any]: JSON Schema
+    """
+    schema: Dict[str, Any] = {"type": "object", "properties": {}}
+    try:
+        signature = inspect.signature(func)
+    except (TypeError, ValueError):
+        return schema
+
+    required = []
+    for name, param in signature.parameters.items():
+        if param.kind == inspect.Parameter.VAR_KEYWORD:
+            schema["additionalProperties"] = True
+            continue
+        if param.kind not in (
+            inspect.Parameter.POSITIONAL_OR_KEYWORD,
+            inspect.Parameter.KEYWORD_ONLY,
+        ):
+            continue
+        prop: Dict[str, Any] = {}
+        json_type = _json_type(param.annotation)
+        if json_type:
+            prop["type"] = json_type
+        if param.default is inspect.Parameter.empty:
+            required.append(name)
+        elif param.default is not None:
+            prop["default"] = param.default
+        schema["properties"][name] = prop
+    if required:
+        schema["required"] = required
+    return schema
+
+
+@dataclass
+class ToolSpec:
+    """工具定义"""
+
+    name: str
+    handler: Callable[..., Any]
+    risk_level: str = "medium"
+    tool_type: str = "local"
+    description: str = ""
+    is_async: Optional[bool] = None
+    validator: Optional[ParamValidator] = None
+    # 执行成功后的附加处理(如持久化审计), 签名: (params, result) -> Awaitable[None]
+    on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]] = None
+    aliases: List[str] = field(default_factory=list)
+    # 同步处理函数在线程池中的默认并发上限, None 表示不限制
+    max_concurrency: Optional[int] = None
+
+    # 函数调用参数的 JSON Schema, 默认由处理函数签名生成
+    parameters: Optional[Dict[str, Any]] = None
+
+    # 幂等(只读)工具的成功结果可缓存; 也可以是按参数判断的函数(如 net.http 仅 GET)
+    idempotent: Union[bool, Callable[[Dict[str, Any]], bool]] = False
+    # 工具读取或写入的资源(如 "fs:/path"), 写入后与之重叠的缓存失效; None 表示全部资源
+    resources: Optional[Callable[[Dict[str, Any]], List[str]]] = None
+
+    def __post_init__(self):
+        if self.is_async is None:
+            self.is_async = inspect.iscoroutinefunction(self.handler)
+        if self.validator is None:
+            self.validator = ParamValidator.from_callable(self.handler)
+        if self.parameters is None:
+            self.parameters = build_parameters_schema(self.handler)
+
+    def is_idempotent(self, params: Dict[str, Any]) -> bool:
+        """以给定参数调用时是否幂等"""
+        if callable(self.idempotent):
+            return bool(self.idempotent(params))
+        return self.idempotent
+
+    def get_resources(self, params: Dict[str, Any]) -> Optional[List[str]]:
+        """以给定参数调用时涉及的资源, 无法确定时返回 None"""
+        if self.resources is None:
+            return None
+        try:
+            return list(self.resources(params))
+        except Exception:
+            return None
+
+    @property
+    def function_name(self) -> str:
+        """函数调用中使用的名称(模型侧函数名不允许包含点号)"""
+        return self.name.replace(".", "__")
+
+    def to_schema(self) -> Dict[str, Any]:
+        """转换为 OpenAI 兼容的工具定义
+
+        Returns:
+            Dict[str, Any]: 工具定义
+        """
+        return {
+            "type": "function",
+            "function": {
+                "name": self.function_name,
+                "description": self.description or self.name,
+                "parameters": self.parameters,
+            },
+        }
+
+
+class ToolRegistry:
+    """工具注册表"""
+
+    def __init__(
+        self,
+        executor: Optional[LocalOpsExecutor] = None,
+        cache: Optional[ToolResultCache] = None,
+    ):
+        """初始化工具注册表
+
+        Args:
+            executor: 同步工具使用的线程池执行器, None 时直接在事件循环中调用
+            cache: 幂等工具结果缓存(可选)
+        """
+        self.executor = executor
+        self.cache = cache
+        self._tools: Dict[str, ToolSpec] = {}
+        self._aliases: Dict[str, str] = {}
+        self._loaders: List[Callable[[], None]] = []
+
+    def add_loader(self, loader: Callable[[], None]) -> None:
+        """登记延迟注册函数
+
+        在首次查找不到工具或列出工具时才执行, 用于按需加载 MCP 等外部工具源
+
+        Args:
+            loader: 注册函数
+        """
+        self._loaders.append(loader)
+
+    def _run_loaders(self) -> bool:
+        """执行尚未运行的延迟注册函数, 返回是否有执行"""
+        if not self._loaders:
+            return False
+        loaders, self._loaders = self._loaders, []
+        for loader in loaders:
+            try:
+                loader()
+            except Exception as e:
+                logger.error("加载工具失败: %s", e)
+        return True
+
+    def register(self, spec: ToolSpec, replace: bool = True) -> bool:
+        """注册工具
+
+        Args:
+            spec: 工具定义
+            replace: 同名工具已存在时是否覆盖
+
+        Returns:
+            bool: 是否注册成功
+        """
+        if not replace and self._lookup(spec.name) is not None:
+            return False
+        self._tools[spec.name] = spec
+        self._aliases.pop(spec.name, None)
+        for alias in [spec.function_name, *spec.aliases]:
+            if alias == spec.name:
+                continue
+            if alias not in self._tools:
+                self._aliases[alias] = spec.name
+        return True
+
+    def register_many(self, specs: Iterable[ToolSpec]) -> None:
+        """批量注册工具"""
+        for spec in specs:
+            self.register(spec)
+
+    def unregister(self, name: str) -> None:
+        """注销工具及其别名"""
+        spec = self._tools.pop(name, None)
+        if spec:
+            for alias in [spec.function_name, *spec.aliases]:
+                if self._aliases.get(alias) == name:
+                    del self._aliases[alias]
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        """按名称或别名查找工具"""
+        spec = self._lookup(name)
+        if spec is None and self._run_loaders():
+            spec = self._lookup(name)
+        return spec
+
+    def _lookup(self, name: str) -> Optional[ToolSpec]:
+        spec = self._tools.get(name)
+        if spec is None:
+            canonical = self._aliases.get(name)
+            if canonical:
+                spec = self._tools.get(canonical)
+        return spec
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def names(self) -> List[str]:
+        """列出所有工具名称(不含别名)"""
+        self._run_loaders()
+        return list(self._tools.keys())
+
+    def list_specs(self, tool_type: Optional[str] = None) -> List[ToolSpec]:
+        """列出工具定义
+
+        Args:
+            tool_type: 按工具类型过滤 (local / mcp)
+
+        Returns:
+            List[ToolSpec]: 工具定义列表
+        """
+        self._run_loaders()
+        specs = list(self._tools.values())
+        if tool_type:
+            specs = [spec for spec in specs if spec.tool_type == tool_type]
+        return specs
+
+    def get_schemas(self, names: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """获取函数调用使用的工具定义
+
+        Args:
+            names: 工具名称或别名, None 表示全部工具
+
+        Returns:
+            List[Dict[str, Any]]: 工具定义列表
+        """
+        if names is None:
+            self._run_loaders()
+            specs = list(self._tools.values())
+        else:
+            specs = []
+            seen = set()
+            for name in names:
+                spec = self.get(name)
+                if spec and spec.name not in seen:
+                    specs.append(spec)
+                    seen.add(spec.name)
+        return [spec.to_schema() for spec in specs]
+
+    async def invoke(self, name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """调用工具
+
+        幂等工具命中缓存时直接返回缓存结果(带 cached 字段, 值为 job / shared);
+        非幂等工具执行后使与其资源重叠的缓存失效
+
+        Args:
+            name: 工具名称或别名
+            params: 参数
+
+        Returns:
+            Dict[str, Any]: 执行结果
+        """
+        spec = self.get(name)
+        if spec is None:
+            return {"success": False, "error": f"未知工具: {name}"}
+
+        params = params or {}
+        error = spec.validator.validate(params)
+        if error:
+            return {"success": False, "error": f"{spec.name} 参数错误: {error}"}
+
+        if self.cache is None:
+            return await self._call(spec, params)
+
+        job_id = current_context().job_id
+        if not spec.is_idempotent(params):
+            try:
+                return await self._call(spec, params)
+            finally:
+                self.cache.invalidate(spec.get_resources(params))
+
+        key = canonical_key(spec.name, params)
+        cached = self.cache.get(job_id, key)
+        if cached is not None:
+            result, scope = cached
+            result["cached"] = scope
+            return result
+
+        epoch = self.cache.epoch
+        result = await self._call(spec, params)
+        if isinstance(result, dict) and result.get("success") and not result.get("error"):
+            self.cache.put(job_id, key, result, spec.get_resources(params), epoch)
+        return result
+
+    async def _call(self, spec: ToolSpec, params: Dict[str, Any]) -> Dict[str, Any]:
+        """执行工具处理函数"""
+        if spec.is_async:
+            result = await spec.handler(**params)
+        elif self.executor:
+            result = await self.executor.run(
+                spec.name, spec.handler, params, limit=spec.max_concurrency
+            )
+        else:
+            result = spec.handler(**params)
+
+        if spec.on_result and isinstance(result, dict) and result.get("success"):
+            await spec.on_result(params, result)
+        return result
@@ -1,9 +1,25 @@
 """本地控制模块"""
 
-from .fs import FileSystemOps
-from .shell import ShellOps
-from .process import ProcessOps
-from .net import NetworkOps
+from typing import TYPE_CHECKING
 
-__all__ = ["FileSystemOps", "ShellOps", "ProcessOps", "NetworkOps"]
+from .._lazy import lazy_exports
 
+_EXPORTS = {
+    "FileSystemOps": ".fs",
+    "ShellOps": ".shell",
+    "ProcessOps": ".process",
+    "NetworkOps": ".net",
+    "LocalOpsExecutor": ".executor",
+    "OperationCancelled": ".executor",
+    "check_cancelled": ".executor",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .fs import FileSystemOps
+    from .shell import ShellOps
+    from .process import ProcessOps
+    from .net import NetworkOps
+    from .executor import LocalOpsExecutor, OperationCancelled, check_cancelled
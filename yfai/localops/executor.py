@@ -0,0 +1,127 @@
+"""本地阻塞操作执行器
+
+将同步的本地操作(文件遍历、进程枚举、端口探测等)放到有界线程池中执行,
+避免阻塞同时驱动 UI 与流式输出的事件循环
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "yfai_localops_cancel_event", default=None
+)
+
+
+class OperationCancelled(Exception):
+    """本地操作已被取消"""
+
+
+def check_cancelled() -> None:
+    """在长循环中调用, 若当前操作已被取消则抛出 OperationCancelled"""
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise OperationCancelled("操作已取消")
+
+
+class LocalOpsExecutor:
+    """本地操作线程池"""
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        per_tool_limits: Optional[Dict[str, int]] = None,
+    ):
+        """初始化执行器
+
+        Args:
+            max_workers: 线程池大小
+            per_tool_limits: 单个工具的最大并发数
+        """
+        self.max_workers = max_workers
+        self.per_tool_limits = dict(per_tool_limits or {})
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="yfai-localops"
+        )
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_semaphore(self, tool_name: str, default_limit: Optional[int]) -> Optional[asyncio.Semaphore]:
+        """获取工具对应的并发限制信号量"""
+        semaphore = self._semaphores.get(tool_name)
+        if semaphore is None:
+            limit = self.per_tool_limits.get(tool_name, default_limit)
+            if not limit:
+                return None
+            semaphore = asyncio.Semaphore(limit)
+            self._semaphores[tool_name] = semaphore
+        return semaphore
+
+    async def run(
+        self,
+        tool_name: str,
+        func: Callable[..., Any],
+        params: Dict[str, Any],
+        limit: Optional[int] = None,
+    ) -> Any:
+        """在线程池中执行同步函数
+
+        等待方被取消时, 尚未开始的调用直接出队, 已开始的调用通过
+        check_cancelled() 协作退出
+
+        Args:
+            tool_name: 工具名称(用于并发限制)
+            func: 同步函数
+            params: 参数
+            limit: 工具默认并发上限, 配置中的 per_tool_limits 优先
+
+        Returns:
+            Any: 函数返回值
+        """
+        semaphore = self._get_semaphore(tool_name, limit)
+        if semaphore is None:
+            return await self._submit(func, params)
+        async with semaphore:
+            return await self._submit(func, params)
+
+    async def _submit(self, func: Callable[..., Any], params: Dict[str, Any]) -> Any:
+        cancel_event = threading.Event()
+
+        def call() -> Any:
+            token = _cancel_event.set(cancel_event)
+            try:
+                return func(**params)
+            finally:
+                _cancel_event.reset(token)
+
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, context.run, call)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取执行器统计信息
+
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        return {
+            "max_workers": self.max_workers,
+            "available_slots": {
+                name: semaphore._value for name, semaphore in self._semaphores.items()
+            },
+        }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """关闭线程池
+
+        Args:
+            wait: 是否等待正在执行的任务完成
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -5,6 +5,8 @@ import shutil
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from .executor import check_cancelled
+
 
 class FileSystemOps:
     """文件系统操作"""
@@ -143,6 +145,7 @@ class FileSystemOps:
             files = []
             if recursive:
                 for item in path_obj.rglob("*"):
+                    check_cancelled()
                     files.append(
                         {
                             "path": str(item),
@@ -226,10 +229,11 @@ class FileSystemOps:
             if not path_obj.exists():
                 return {"success": False, "error": "路径不存在", "risk_level": "low"}
 
-            if recursive:
-                matches = list(path_obj.rglob(pattern))
-            else:
-                matches = list(path_obj.glob(pattern))
+            matches = []
+            iterator = path_obj.rglob(pattern) if recursive else path_obj.glob(pattern)
+            for item in iterator:
+                check_cancelled()
+                matches.append(item)
 
             results = [
                 {
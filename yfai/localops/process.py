@@ -4,6 +4,8 @@ from typing import Any, Dict, List, Optional
 
 import psutil
 
+from .executor import check_cancelled
+
 
 class ProcessOps:
     """进程操作"""
@@ -26,6 +28,7 @@ class ProcessOps:
             for proc in psutil.process_iter(
                 ["pid", "name", "cpu_percent", "memory_percent", "status", "username"]
             ):
+                check_cancelled()
                 try:
                     info = proc.info
                     processes.append(
@@ -1,11 +1,48 @@
 """Shell脚本执行模块"""
 
 import asyncio
+import os
 import platform
+import signal
 import subprocess
 from typing import Any, Dict, List, Optional
 
 
+def _kill_process_group(process: Any) -> None:
+    """结束子进程及其派生的全部进程
+
+    POSIX 下子进程以独立会话启动, 直接结束整个进程组; Windows 下使用
+    taskkill /T 结束进程树
+
+    Args:
+        process: asyncio 或 subprocess 的进程对象
+    """
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+    try:
+        process.kill()
+    except (ProcessLookupError, OSError):
+        pass
+
+
+def _process_group_kwargs() -> Dict[str, Any]:
+    """让子进程成为独立进程组的启动参数"""
+    if os.name == "posix":
+        return {"start_new_session": True}
+    return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+
+
 class ShellOps:
     """Shell操作"""
 
@@ -57,6 +94,8 @@ class ShellOps:
     ) -> Dict[str, Any]:
         """执行Shell命令
 
+        超时时间不会超过当前请求的截止时间; 超时或调用方被取消时结束整个进程组
+
         Args:
             command: 命令字符串
             shell: Shell类型
@@ -67,8 +106,10 @@ class ShellOps:
         Returns:
             Dict[str, Any]: 执行结果
         """
+        from yfai.core.cancellation import remaining_time
+
         shell = shell or self.default_shell
-        timeout = timeout or self.timeout
+        timeout = remaining_time(timeout or self.timeout)
 
         try:
             # 构建命令
@@ -82,6 +123,7 @@ class ShellOps:
                 stderr=asyncio.subprocess.PIPE,
                 cwd=cwd,
                 env=env,
+                **_process_group_kwargs(),
             )
 
             try:
@@ -89,12 +131,16 @@ class ShellOps:
                     process.communicate(), timeout=timeout
                 )
                 exit_code = process.returncode
+            except asyncio.CancelledError:
+                _kill_process_group(process)
+                await process.wait()
+                raise
             except asyncio.TimeoutError:
-                process.kill()
+                _kill_process_group(process)
                 await process.wait()
                 return {
                     "success": False,
-                    "error": f"命令执行超时({timeout}秒)",
+                    "error": f"命令执行超时({timeout:g}秒)",
                     "exit_code": -1,
                     "risk_level": "medium",
                 }
@@ -146,20 +192,26 @@ class ShellOps:
             full_command = shell_cmd + [command]
 
             # 执行命令
-            result = subprocess.run(
+            with subprocess.Popen(
                 full_command,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 cwd=cwd,
                 env=env,
-                timeout=timeout,
-            )
+                **_process_group_kwargs(),
+            ) as process:
+                try:
+                    stdout, stderr = process.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    _kill_process_group(process)
+                    process.communicate()
+                    raise
 
             return {
-                "success": result.returncode == 0,
-                "stdout": result.stdout.decode("utf-8", errors="ignore"),
-                "stderr": result.stderr.decode("utf-8", errors="ignore"),
-                "exit_code": result.returncode,
+                "success": process.returncode == 0,
+                "stdout": stdout.decode("utf-8", errors="ignore"),
+                "stderr": stderr.decode("utf-8", errors="ignore"),
+                "exit_code": process.returncode,
                 "command": command,
                 "shell": shell,
                 "risk_level": "medium",
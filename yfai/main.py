@@ -11,6 +11,7 @@ from qasync import QEventLoop
 from .app.main_window import MainWindow
 from .core import ConfigManager
 from .core import Orchestrator
+from .core.log import setup_logging
 
 
 def main():
@@ -31,6 +32,7 @@ def main():
         # 加载配置
         config_manager = ConfigManager()
         config = config_manager.get_all()
+        setup_logging(config)
 
         # 创建核心调度器
         orchestrator = Orchestrator(config)
@@ -44,6 +46,9 @@ def main():
         window = MainWindow(orchestrator, config_manager)
         window.show()
 
+        # 窗口渲染的同时在后台预热连接、模型和外部服务
+        loop.call_soon(orchestrator.start_warmup)
+
         # 运行事件循环
         with loop:
             sys.exit(loop.run_forever())
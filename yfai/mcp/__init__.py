@@ -1,7 +1,17 @@
 """MCP客户端模块"""
 
-from .client import McpClient
-from .registry import McpRegistry
+from typing import TYPE_CHECKING
 
-__all__ = ["McpClient", "McpRegistry"]
+from .._lazy import lazy_exports
 
+_EXPORTS = {
+    "McpClient": ".client",
+    "McpRegistry": ".registry",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .client import McpClient
+    from .registry import McpRegistry
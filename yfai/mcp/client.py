@@ -4,10 +4,13 @@
 """
 
 import json
+import logging
 from typing import Any, Dict, List, Optional
 
 import httpx
 
+logger = logging.getLogger(__name__)
+
 
 class McpClient:
     """MCP客户端"""
@@ -44,7 +47,7 @@ class McpClient:
                 )
                 return response.status_code == 200
         except Exception as e:
-            print(f"连接MCP服务器失败: {e}")
+            logger.warning("连接MCP服务器失败: %s", e)
             return False
 
     async def list_tools(self) -> List[Dict[str, Any]]:
@@ -63,7 +66,7 @@ class McpClient:
                 response.raise_for_status()
                 return response.json().get("tools", [])
         except Exception as e:
-            print(f"获取工具列表失败: {e}")
+            logger.warning("获取工具列表失败: %s", e)
             return []
 
     async def call_tool(
@@ -92,7 +95,7 @@ class McpClient:
                 response.raise_for_status()
                 return response.json()
         except Exception as e:
-            print(f"调用工具失败: {e}")
+            logger.error("调用工具失败: %s", e)
             return None
 
     async def health_check(self) -> bool:
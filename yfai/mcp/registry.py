@@ -3,12 +3,15 @@
 管理MCP Server的注册、发现和健康检查
 """
 
+import logging
 import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import yaml
 
+logger = logging.getLogger(__name__)
+
 
 class McpServerConfig:
     """MCP服务器配置"""
@@ -60,7 +63,7 @@ class McpRegistry:
     def _load_config(self) -> None:
         """加载配置"""
         if not self.config_path.exists():
-            print(f"MCP注册配置文件不存在: {self.config_path}")
+            logger.warning("MCP注册配置文件不存在: %s", self.config_path)
             return
 
         with open(self.config_path, "r", encoding="utf-8") as f:
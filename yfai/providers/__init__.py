@@ -1,17 +1,28 @@
 """LLM提供商模块"""
 
-from .base import BaseProvider, ProviderType, ChatMessage, ChatResponse
-from .bailian import BailianProvider
-from .ollama import OllamaProvider
-from .manager import ProviderManager
+from typing import TYPE_CHECKING
 
-__all__ = [
-    "BaseProvider",
-    "ProviderType",
-    "ChatMessage",
-    "ChatResponse",
-    "BailianProvider",
-    "OllamaProvider",
-    "ProviderManager",
-]
+from .._lazy import lazy_exports
 
+_EXPORTS = {
+    "BaseProvider": ".base",
+    "ProviderType": ".base",
+    "ChatMessage": ".base",
+    "ChatResponse": ".base",
+    "CompactMessage": ".messages",
+    "BailianProvider": ".bailian",
+    "OllamaProvider": ".ollama",
+    "EchoProvider": ".echo",
+    "ProviderManager": ".manager",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .base import BaseProvider, ProviderType, ChatMessage, ChatResponse
+    from .messages import CompactMessage
+    from .bailian import BailianProvider
+    from .ollama import OllamaProvider
+    from .echo import EchoProvider
+    from .manager import ProviderManager
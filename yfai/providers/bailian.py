@@ -1,12 +1,16 @@
 """阿里百炼(DashScope)提供商适配器"""
 
+import json
+import logging
 import os
 from typing import Any, AsyncIterator, Dict, List, Optional
 
-import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from .base import BaseProvider, ChatMessage, ChatResponse, ProviderType
+from .messages import encode_chat_body
+
+logger = logging.getLogger(__name__)
 
 
 class BailianProvider(BaseProvider):
@@ -50,7 +54,6 @@ class BailianProvider(BaseProvider):
         # 构建请求数据
         data = {
             "model": model,
-            "messages": [msg.model_dump(exclude_none=True) for msg in messages],
             "temperature": temperature,
             "stream": stream,
         }
@@ -65,17 +68,17 @@ class BailianProvider(BaseProvider):
             data["tool_choice"] = tool_choice
 
         # 发送请求
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.api_base}/chat/completions",
-                json=data,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-            )
-            response.raise_for_status()
-            result = response.json()
+        client = self._get_client()
+        response = await client.post(
+            f"{self.api_base}/chat/completions",
+            content=encode_chat_body(data, messages),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+        )
+        response.raise_for_status()
+        result = response.json()
 
         # 解析响应
         # 验证响应结构
@@ -95,7 +98,7 @@ class BailianProvider(BaseProvider):
             raise ValueError(f"无效的message格式: {type(message)}")
 
         return ChatResponse(
-            content=message.get("content", ""),
+            content=message.get("content") or "",
             role=message.get("role", "assistant"),
             finish_reason=choice.get("finish_reason"),
             tool_calls=message.get("tool_calls"),
@@ -119,7 +122,6 @@ class BailianProvider(BaseProvider):
         # 构建请求数据
         data = {
             "model": model,
-            "messages": [msg.model_dump(exclude_none=True) for msg in messages],
             "temperature": temperature,
             "stream": True,
         }
@@ -134,67 +136,64 @@ class BailianProvider(BaseProvider):
             data["tool_choice"] = tool_choice
 
         # 发送流式请求
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            async with client.stream(
-                "POST",
-                f"{self.api_base}/chat/completions",
-                json=data,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-            ) as response:
-                response.raise_for_status()
-
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        data_str = line[6:]  # 去掉 "data: " 前缀
-                        if data_str == "[DONE]":
-                            break
-
-                        try:
-                            import json
-                            import logging
-
-                            chunk = json.loads(data_str)
-                            if "choices" in chunk and len(chunk["choices"]) > 0:
-                                delta = chunk["choices"][0].get("delta")
-                                if delta and isinstance(delta, dict):
-                                    content = delta.get("content", "")
-                                    if content:
-                                        yield content
-                        except json.JSONDecodeError as e:
-                            logging.warning(f"流式响应JSON解析失败: {e}, 数据: {data_str[:100]}")
-                            continue
+        client = self._get_client()
+        async with client.stream(
+            "POST",
+            f"{self.api_base}/chat/completions",
+            content=encode_chat_body(data, messages),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+        ) as response:
+            response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    data_str = line[6:]  # 去掉 "data: " 前缀
+                    if data_str == "[DONE]":
+                        break
+
+                    try:
+                        chunk = json.loads(data_str)
+                        if "choices" in chunk and len(chunk["choices"]) > 0:
+                            delta = chunk["choices"][0].get("delta")
+                            if delta and isinstance(delta, dict):
+                                content = delta.get("content", "")
+                                if content:
+                                    yield content
+                    except json.JSONDecodeError as e:
+                        logger.warning("流式响应JSON解析失败: %s, 数据: %s", e, data_str[:100])
+                        continue
 
     async def health_check(self) -> bool:
         """健康检查"""
-        import logging
-
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(
-                    f"{self.api_base}/models",
-                    headers={"Authorization": f"Bearer {self.api_key}"},
-                )
-                return response.status_code == 200
+            client = self._get_client()
+            response = await client.get(
+                f"{self.api_base}/models",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=10,
+            )
+            return response.status_code == 200
         except Exception as e:
-            logging.warning(f"百炼健康检查失败: {e}")
+            logger.warning("百炼健康检查失败: %s", e)
             return False
 
     async def list_models(self) -> List[str]:
         """列出可用模型"""
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(
-                    f"{self.api_base}/models",
-                    headers={"Authorization": f"Bearer {self.api_key}"},
-                )
-                response.raise_for_status()
-                result = response.json()
-                return [model["id"] for model in result.get("data", [])]
+            client = self._get_client()
+            response = await client.get(
+                f"{self.api_base}/models",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=10,
+            )
+            response.raise_for_status()
+            result = response.json()
+            return [model["id"] for model in result.get("data", [])]
         except Exception as e:
-            print(f"获取模型列表失败: {e}")
+            logger.warning("获取模型列表失败: %s", e)
             return [
                 "qwen-plus",
                 "qwen-turbo",
@@ -1,5 +1,6 @@
 """Provider基础接口定义"""
 
+import asyncio
 from abc import ABC, abstractmethod
 from enum import Enum
 from typing import Any, AsyncIterator, Dict, List, Optional
@@ -13,6 +14,7 @@ class ProviderType(str, Enum):
     BAILIAN = "bailian"
     OLLAMA = "ollama"
     OPENAI = "openai"
+    ECHO = "echo"
 
 
 class ChatMessage(BaseModel):
@@ -53,6 +55,49 @@ class BaseProvider(ABC):
         self.default_model = default_model
         self.timeout = timeout
         self.max_retries = max_retries
+        # 复用的连接池, 首次请求时创建, 保持长连接避免每次请求重新 DNS/TLS 握手
+        self._client = None
+        self._client_loop = None
+
+    def _get_client(self):
+        """获取复用的 HTTP 客户端
+
+        连接池绑定到创建它的事件循环, 事件循环变化或客户端已关闭时重新创建
+
+        Returns:
+            httpx.AsyncClient: HTTP 客户端
+        """
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=120),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        client, self._client = self._client, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+    async def warmup(self, preload_model: bool = False) -> Dict[str, Any]:
+        """预热连接
+
+        通过健康检查建立连接(DNS/TLS), 健康时顺带获取模型列表
+
+        Args:
+            preload_model: 是否预加载默认模型(仅本地模型有意义)
+
+        Returns:
+            Dict[str, Any]: {"healthy": 是否健康, "models": 模型列表}
+        """
+        healthy = await self.health_check()
+        models = await self.list_models() if healthy else []
+        return {"healthy": healthy, "models": models}
 
     @abstractmethod
     async def chat(
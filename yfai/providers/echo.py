@@ -0,0 +1,96 @@
+"""本地回显提供商
+
+不访问网络, 按配置的延迟回显最后一条用户消息; 用作无界面服务和批处理的
+本地压测目标, 也便于在没有 API Key 的环境中联调
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .base import BaseProvider, ChatMessage, ChatResponse, ProviderType
+
+
+class EchoProvider(BaseProvider):
+    """回显 Provider 实现"""
+
+    def __init__(
+        self,
+        default_model: str = "echo",
+        latency: float = 0.05,
+        chunk_delay: float = 0.01,
+        chunk_size: int = 8,
+    ):
+        """初始化回显 Provider
+
+        Args:
+            default_model: 模型名称
+            latency: 首个响应前的模拟延迟(秒)
+            chunk_delay: 流式片段之间的延迟(秒)
+            chunk_size: 流式片段的字符数
+        """
+        super().__init__("local://echo", None, default_model, timeout=0, max_retries=0)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = max(1, chunk_size)
+
+    def get_provider_type(self) -> ProviderType:
+        return ProviderType.ECHO
+
+    @staticmethod
+    def _reply(messages: List[ChatMessage]) -> str:
+        for message in reversed(messages):
+            if message.role == "user":
+                return f"echo: {message.content}"
+        return "echo"
+
+    async def chat(
+        self,
+        messages: List[ChatMessage],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[str] = None,
+        stream: bool = False,
+        **kwargs,
+    ) -> ChatResponse:
+        """发送聊天请求"""
+        await asyncio.sleep(self.latency)
+        content = self._reply(messages)
+        prompt_tokens = sum(len(message.content) for message in messages)
+        return ChatResponse(
+            content=content,
+            finish_reason="stop",
+            usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content),
+                "total_tokens": prompt_tokens + len(content),
+            },
+            model=model or self.default_model,
+        )
+
+    async def stream_chat(
+        self,
+        messages: List[ChatMessage],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncIterator[str]:
+        """流式聊天"""
+        await asyncio.sleep(self.latency)
+        content = self._reply(messages)
+        for start in range(0, len(content), self.chunk_size):
+            if start:
+                await asyncio.sleep(self.chunk_delay)
+            yield content[start:start + self.chunk_size]
+
+    async def health_check(self) -> bool:
+        """健康检查"""
+        return True
+
+    async def list_models(self) -> List[str]:
+        """列出可用模型"""
+        return [self.default_model]
@@ -4,11 +4,16 @@
 """
 
 import asyncio
-from typing import Dict, List, Optional
+import logging
+from typing import AsyncIterator, Dict, List, Optional
 
 from .base import BaseProvider, ChatMessage, ChatResponse, ProviderType
 from .bailian import BailianProvider
+from .echo import EchoProvider
 from .ollama import OllamaProvider
+from .singleflight import SingleFlight, request_key
+
+logger = logging.getLogger(__name__)
 
 
 class ProviderManager:
@@ -19,6 +24,11 @@ class ProviderManager:
         self.providers: Dict[str, BaseProvider] = {}
         self.health_status: Dict[str, bool] = {}
         self.custom_models: Dict[str, List[Dict[str, str]]] = {}
+        # 预热时获取的远端模型列表
+        self.model_cache: Dict[str, List[str]] = {}
+        # 相同并发请求合并, 降低突发调度下的上游压力
+        self.coalesce_requests = config.get("app", {}).get("request_coalescing", True)
+        self._single_flight = SingleFlight()
         self._init_providers()
 
     def _init_providers(self) -> None:
@@ -41,7 +51,7 @@ class ProviderManager:
                 self.health_status["bailian"] = False
                 self.custom_models["bailian"] = bailian_config.get("models", []) or []
             except Exception as e:
-                print(f"初始化百炼Provider失败: {e}")
+                logger.error("初始化百炼Provider失败: %s", e)
 
         # 初始化Ollama
         if "ollama" in providers_config:
@@ -52,11 +62,24 @@ class ProviderManager:
                     default_model=ollama_config.get("default_model", "qwen2.5-coder"),
                     timeout=ollama_config.get("timeout", 120),
                     max_retries=ollama_config.get("max_retries", 3),
+                    keep_alive=ollama_config.get("keep_alive", "30m"),
                 )
                 self.health_status["ollama"] = False
                 self.custom_models["ollama"] = ollama_config.get("models", []) or []
             except Exception as e:
-                print(f"初始化Ollama Provider失败: {e}")
+                logger.error("初始化Ollama Provider失败: %s", e)
+
+        # 初始化本地回显(压测/联调用)
+        if "echo" in providers_config:
+            echo_config = providers_config["echo"] or {}
+            self.providers["echo"] = EchoProvider(
+                default_model=echo_config.get("default_model", "echo"),
+                latency=echo_config.get("latency", 0.05),
+                chunk_delay=echo_config.get("chunk_delay", 0.01),
+                chunk_size=echo_config.get("chunk_size", 8),
+            )
+            self.health_status["echo"] = True
+            self.custom_models["echo"] = echo_config.get("models", []) or []
 
     async def check_health_all(self) -> Dict[str, bool]:
         """检查所有Provider健康状态
@@ -81,6 +104,46 @@ class ProviderManager:
 
         return self.health_status
 
+    async def warmup(self, preload_models: bool = True, timeout: float = 15) -> Dict[str, Dict]:
+        """并发预热所有Provider
+
+        建立连接、刷新健康状态并缓存模型列表, 首次对话无需再承担冷启动延迟
+
+        Args:
+            preload_models: 是否预加载本地默认模型
+            timeout: 单个Provider的预热超时(秒)
+
+        Returns:
+            Dict[str, Dict]: Provider名称 -> 预热结果
+        """
+        names = list(self.providers)
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(self.providers[name].warmup(preload_model=preload_models), timeout)
+                for name in names
+            ),
+            return_exceptions=True,
+        )
+
+        summary: Dict[str, Dict] = {}
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                self.health_status[name] = False
+                summary[name] = {"healthy": False, "error": str(result) or type(result).__name__}
+                continue
+            self.health_status[name] = result["healthy"]
+            if result["healthy"] and result["models"]:
+                self.model_cache[name] = result["models"]
+            summary[name] = result
+        return summary
+
+    async def aclose(self) -> None:
+        """关闭所有Provider的连接池"""
+        await asyncio.gather(
+            *(provider.aclose() for provider in self.providers.values()),
+            return_exceptions=True,
+        )
+
     def get_provider(self, name: Optional[str] = None) -> Optional[BaseProvider]:
         """获取Provider"""
         _, provider = self._resolve_provider(name)
@@ -120,6 +183,8 @@ class ProviderManager:
     ) -> Optional[ChatResponse]:
         """发送聊天请求（带降级）
 
+        同一时刻的相同请求只会发送一次上游调用, 所有调用方共享结果
+
         Args:
             messages: 消息列表
             provider_name: Provider名称
@@ -128,10 +193,65 @@ class ProviderManager:
         Returns:
             ChatResponse: 响应对象
         """
+        if not self.coalesce_requests:
+            return await self._chat_with_fallback(messages, provider_name, **kwargs)
+
+        key = request_key(provider_name, messages, **kwargs)
+        response = await self._single_flight.do(
+            key, lambda: self._chat_with_fallback(messages, provider_name, **kwargs)
+        )
+        # 每个调用方拿到独立副本, 避免共享对象被修改
+        return response.model_copy(deep=True) if response else response
+
+    async def stream_chat(
+        self,
+        messages: List[ChatMessage],
+        provider_name: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncIterator[str]:
+        """流式聊天
+
+        同一时刻的相同流式请求共享一条上游流, 片段分发给每个调用方
+
+        Args:
+            messages: 消息列表
+            provider_name: Provider名称
+            **kwargs: 其他参数
+
+        Yields:
+            str: 流式输出的文本片段
+        """
+        from yfai.core.cancellation import raise_if_cancelled
+
+        resolved_name, provider = self._resolve_provider(provider_name)
+        if not provider:
+            raise ValueError(self._get_provider_error_message(provider_name))
+        raise_if_cancelled()
+
+        if not self.coalesce_requests:
+            async for chunk in provider.stream_chat(messages, **kwargs):
+                yield chunk
+            return
+
+        key = request_key(f"stream:{resolved_name}", messages, **kwargs)
+        async for chunk in self._single_flight.stream(
+            key, lambda: provider.stream_chat(messages, **kwargs)
+        ):
+            yield chunk
+
+    async def _chat_with_fallback(
+        self,
+        messages: List[ChatMessage],
+        provider_name: Optional[str] = None,
+        **kwargs,
+    ) -> Optional[ChatResponse]:
+        """发送聊天请求, 主 Provider 失败时按降级顺序重试"""
+        from yfai.core.cancellation import raise_if_cancelled
+
         resolved_name, provider = self._resolve_provider(provider_name)
         if not provider:
             error_msg = self._get_provider_error_message(provider_name)
-            print(error_msg)
+            logger.error(error_msg)
             return None
 
         # 尝试主 Provider
@@ -143,7 +263,7 @@ class ProviderManager:
             return response
         except Exception as e:
             error_detail = self._format_error_message(resolved_name, e)
-            print(f"❌ {error_detail}")
+            logger.warning("%s", error_detail)
             self.health_status[resolved_name] = False
 
             # 智能降级策略
@@ -152,21 +272,23 @@ class ProviderManager:
                 if fallback_name not in self.providers:
                     continue
 
-                print(f"🔄 尝试降级到 {fallback_name}...")
+                # 已取消或超过截止时间时不再尝试后续 Provider
+                raise_if_cancelled()
+                logger.info("尝试降级到 %s", fallback_name)
                 try:
                     fallback_provider = self.providers[fallback_name]
                     response = await fallback_provider.chat(messages, **kwargs)
                     if response:
                         response.provider = fallback_name
                         self.health_status[fallback_name] = True
-                        print(f"✅ 降级成功，使用 {fallback_name}")
+                        logger.info("降级成功，使用 %s", fallback_name)
                         return response
                 except Exception as e2:
                     error_detail = self._format_error_message(fallback_name, e2)
-                    print(f"❌ 降级到 {fallback_name} 失败: {error_detail}")
+                    logger.warning("降级到 %s 失败: %s", fallback_name, error_detail)
                     self.health_status[fallback_name] = False
 
-            print("⚠️ 所有 Provider 均不可用，请检查配置和网络连接")
+            logger.error("所有 Provider 均不可用，请检查配置和网络连接")
             return None
 
     def _get_provider_error_message(self, provider_name: Optional[str]) -> str:
@@ -231,9 +353,12 @@ class ProviderManager:
 
         return fallback_map.get(current_provider, [])
 
-    async def list_all_models(self) -> Dict[str, List[str]]:
+    async def list_all_models(self, refresh: bool = False) -> Dict[str, List[str]]:
         """列出所有Provider的可用模型
 
+        Args:
+            refresh: 是否忽略预热缓存重新获取
+
         Returns:
             Dict[str, List[str]]: Provider名称 -> 模型列表
         """
@@ -241,12 +366,14 @@ class ProviderManager:
 
         for name, provider in self.providers.items():
             try:
-                models = await provider.list_models()
+                models = None if refresh else self.model_cache.get(name)
+                if models is None:
+                    models = await provider.list_models()
                 extra = self._format_custom_models(name)
                 merged = self._merge_models(models, extra)
                 result[name] = merged
             except Exception as e:
-                print(f"获取 {name} 模型列表失败: {e}")
+                logger.warning("获取 %s 模型列表失败: %s", name, e)
                 result[name] = self._format_custom_models(name)
 
         return result
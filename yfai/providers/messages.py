@@ -0,0 +1,121 @@
+"""轻量消息与请求体编码
+
+对话历史每轮都会重新组装并序列化。CompactMessage 使用 __slots__ 并缓存自身的
+JSON 片段, 请求体由缓存片段拼接而成, 不再逐条 model_dump 后整体重新编码;
+安装了 orjson 时使用 orjson 编码, 否则回退到标准库 json
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """把对象编码为紧凑的 UTF-8 JSON
+
+    Args:
+        obj: 可序列化对象
+
+    Returns:
+        bytes: JSON 字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class CompactMessage:
+    """热路径使用的轻量聊天消息
+
+    字段与 ChatMessage 一致, 可在需要 ChatMessage 的地方直接使用; 创建后视为不可变,
+    首次编码的 JSON 片段会被缓存
+    """
+
+    __slots__ = ("role", "content", "name", "tool_call_id", "tool_calls", "_fragment", "_basic")
+
+    def __init__(
+        self,
+        role: str,
+        content: str,
+        name: Optional[str] = None,
+        tool_call_id: Optional[str] = None,
+        tool_calls: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.role = role
+        self.content = content
+        self.name = name
+        self.tool_call_id = tool_call_id
+        self.tool_calls = tool_calls
+        self._fragment: Optional[bytes] = None
+        self._basic: Optional[bytes] = None
+
+    def model_dump(self, exclude_none: bool = False) -> Dict[str, Any]:
+        """转换为字典(与 ChatMessage.model_dump 兼容)"""
+        data = {
+            "role": self.role,
+            "content": self.content,
+            "name": self.name,
+            "tool_call_id": self.tool_call_id,
+            "tool_calls": self.tool_calls,
+        }
+        if exclude_none:
+            return {key: value for key, value in data.items() if value is not None}
+        return data
+
+    def fragment(self) -> bytes:
+        """完整消息(不含空字段)的 JSON 片段"""
+        if self._fragment is None:
+            self._fragment = dumps_bytes(self.model_dump(exclude_none=True))
+        return self._fragment
+
+    def basic_fragment(self) -> bytes:
+        """仅含 role/content 的 JSON 片段"""
+        if self._basic is None:
+            self._basic = dumps_bytes({"role": self.role, "content": self.content})
+        return self._basic
+
+    def __repr__(self) -> str:
+        return f"CompactMessage(role={self.role!r}, content={self.content[:40]!r})"
+
+
+def message_fragment(message: Any, basic: bool = False) -> bytes:
+    """获取消息的 JSON 片段
+
+    Args:
+        message: CompactMessage、ChatMessage 或 dict
+        basic: 是否只保留 role/content
+
+    Returns:
+        bytes: JSON 片段
+    """
+    if isinstance(message, CompactMessage):
+        return message.basic_fragment() if basic else message.fragment()
+    if isinstance(message, dict):
+        data = message
+    else:
+        data = message.model_dump(exclude_none=True)
+    if basic:
+        data = {"role": data.get("role"), "content": data.get("content")}
+    return dumps_bytes(data)
+
+
+def encode_chat_body(payload: Dict[str, Any], messages: Iterable[Any], basic: bool = False) -> bytes:
+    """编码聊天请求体, 消息部分由缓存的片段拼接
+
+    Args:
+        payload: 除 messages 外的请求字段
+        messages: 消息列表
+        basic: 消息是否只保留 role/content
+
+    Returns:
+        bytes: JSON 请求体
+    """
+    head = dumps_bytes(payload)[:-1]
+    if len(head) > 1:
+        head += b","
+    body = b",".join(message_fragment(message, basic) for message in messages)
+    return head + b'"messages":[' + body + b"]}"
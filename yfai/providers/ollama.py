@@ -1,11 +1,15 @@
 """Ollama本地模型提供商适配器"""
 
+import json
+import logging
 from typing import Any, AsyncIterator, Dict, List, Optional
 
-import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from .base import BaseProvider, ChatMessage, ChatResponse, ProviderType
+from .messages import encode_chat_body
+
+logger = logging.getLogger(__name__)
 
 
 class OllamaProvider(BaseProvider):
@@ -17,8 +21,10 @@ class OllamaProvider(BaseProvider):
         default_model: str = "qwen2.5-coder",
         timeout: int = 120,
         max_retries: int = 3,
+        keep_alive: str = "30m",
     ):
         super().__init__(api_base, None, default_model, timeout, max_retries)
+        self.keep_alive = keep_alive
 
     def get_provider_type(self) -> ProviderType:
         return ProviderType.OLLAMA
@@ -41,9 +47,6 @@ class OllamaProvider(BaseProvider):
         # 构建请求数据
         data = {
             "model": model,
-            "messages": [
-                {"role": msg.role, "content": msg.content} for msg in messages
-            ],
             "stream": False,
             "options": {
                 "temperature": temperature,
@@ -54,13 +57,14 @@ class OllamaProvider(BaseProvider):
             data["options"]["num_predict"] = max_tokens
 
         # 发送请求
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.api_base}/api/chat",
-                json=data,
-            )
-            response.raise_for_status()
-            result = response.json()
+        client = self._get_client()
+        response = await client.post(
+            f"{self.api_base}/api/chat",
+            content=encode_chat_body(data, messages, basic=True),
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
+        result = response.json()
 
         # 解析响应
         # 验证响应结构
@@ -72,7 +76,7 @@ class OllamaProvider(BaseProvider):
             raise ValueError(f"无效的message格式: {type(message)}")
 
         return ChatResponse(
-            content=message.get("content", ""),
+            content=message.get("content") or "",
             role=message.get("role", "assistant"),
             finish_reason=result.get("done_reason"),
             tool_calls=None,  # Ollama暂不支持工具调用
@@ -101,9 +105,6 @@ class OllamaProvider(BaseProvider):
         # 构建请求数据
         data = {
             "model": model,
-            "messages": [
-                {"role": msg.role, "content": msg.content} for msg in messages
-            ],
             "stream": True,
             "options": {
                 "temperature": temperature,
@@ -114,54 +115,82 @@ class OllamaProvider(BaseProvider):
             data["options"]["num_predict"] = max_tokens
 
         # 发送流式请求
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            async with client.stream(
-                "POST",
-                f"{self.api_base}/api/chat",
-                json=data,
-            ) as response:
-                response.raise_for_status()
-
-                async for line in response.aiter_lines():
-                    if line:
-                        try:
-                            import json
-                            import logging
-
-                            chunk = json.loads(line)
-                            message = chunk.get("message")
-                            if message and isinstance(message, dict):
-                                content = message.get("content", "")
-                                if content:
-                                    yield content
-                        except json.JSONDecodeError as e:
-                            logging.warning(f"流式响应JSON解析失败: {e}, 数据: {line[:100]}")
-                            continue
+        client = self._get_client()
+        async with client.stream(
+            "POST",
+            f"{self.api_base}/api/chat",
+            content=encode_chat_body(data, messages, basic=True),
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if line:
+                    try:
+                        chunk = json.loads(line)
+                        message = chunk.get("message")
+                        if message and isinstance(message, dict):
+                            content = message.get("content", "")
+                            if content:
+                                yield content
+                    except json.JSONDecodeError as e:
+                        logger.warning("流式响应JSON解析失败: %s, 数据: %s", e, line[:100])
+                        continue
 
     async def health_check(self) -> bool:
         """健康检查"""
-        import logging
-
         try:
-            async with httpx.AsyncClient(timeout=5) as client:
-                response = await client.get(f"{self.api_base}/api/tags")
-                return response.status_code == 200
+            client = self._get_client()
+            response = await client.get(f"{self.api_base}/api/tags", timeout=5)
+            return response.status_code == 200
         except Exception as e:
-            logging.warning(f"Ollama健康检查失败: {e}")
+            logger.warning("Ollama健康检查失败: %s", e)
             return False
 
     async def list_models(self) -> List[str]:
         """列出可用模型"""
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(f"{self.api_base}/api/tags")
-                response.raise_for_status()
-                result = response.json()
-                return [model["name"] for model in result.get("models", [])]
+            client = self._get_client()
+            response = await client.get(f"{self.api_base}/api/tags", timeout=10)
+            response.raise_for_status()
+            result = response.json()
+            return [model["name"] for model in result.get("models", [])]
         except Exception as e:
-            print(f"获取模型列表失败: {e}")
+            logger.warning("获取模型列表失败: %s", e)
             return []
 
+    async def warmup(self, preload_model: bool = False) -> Dict[str, Any]:
+        """预热连接, 并可把默认模型预加载到内存
+
+        仅预加载本地已存在的模型, 不会触发拉取
+
+        Args:
+            preload_model: 是否预加载默认模型
+
+        Returns:
+            Dict[str, Any]: {"healthy": 是否健康, "models": 模型列表, "preloaded": 是否已预加载}
+        """
+        result = await super().warmup()
+        result["preloaded"] = False
+        if not (preload_model and result["healthy"]):
+            return result
+
+        model = self.default_model
+        if not any(name == model or name.split(":")[0] == model for name in result["models"]):
+            return result
+        try:
+            client = self._get_client()
+            # 不带 prompt 的 generate 请求只加载模型, keep_alive 控制常驻时长
+            response = await client.post(
+                f"{self.api_base}/api/generate",
+                json={"model": model, "keep_alive": self.keep_alive},
+            )
+            response.raise_for_status()
+            result["preloaded"] = True
+        except Exception as e:
+            logger.warning("预加载模型失败: %s", e)
+        return result
+
     async def pull_model(self, model: str) -> bool:
         """拉取模型
 
@@ -172,14 +201,15 @@ class OllamaProvider(BaseProvider):
             bool: 是否成功
         """
         try:
-            async with httpx.AsyncClient(timeout=600) as client:
-                response = await client.post(
-                    f"{self.api_base}/api/pull",
-                    json={"name": model},
-                )
-                response.raise_for_status()
-                return True
+            client = self._get_client()
+            response = await client.post(
+                f"{self.api_base}/api/pull",
+                json={"name": model},
+                timeout=600,
+            )
+            response.raise_for_status()
+            return True
         except Exception as e:
-            print(f"拉取模型失败: {e}")
+            logger.error("拉取模型失败: %s", e)
             return False
 
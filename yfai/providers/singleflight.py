@@ -0,0 +1,192 @@
+"""请求合并(Single-flight)
+
+同一时刻发出的相同请求只向上游发送一次, 其余调用方等待同一结果;
+流式请求则把上游的每个片段分发给所有等待者
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from .messages import message_fragment
+
+
+def request_key(provider_name: Optional[str], messages: List[Any], **kwargs) -> str:
+    """计算请求的规范化哈希
+
+    Args:
+        provider_name: Provider名称
+        messages: 消息列表(ChatMessage 或 dict)
+        **kwargs: 其他请求参数
+
+    Returns:
+        str: 请求哈希
+    """
+    digest = hashlib.sha256()
+    header = {"provider": provider_name, "kwargs": kwargs}
+    digest.update(json.dumps(header, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    # 消息部分直接使用缓存的 JSON 片段, 长历史无需整体重新编码
+    for msg in messages:
+        digest.update(b"\n")
+        digest.update(message_fragment(msg))
+    return digest.hexdigest()
+
+
+class _InFlightCall:
+    """进行中的普通请求"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _InFlightStream:
+    """进行中的流式请求"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+
+    def publish(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+def _upstream_context() -> contextvars.Context:
+    """复制当前上下文并清除取消令牌, 供共享的上游任务使用"""
+    from yfai.core.cancellation import _current_token
+
+    context = contextvars.copy_context()
+    context.run(_current_token.set, None)
+    return context
+
+
+class SingleFlight:
+    """相同请求的并发合并器
+
+    调用方全部取消时才会取消上游请求, 单个调用方取消不影响其他等待者。
+    上游任务沿用首个调用方的请求上下文(会话、追踪ID), 但不继承其取消令牌与截止时间
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._streams: Dict[str, _InFlightStream] = {}
+
+    def in_flight(self) -> int:
+        """当前进行中的上游请求数"""
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """执行请求, 相同 key 的并发调用共享一次上游调用
+
+        Args:
+            key: 请求哈希
+            factory: 发起上游调用的协程工厂
+
+        Returns:
+            Any: 上游调用结果
+        """
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.get_running_loop().create_task(factory(), context=_upstream_context())
+            call = _InFlightCall(task)
+            self._calls[key] = call
+            task.add_done_callback(lambda _t, k=key, c=call: self._release_call(k, c))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+                # 取消尚未生效前新到的调用方应发起新请求, 不能加入已放弃的调用
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            raise
+        finally:
+            call.waiters -= 1
+
+    async def stream(
+        self, key: str, factory: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """执行流式请求, 相同 key 的并发调用共享一条上游流
+
+        晚加入的调用方会先收到已产生的片段, 再继续接收后续片段
+
+        Args:
+            key: 请求哈希
+            factory: 返回上游异步迭代器的工厂
+
+        Yields:
+            str: 流式输出的文本片段
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _InFlightStream()
+            self._streams[key] = flight
+            flight.task = asyncio.get_running_loop().create_task(
+                self._pump(key, flight, factory), context=_upstream_context()
+            )
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(flight.chunks):
+                    chunk = flight.chunks[index]
+                    index += 1
+                    yield chunk
+                    continue
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and flight.task and not flight.task.done():
+                flight.task.cancel()
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+
+    async def _pump(
+        self,
+        key: str,
+        flight: _InFlightStream,
+        factory: Callable[[], AsyncIterator[str]],
+    ) -> None:
+        """消费上游流并分发给所有订阅者"""
+        try:
+            async for chunk in factory():
+                flight.publish(chunk)
+            flight.finish()
+        except asyncio.CancelledError:
+            flight.finish(asyncio.CancelledError())
+            raise
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+
+    def _release_call(self, key: str, call: _InFlightCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # 避免无人等待时出现 "exception was never retrieved" 警告
+        if not call.task.cancelled():
+            call.task.exception()
@@ -1,10 +1,18 @@
 """搜索模块"""
 
-from .base import SearchAdapter, SearchResult
-from .manager import SearchManager
-
-__all__ = [
-    "SearchAdapter",
-    "SearchResult",
-    "SearchManager",
-]
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    "SearchAdapter": ".base",
+    "SearchResult": ".base",
+    "SearchManager": ".manager",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .base import SearchAdapter, SearchResult
+    from .manager import SearchManager
@@ -1,9 +1,14 @@
 """内置搜索适配器"""
 
-import httpx
+import logging
 from typing import List, Dict, Any
+
+import httpx
+
 from .base import SearchAdapter, SearchResult
 
+logger = logging.getLogger(__name__)
+
 
 class DuckDuckGoAdapter(SearchAdapter):
     """DuckDuckGo 搜索适配器（使用免费 API）"""
@@ -61,7 +66,7 @@ class DuckDuckGoAdapter(SearchAdapter):
                 return results[:max_results]
 
         except Exception as e:
-            print(f"DuckDuckGo 搜索失败: {e}")
+            logger.warning("DuckDuckGo 搜索失败: %s", e)
             return []
 
     async def health_check(self) -> bool:
@@ -86,7 +91,7 @@ class BingAdapter(SearchAdapter):
         """执行 Bing 搜索"""
         api_key = self.config.get("api_key")
         if not api_key:
-            print("Bing 搜索需要 API Key，请在配置中设置")
+            logger.warning("Bing 搜索需要 API Key，请在配置中设置")
             return []
 
         try:
@@ -122,7 +127,7 @@ class BingAdapter(SearchAdapter):
                 return results[:max_results]
 
         except Exception as e:
-            print(f"Bing 搜索失败: {e}")
+            logger.warning("Bing 搜索失败: %s", e)
             return []
 
     async def health_check(self) -> bool:
@@ -157,7 +162,7 @@ class GoogleAdapter(SearchAdapter):
         search_engine_id = self.config.get("search_engine_id")
 
         if not api_key or not search_engine_id:
-            print("Google 搜索需要 API Key 和 Search Engine ID")
+            logger.warning("Google 搜索需要 API Key 和 Search Engine ID")
             return []
 
         try:
@@ -195,7 +200,7 @@ class GoogleAdapter(SearchAdapter):
                 return results[:max_results]
 
         except Exception as e:
-            print(f"Google 搜索失败: {e}")
+            logger.warning("Google 搜索失败: %s", e)
             return []
 
     async def health_check(self) -> bool:
@@ -1,9 +1,12 @@
 """搜索管理器"""
 
+import logging
 from typing import Dict, List, Optional, Any
 from .base import SearchAdapter, SearchResult
 from .adapters import DuckDuckGoAdapter, BingAdapter, GoogleAdapter
 
+logger = logging.getLogger(__name__)
+
 
 class SearchManager:
     """搜索管理器 - 管理多个搜索适配器"""
@@ -69,11 +72,11 @@ class SearchManager:
                     if results:
                         return results
                 except Exception as e:
-                    print(f"搜索引擎 {engine_name} 失败: {e}")
+                    logger.warning("搜索引擎 %s 失败: %s", engine_name, e)
                     continue
 
         # 如果所有引擎都失败，返回空列表
-        print("⚠️ 所有搜索引擎均不可用")
+        logger.error("所有搜索引擎均不可用")
         return []
 
     async def search_multiple(
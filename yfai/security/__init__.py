@@ -1,7 +1,21 @@
 """安全模块"""
 
-from .guard import SecurityGuard, ApprovalRequest, ApprovalResult, RiskLevel, ApprovalStatus
-from .policy import SecurityPolicy
+from typing import TYPE_CHECKING
 
-__all__ = ["SecurityGuard", "ApprovalRequest", "ApprovalResult", "RiskLevel", "ApprovalStatus", "SecurityPolicy"]
+from .._lazy import lazy_exports
 
+_EXPORTS = {
+    "SecurityGuard": ".guard",
+    "ApprovalRequest": ".guard",
+    "ApprovalResult": ".guard",
+    "RiskLevel": ".guard",
+    "ApprovalStatus": ".guard",
+    "SecurityPolicy": ".policy",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .guard import SecurityGuard, ApprovalRequest, ApprovalResult, RiskLevel, ApprovalStatus
+    from .policy import SecurityPolicy
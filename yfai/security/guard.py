@@ -3,6 +3,8 @@
 负责权限检查、审批流程和审计日志
 """
 
+import asyncio
+import logging
 import uuid
 from datetime import datetime
 from enum import Enum
@@ -10,6 +12,8 @@ from typing import Any, Callable, Dict, Optional
 
 from pydantic import BaseModel, Field
 
+logger = logging.getLogger(__name__)
+
 
 class RiskLevel(str, Enum):
     """风险等级"""
@@ -57,9 +61,11 @@ class ApprovalResult(BaseModel):
 class SecurityGuard:
     """安全守卫"""
 
-    def __init__(self, config: Dict[str, Any], db_manager=None):
+    def __init__(self, config: Dict[str, Any], db_manager=None, event_bus=None):
         self.config = config
         self.db_manager = db_manager
+        # 事件总线(可选), 发布审批请求与审批结果
+        self.event_bus = event_bus
         self.confirm_threshold = self._parse_threshold(
             config.get("security", {}).get("confirm_threshold", "medium")
         )
@@ -73,6 +79,8 @@ class SecurityGuard:
 
         # 审批记录(内存缓存)
         self.approval_history: list[ApprovalResult] = []
+        # 并发的审批请求排队, 审批对话框逐个弹出
+        self._approval_lock = asyncio.Lock()
 
     def apply_config(self, config: Dict[str, Any]) -> None:
         """更新配置后同步内部参数"""
@@ -171,21 +179,34 @@ class SecurityGuard:
         """
         import inspect
 
+        from yfai.core.events import EventType
+
+        if self.event_bus is not None:
+            self.event_bus.publish(
+                EventType.APPROVAL_REQUESTED,
+                request_id=request.id,
+                tool_name=request.tool_name,
+                risk_level=request.risk_level.value,
+                source=request.source,
+                description=request.description,
+            )
+
         # 如果设置了回调函数,调用它
         if self.approval_callback:
-            try:
-                # 检查回调函数是否是异步的
-                if inspect.iscoroutinefunction(self.approval_callback):
-                    result = await self.approval_callback(request)
-                else:
-                    result = self.approval_callback(request)
-            except Exception as e:
-                # 回调函数执行失败,默认拒绝
-                result = ApprovalResult(
-                    request_id=request.id,
-                    status=ApprovalStatus.REJECTED,
-                    reason=f"审批回调执行失败: {str(e)}",
-                )
+            async with self._approval_lock:
+                try:
+                    # 检查回调函数是否是异步的
+                    if inspect.iscoroutinefunction(self.approval_callback):
+                        result = await self.approval_callback(request)
+                    else:
+                        result = self.approval_callback(request)
+                except Exception as e:
+                    # 回调函数执行失败,默认拒绝
+                    result = ApprovalResult(
+                        request_id=request.id,
+                        status=ApprovalStatus.REJECTED,
+                        reason=f"审批回调执行失败: {str(e)}",
+                    )
         else:
             # 默认拒绝
             result = ApprovalResult(
@@ -196,6 +217,15 @@ class SecurityGuard:
 
         # 记录审批结果
         self.approval_history.append(result)
+        if self.event_bus is not None:
+            self.event_bus.publish(
+                EventType.APPROVAL_DECIDED,
+                request_id=request.id,
+                tool_name=request.tool_name,
+                status=result.status.value if hasattr(result.status, "value") else str(result.status),
+                approved_by=result.approved_by,
+                reason=result.reason,
+            )
 
         # 审计日志
         if self.auto_audit:
@@ -210,7 +240,6 @@ class SecurityGuard:
             request: 审批请求
             result: 审批结果
         """
-        import logging
         import json
 
         # 构建审计日志数据
@@ -225,14 +254,19 @@ class SecurityGuard:
             "reason": result.reason,
         }
 
-        # 打印到控制台
-        logging.info(f"[AUDIT] {log_entry}")
+        # 结构化字段随日志输出(JSON 格式时展开为 audit 字段)
+        logger.info(
+            "[AUDIT] %s -> %s", request.tool_name, log_entry["status"], extra={"audit": log_entry}
+        )
 
         # 写入数据库
         if self.db_manager:
             try:
+                from yfai.core.context import current_context
                 from yfai.store.db import AuditLog
 
+                ctx = current_context()
+
                 with self.db_manager.get_session() as db_session:
                     audit_log = AuditLog(
                         id=str(uuid.uuid4()),
@@ -246,19 +280,22 @@ class SecurityGuard:
                             "source": request.source,
                             "description": request.description,
                             "impact": request.impact,
+                            "trace_id": ctx.trace_id,
+                            "agent_id": ctx.agent_id,
+                            "job_id": ctx.job_id,
                         }, ensure_ascii=False),
                         result_data=json.dumps({
                             "approved_by": result.approved_by,
                             "reason": result.reason,
                             "decided_at": result.decided_at.isoformat() if result.decided_at else None,
                         }, ensure_ascii=False),
-                        session_id=None,  # 如果有会话ID可以在这里设置
+                        session_id=ctx.session_id,
                     )
                     db_session.add(audit_log)
                     db_session.commit()
             except Exception as e:
                 # 审计日志失败不应影响主流程,只记录警告
-                logging.warning(f"Failed to write audit log to database: {e}")
+                logger.warning("Failed to write audit log to database: %s", e)
 
     def redact_sensitive_info(self, text: str) -> str:
         """脱敏敏感信息
@@ -0,0 +1,21 @@
+"""无界面服务模块"""
+
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    "ApiServer": ".app",
+    "build_orchestrator": ".app",
+    "run_server": ".app",
+    "use_echo_provider": ".app",
+    "percentile": ".loadtest",
+    "run_load_test": ".loadtest",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .app import ApiServer, build_orchestrator, run_server, use_echo_provider
+    from .loadtest import percentile, run_load_test
@@ -0,0 +1,783 @@
+"""无界面服务
+
+在 asyncio HTTP 服务上暴露对话(含 SSE 流式)、工具执行、智能体运行和任务状态,
+按请求类型限制并发, 关闭时等待进行中的请求与任务写完结果
+"""
+
+import asyncio
+import hmac
+import logging
+import re
+import signal
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import aclosing
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ..core.cancellation import CancelToken, DeadlineExceeded, OperationCancelled
+from ..core.job_queue import JobPriority
+from ..core.log import get_logging_stats
+from ..core.orchestrator import Orchestrator
+from ..security.guard import ApprovalRequest, ApprovalResult, ApprovalStatus, RiskLevel
+from ..store.db import JobRun, JobStep
+from .http import HttpError, HttpRequest, SseStream, read_request, write_json
+
+logger = logging.getLogger(__name__)
+
+
+Handler = Callable[..., Awaitable[Optional[Tuple[int, Any]]]]
+
+_RISK_ORDER = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL]
+
+
+class ApiServer:
+    """编排器 HTTP 服务"""
+
+    def __init__(self, orchestrator: Orchestrator, config: Optional[Dict[str, Any]] = None):
+        """初始化服务
+
+        Args:
+            orchestrator: 核心调度器
+            config: 配置字典, 默认使用调度器的配置
+        """
+        self.orchestrator = orchestrator
+        server_config = (config or orchestrator.config).get("server", {})
+        self.host = server_config.get("host", "127.0.0.1")
+        self.port = server_config.get("port", 8765)
+        self.api_token = server_config.get("api_token")
+        self.max_connections = server_config.get("max_connections", 256)
+        self.max_body_bytes = server_config.get("max_body_bytes", 1024 * 1024)
+        self.queue_timeout = server_config.get("queue_timeout_sec", 5.0)
+        self.shutdown_grace = server_config.get("shutdown_grace_sec", 10.0)
+        self.max_finished_runs = server_config.get("max_finished_runs", 1000)
+
+        # 普通请求、流式请求与后台智能体任务分别限流
+        self._request_slots = asyncio.Semaphore(server_config.get("max_concurrent_requests", 32))
+        self._stream_slots = asyncio.Semaphore(server_config.get("max_concurrent_streams", 16))
+        self._run_slots = asyncio.Semaphore(server_config.get("max_concurrent_runs", 4))
+
+        # 无人值守时自动批准不高于该等级的操作, 未配置时需要审批的操作一律拒绝
+        approve_up_to = server_config.get("auto_approve_up_to")
+        self.auto_approve_up_to = RiskLevel(approve_up_to) if approve_up_to else None
+        if self.orchestrator.security_guard.approval_callback is None:
+            self.orchestrator.security_guard.set_approval_callback(self._headless_approval)
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._busy: Set[asyncio.Task] = set()
+        self._runs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._subscriptions: Set[Any] = set()
+        self._draining = False
+        self._started_at = time.monotonic()
+        self._stats = {"requests": 0, "rejected": 0, "errors": 0, "streams": 0}
+
+        self._routes: List[Tuple[str, re.Pattern, Handler]] = [
+            ("GET", re.compile(r"^/health$"), self._handle_health),
+            ("GET", re.compile(r"^/v1/stats$"), self._handle_stats),
+            ("POST", re.compile(r"^/v1/sessions$"), self._handle_create_session),
+            ("POST", re.compile(r"^/v1/chat$"), self._handle_chat),
+            ("GET", re.compile(r"^/v1/tools$"), self._handle_list_tools),
+            ("POST", re.compile(r"^/v1/tools/(?P<tool_name>[\w.\-]+)$"), self._handle_execute_tool),
+            ("POST", re.compile(r"^/v1/agents/(?P<agent_id>[\w\-]+)/runs$"), self._handle_run_agent),
+            ("GET", re.compile(r"^/v1/runs/(?P<run_id>[\w\-]+)$"), self._handle_get_run),
+            ("POST", re.compile(r"^/v1/runs/(?P<run_id>[\w\-]+)/cancel$"), self._handle_cancel_run),
+            ("GET", re.compile(r"^/v1/jobs/(?P<job_id>[\w\-]+)$"), self._handle_get_job),
+            ("POST", re.compile(r"^/v1/jobs/(?P<job_id>[\w\-]+)/resume$"), self._handle_resume_job),
+            ("GET", re.compile(r"^/v1/events$"), self._handle_events),
+        ]
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """开始监听"""
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        sockets = self._server.sockets or []
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+        logger.info("YFAI 服务已启动: http://%s:%s", self.host, self.port)
+
+    async def stop(self) -> None:
+        """优雅关闭
+
+        停止接受新连接, 等待进行中的请求和后台任务在宽限期内完成, 超时的任务
+        被取消(流式消息与任务状态在取消时落盘), 最后释放调度器资源
+        """
+        self._draining = True
+        if self._server:
+            self._server.close()
+
+        # 结束事件订阅流, 让对应连接尽快释放
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+        # 空闲的 keep-alive 连接直接关闭
+        for task in self._connections - self._busy:
+            task.cancel()
+
+        pending = self._busy | {
+            run["task"] for run in self._runs.values() if not run["task"].done()
+        }
+        if pending:
+            logger.info("等待 %s 个进行中的请求/任务完成...", len(pending))
+            _, still_running = await asyncio.wait(pending, timeout=self.shutdown_grace)
+            for task in still_running:
+                task.cancel()
+            if still_running:
+                await asyncio.wait(still_running, timeout=5)
+
+        if self._server:
+            await self._server.wait_closed()
+        await self.orchestrator.shutdown()
+        logger.info("YFAI 服务已停止")
+
+    async def serve_forever(self, stop_event: asyncio.Event) -> None:
+        """运行直到收到停止信号
+
+        Args:
+            stop_event: 停止事件
+        """
+        await self.start()
+        try:
+            await stop_event.wait()
+        finally:
+            await self.stop()
+
+    # ------------------------------------------------------------------
+    # 连接处理
+    # ------------------------------------------------------------------
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            if len(self._connections) > self.max_connections:
+                self._stats["rejected"] += 1
+                await write_json(
+                    writer, 503, {"error": "连接数已达上限"},
+                    {"Retry-After": "1"}, keep_alive=False,
+                )
+                return
+
+            while not self._draining:
+                try:
+                    request = await read_request(reader, self.max_body_bytes)
+                except HttpError as e:
+                    await write_json(writer, e.status, {"error": e.message}, e.headers, keep_alive=False)
+                    return
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                if request is None:
+                    return
+
+                self._busy.add(task)
+                try:
+                    keep_alive = await self._dispatch(request, writer)
+                finally:
+                    self._busy.discard(task)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _dispatch(self, request: HttpRequest, writer: asyncio.StreamWriter) -> bool:
+        """分发请求
+
+        Returns:
+            bool: 连接是否可以继续复用
+        """
+        self._stats["requests"] += 1
+        keep_alive = request.keep_alive and not self._draining
+        try:
+            if self._draining:
+                raise HttpError(503, "服务正在关闭")
+            if self.api_token and request.path != "/health":
+                if not self._authorized(request.headers.get("authorization", "")):
+                    raise HttpError(401, "未授权")
+
+            handler, params = self._match(request)
+            result = await handler(request, writer, **params)
+            if result is None:
+                # 流式响应已自行写出, 结束后关闭连接
+                return False
+            status, payload = result
+            await write_json(writer, status, payload, keep_alive=keep_alive)
+            return keep_alive
+        except HttpError as e:
+            if e.status in (429, 503):
+                self._stats["rejected"] += 1
+            await write_json(writer, e.status, {"error": e.message}, e.headers, keep_alive=keep_alive)
+            return keep_alive
+        except ConnectionError:
+            return False
+        except DeadlineExceeded as e:
+            await write_json(writer, 504, {"error": str(e)}, keep_alive=keep_alive)
+            return keep_alive
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.error("处理请求失败 %s %s: %s", request.method, request.path, e, exc_info=e)
+            await write_json(writer, 500, {"error": str(e)}, keep_alive=False)
+            return False
+
+    def _authorized(self, header: str) -> bool:
+        """校验 Bearer 令牌(恒定时间比较, 不泄露匹配长度)"""
+        expected = f"Bearer {self.api_token}".encode("utf-8")
+        return hmac.compare_digest(header.encode("utf-8"), expected)
+
+    def _match(self, request: HttpRequest) -> Tuple[Handler, Dict[str, str]]:
+        path_matched = False
+        for method, pattern, handler in self._routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            path_matched = True
+            if method == request.method:
+                return handler, match.groupdict()
+        if path_matched:
+            raise HttpError(405, "不支持的请求方法")
+        raise HttpError(404, f"未找到: {request.path}")
+
+    async def _acquire(self, semaphore: asyncio.Semaphore, name: str) -> None:
+        """在排队超时内获取并发名额, 否则返回 503"""
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HttpError(503, f"{name}并发已达上限, 请稍后重试", {"Retry-After": "1"})
+
+    async def _headless_approval(self, request: ApprovalRequest) -> ApprovalResult:
+        """无人值守审批: 仅自动批准不高于配置等级的操作"""
+        if self.auto_approve_up_to and (
+            _RISK_ORDER.index(request.risk_level) <= _RISK_ORDER.index(self.auto_approve_up_to)
+        ):
+            return ApprovalResult(
+                request_id=request.id,
+                status=ApprovalStatus.APPROVED,
+                approved_by="auto",
+                reason="无界面服务自动批准",
+            )
+        return ApprovalResult(
+            request_id=request.id,
+            status=ApprovalStatus.REJECTED,
+            approved_by="auto",
+            reason="无界面服务未授权该风险等级的操作",
+        )
+
+    # ------------------------------------------------------------------
+    # 路由处理
+    # ------------------------------------------------------------------
+
+    async def _handle_health(self, request: HttpRequest, writer) -> Tuple[int, Any]:
+        return 200, {"status": "draining" if self._draining else "ok"}
+
+    async def _handle_stats(self, request: HttpRequest, writer) -> Tuple[int, Any]:
+        return 200, {
+            **self._stats,
+            "uptime_sec": round(time.monotonic() - self._started_at, 1),
+            "connections": len(self._connections),
+            "in_flight": len(self._busy),
+            "runs_active": sum(1 for run in self._runs.values() if not run["task"].done()),
+            "request_slots": self._request_slots._value,
+            "stream_slots": self._stream_slots._value,
+            "run_slots": self._run_slots._value,
+            "local_executor": self.orchestrator.local_executor.get_stats(),
+            "event_bus": self.orchestrator.event_bus.get_stats(),
+            "agent_queue": self.orchestrator.job_queue.get_stats(),
+            "tool_cache": self.orchestrator.tool_cache.get_stats() if self.orchestrator.tool_cache else None,
+            "plan_cache": self.orchestrator.plan_cache.get_stats() if self.orchestrator.plan_cache else None,
+            "logging": get_logging_stats(),
+        }
+
+    async def _handle_create_session(self, request: HttpRequest, writer) -> Tuple[int, Any]:
+        body = request.json()
+        session_id = await self.orchestrator.create_session(
+            title=body.get("title", "新对话"),
+            assistant_id=body.get("assistant_id"),
+        )
+        return 201, {"session_id": session_id}
+
+    async def _handle_chat(
+        self, request: HttpRequest, writer: asyncio.StreamWriter
+    ) -> Optional[Tuple[int, Any]]:
+        body = request.json()
+        message = body.get("message")
+        if not message:
+            raise HttpError(400, "缺少 message")
+        session_id = body.get("session_id")
+        provider = body.get("provider")
+        model = body.get("model")
+        timeout = body.get("timeout_sec")
+
+        if body.get("compare"):
+            await self._stream_compare(writer, message, session_id, body)
+            return None
+
+        if body.get("stream"):
+            await self._stream_chat(
+                writer, message, session_id, provider, model, body.get("context"), timeout
+            )
+            return None
+
+        await self._acquire(self._request_slots, "请求")
+        try:
+            if body.get("tools") is not None:
+                response = await self.orchestrator.chat_with_tools(
+                    message,
+                    session_id=session_id,
+                    provider=provider,
+                    model=model,
+                    tools=body.get("tools") or None,
+                    max_rounds=body.get("max_rounds", 5),
+                    timeout=timeout,
+                )
+            else:
+                response = await self.orchestrator.chat(
+                    message, session_id=session_id, provider=provider, model=model,
+                    timeout=timeout,
+                )
+        finally:
+            self._request_slots.release()
+
+        if response is None:
+            raise HttpError(502, "Provider 返回空响应")
+        return 200, response.model_dump()
+
+    async def _stream_chat(
+        self,
+        writer: asyncio.StreamWriter,
+        message: str,
+        session_id: Optional[str],
+        provider: Optional[str],
+        model: Optional[str],
+        context: Optional[str],
+        timeout: Optional[float] = None,
+    ) -> None:
+        """以 SSE 推送流式回复: session -> chunk* -> done | error"""
+        await self._acquire(self._stream_slots, "流式请求")
+        self._stats["streams"] += 1
+        try:
+            if not session_id:
+                session_id = await self.orchestrator.create_session()
+            sse = SseStream(writer)
+            await sse.start()
+            await sse.send("session", {"session_id": session_id})
+
+            started = time.monotonic()
+            chunks = 0
+            stream = self.orchestrator.stream_chat(
+                message, session_id=session_id, provider=provider, model=model,
+                context=context, timeout=timeout,
+            )
+            try:
+                # 客户端断开时关闭生成器, 已收到的内容以 cancelled 状态落盘
+                async with aclosing(stream):
+                    async for chunk in stream:
+                        chunks += 1
+                        await sse.send("chunk", {"text": chunk})
+            except ConnectionError:
+                return
+            except Exception as e:
+                await sse.send("error", {"error": str(e)})
+                return
+            await sse.send("done", {
+                "session_id": session_id,
+                "chunks": chunks,
+                "duration_ms": int((time.monotonic() - started) * 1000),
+            })
+        finally:
+            self._stream_slots.release()
+
+    async def _stream_compare(
+        self,
+        writer: asyncio.StreamWriter,
+        message: str,
+        session_id: Optional[str],
+        body: Dict[str, Any],
+    ) -> None:
+        """对比模式: 以 SSE 推送多路流 chunk*/done* -> result | error"""
+        compare = body["compare"]
+        if not isinstance(compare, list) or not all(
+            isinstance(item, dict) and item.get("provider") for item in compare
+        ):
+            raise HttpError(400, "compare 必须是 {provider, model} 对象列表")
+        targets = [(item["provider"], item.get("model")) for item in compare]
+
+        await self._acquire(self._stream_slots, "流式请求")
+        self._stats["streams"] += 1
+        try:
+            stream = self.orchestrator.compare_chat(
+                message,
+                targets,
+                session_id=session_id,
+                context=body.get("context"),
+                winner=body.get("winner", "fastest"),
+                keep_alternates=bool(body.get("keep_alternates")),
+            )
+            sse = SseStream(writer)
+            await sse.start()
+            try:
+                async with aclosing(stream):
+                    async for event in stream:
+                        await sse.send(event.pop("type"), event)
+            except ConnectionError:
+                return
+            except Exception as e:
+                await sse.send("error", {"error": str(e)})
+        finally:
+            self._stream_slots.release()
+
+    async def _handle_events(self, request: HttpRequest, writer) -> None:
+        """以 SSE 推送事件总线上的事件
+
+        查询参数: types(逗号分隔的类型或前缀, 如 job,tool.call)、session_id、agent_id、job_id
+        """
+        types = [t for t in request.query.get("types", "").split(",") if t]
+        filters = {
+            name: request.query[name]
+            for name in ("session_id", "agent_id", "job_id")
+            if request.query.get(name)
+        }
+
+        def predicate(event) -> bool:
+            return all(getattr(event, name) == value for name, value in filters.items())
+
+        await self._acquire(self._stream_slots, "流式请求")
+        self._stats["streams"] += 1
+        subscription = self.orchestrator.event_bus.subscribe(*types, predicate=predicate)
+        self._subscriptions.add(subscription)
+        try:
+            sse = SseStream(writer)
+            await sse.start()
+            while not subscription.closed:
+                event = await subscription.get(timeout=15)
+                if event is None:
+                    if not subscription.closed:
+                        # 心跳, 同时及时发现已断开的客户端
+                        await sse.send("ping", {"dropped": subscription.dropped})
+                    continue
+                await sse.send(event.type, event.to_dict())
+        except ConnectionError:
+            pass
+        finally:
+            subscription.close()
+            self._subscriptions.discard(subscription)
+            self._stream_slots.release()
+
+    async def _handle_list_tools(self, request: HttpRequest, writer) -> Tuple[int, Any]:
+        tool_type = request.query.get("type")
+        return 200, {
+            "tools": [
+                {
+                    "name": spec.name,
+                    "type": spec.tool_type,
+                    "risk_level": spec.risk_level,
+                    "description": spec.description,
+                    "parameters": spec.parameters,
+                }
+                for spec in self.orchestrator.tool_registry.list_specs(tool_type)
+            ]
+        }
+
+    async def _handle_execute_tool(
+        self, request: HttpRequest, writer, tool_name: str
+    ) -> Tuple[int, Any]:
+        if tool_name not in self.orchestrator.tool_registry:
+            raise HttpError(404, f"未知工具: {tool_name}")
+        body = request.json()
+        await self._acquire(self._request_slots, "请求")
+        try:
+            result = await self.orchestrator.execute_tool(
+                tool_name, body.get("params", {}), session_id=body.get("session_id"),
+                timeout=body.get("timeout_sec"),
+            )
+        finally:
+            self._request_slots.release()
+        return 200, result
+
+    async def _handle_run_agent(
+        self, request: HttpRequest, writer, agent_id: str
+    ) -> Optional[Tuple[int, Any]]:
+        body = request.json()
+        goal = body.get("goal")
+        if not goal:
+            raise HttpError(400, "缺少 goal")
+
+        session_id = body.get("session_id") or await self.orchestrator.create_session(
+            title=f"Agent: {goal[:50]}"
+        )
+        if body.get("stream"):
+            await self._stream_run(writer, agent_id, goal, session_id, body)
+            return None
+        run_id = str(uuid.uuid4())
+        run = {
+            "run_id": run_id,
+            "agent_id": agent_id,
+            "session_id": session_id,
+            "priority": self._parse_priority(body),
+            "status": "queued",
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        run["token"] = CancelToken()
+        run["task"] = asyncio.create_task(
+            self._execute_run(run, goal, body.get("context"), body.get("timeout_sec"))
+        )
+        self._runs[run_id] = run
+        self._prune_runs()
+
+        if body.get("wait"):
+            await asyncio.shield(run["task"])
+            return 200, self._run_view(run)
+        return 202, self._run_view(run)
+
+    async def _stream_run(
+        self,
+        writer: asyncio.StreamWriter,
+        agent_id: str,
+        goal: str,
+        session_id: str,
+        body: Dict[str, Any],
+    ) -> None:
+        """以 SSE 推送智能体运行事件: job.status/job.plan/job.step/job.output/job.summary* -> job.result | error
+
+        客户端断开时关闭事件流, 任务随之取消
+        """
+        priority = self._parse_priority(body)
+        await self._acquire(self._stream_slots, "流式请求")
+        self._stats["streams"] += 1
+        try:
+            sse = SseStream(writer)
+            await sse.start()
+            stream = self.orchestrator.run_agent_stream(
+                agent_id=agent_id,
+                goal=goal,
+                session_id=session_id,
+                context=body.get("context"),
+                timeout=body.get("timeout_sec"),
+                priority=priority,
+            )
+            try:
+                async with aclosing(stream):
+                    async for event in stream:
+                        await sse.send(event.type, event.to_dict())
+            except ConnectionError:
+                return
+            except Exception as e:
+                await sse.send("error", {"error": str(e)})
+        finally:
+            self._stream_slots.release()
+
+    async def _handle_resume_job(self, request: HttpRequest, writer, job_id: str) -> Tuple[int, Any]:
+        body = request.json()
+        with self.orchestrator.db_manager.get_session() as db_session:
+            job = db_session.query(JobRun).filter(JobRun.id == job_id).first()
+            if not job or job.type != "agent":
+                raise HttpError(404, f"未找到任务: {job_id}")
+            if job.status == "success":
+                raise HttpError(409, f"任务已成功完成: {job_id}")
+            agent_id, session_id = job.agent_id, job.session_id
+        if job_id in self.orchestrator.agent_runner.running_jobs():
+            raise HttpError(409, f"任务正在运行中: {job_id}")
+
+        run_id = str(uuid.uuid4())
+        run = {
+            "run_id": run_id,
+            "agent_id": agent_id,
+            "session_id": session_id,
+            "job_id": job_id,
+            "resume": True,
+            "priority": self._parse_priority(body),
+            "status": "queued",
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        run["token"] = CancelToken()
+        run["task"] = asyncio.create_task(
+            self._execute_run(run, None, body.get("context"), body.get("timeout_sec"))
+        )
+        self._runs[run_id] = run
+        self._prune_runs()
+
+        if body.get("wait"):
+            await asyncio.shield(run["task"])
+            return 200, self._run_view(run)
+        return 202, self._run_view(run)
+
+    @staticmethod
+    def _parse_priority(body: Dict[str, Any]) -> str:
+        """读取请求中的排队优先级(interactive / scheduled / batch)"""
+        priority = body.get("priority", "interactive")
+        try:
+            return JobPriority.parse(priority).name.lower()
+        except (ValueError, KeyError) as e:
+            raise HttpError(400, str(e))
+
+    async def _execute_run(
+        self,
+        run: Dict[str, Any],
+        goal: Optional[str],
+        context: Optional[Dict[str, Any]],
+        timeout: Optional[float] = None,
+    ) -> None:
+        await self._run_slots.acquire()
+        try:
+            run["status"] = "running"
+            if run.get("resume"):
+                # 继续执行已有任务, 复用已成功步骤的结果
+                result = await self.orchestrator.resume_job(
+                    run["job_id"],
+                    context=context,
+                    timeout=timeout,
+                    cancel_token=run["token"],
+                    priority=run["priority"],
+                )
+            else:
+                result = await self.orchestrator.run_agent(
+                    agent_id=run["agent_id"],
+                    goal=goal,
+                    session_id=run["session_id"],
+                    context=context,
+                    timeout=timeout,
+                    cancel_token=run["token"],
+                    priority=run["priority"],
+                )
+            run["job_id"] = result.get("job_id")
+            run["status"] = result.get("status", "success")
+            run["summary"] = result.get("summary")
+        except asyncio.CancelledError:
+            run["status"] = "cancelled"
+            raise
+        except OperationCancelled as e:
+            run["status"] = "cancelled"
+            run["error"] = str(e)
+        except Exception as e:
+            run["status"] = "failed"
+            run["error"] = str(e)
+        finally:
+            run["ended_at"] = datetime.utcnow().isoformat()
+            self._run_slots.release()
+
+    def _prune_runs(self) -> None:
+        """只保留有限数量的已结束任务记录"""
+        finished = [run_id for run_id, run in self._runs.items() if run["task"].done()]
+        for run_id in finished[: max(0, len(finished) - self.max_finished_runs)]:
+            del self._runs[run_id]
+
+    def _run_view(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        view = {key: value for key, value in run.items() if key not in ("task", "token")}
+        if not view.get("job_id"):
+            with self.orchestrator.db_manager.get_session() as db_session:
+                job = (
+                    db_session.query(JobRun)
+                    .filter(JobRun.session_id == run["session_id"], JobRun.agent_id == run["agent_id"])
+                    .order_by(JobRun.created_at.desc())
+                    .first()
+                )
+                if job:
+                    view["job_id"] = job.id
+        return view
+
+    async def _handle_get_run(self, request: HttpRequest, writer, run_id: str) -> Tuple[int, Any]:
+        run = self._runs.get(run_id)
+        if not run:
+            raise HttpError(404, f"未找到运行记录: {run_id}")
+        return 200, self._run_view(run)
+
+    async def _handle_cancel_run(self, request: HttpRequest, writer, run_id: str) -> Tuple[int, Any]:
+        run = self._runs.get(run_id)
+        if not run:
+            raise HttpError(404, f"未找到运行记录: {run_id}")
+        if run["task"].done():
+            raise HttpError(409, f"运行已结束: {run['status']}")
+        if run["status"] == "queued":
+            # 尚未开始, 直接撤销排队
+            run["task"].cancel()
+        else:
+            # 中断进行中的模型请求、工具与子进程, 任务记录标记为已取消
+            run["token"].cancel("客户端取消")
+        await asyncio.wait({run["task"]}, timeout=5)
+        return 202, self._run_view(run)
+
+    async def _handle_get_job(self, request: HttpRequest, writer, job_id: str) -> Tuple[int, Any]:
+        with self.orchestrator.db_manager.get_session() as db_session:
+            job = db_session.query(JobRun).filter(JobRun.id == job_id).first()
+            if not job:
+                raise HttpError(404, f"未找到任务: {job_id}")
+            steps = (
+                db_session.query(JobStep)
+                .filter(JobStep.job_id == job_id)
+                .order_by(JobStep.step_index)
+                .all()
+            )
+            payload = job.to_dict()
+            payload["steps"] = [step.to_dict() for step in steps]
+        return 200, payload
+
+
+def build_orchestrator(config: Dict[str, Any]) -> Orchestrator:
+    """按配置创建调度器并初始化内置数据(不依赖 Qt)
+
+    Args:
+        config: 配置字典
+
+    Returns:
+        Orchestrator: 核心调度器
+    """
+    orchestrator = Orchestrator(config)
+    orchestrator.db_manager.init_builtin_assistants()
+    orchestrator.db_manager.init_builtin_agents()
+    return orchestrator
+
+
+def use_echo_provider(config: Dict[str, Any]) -> None:
+    """启用本地回显 Provider 并设为默认, 用于压测与联调
+
+    Args:
+        config: 配置字典(原地修改)
+    """
+    config.setdefault("providers", {}).setdefault("echo", {})
+    config.setdefault("app", {})["default_provider"] = "echo"
+
+
+async def run_server(
+    config: Dict[str, Any],
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+) -> None:
+    """运行服务直到收到 SIGINT/SIGTERM
+
+    Args:
+        config: 配置字典
+        host: 监听地址, 覆盖配置
+        port: 监听端口, 覆盖配置
+    """
+    server_config = config.setdefault("server", {})
+    if host:
+        server_config["host"] = host
+    if port is not None:
+        server_config["port"] = port
+
+    orchestrator = build_orchestrator(config)
+    server = ApiServer(orchestrator, config)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows 事件循环不支持信号处理, 由 KeyboardInterrupt 取消主任务
+            pass
+
+    orchestrator.start_warmup()
+    await server.serve_forever(stop_event)
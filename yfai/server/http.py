@@ -0,0 +1,191 @@
+"""最小 HTTP/1.1 协议实现
+
+基于 asyncio 流读写请求与响应, 支持 keep-alive、JSON 响应和 SSE 推送,
+避免为无界面服务模式引入额外的 Web 框架依赖
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+
+class HttpError(Exception):
+    """以指定状态码结束请求的错误"""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+@dataclass
+class HttpRequest:
+    """HTTP 请求"""
+
+    method: str
+    path: str
+    query: Dict[str, str] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    version: str = "HTTP/1.1"
+
+    @property
+    def keep_alive(self) -> bool:
+        """客户端是否希望保持连接"""
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self) -> Dict[str, Any]:
+        """解析 JSON 请求体
+
+        Returns:
+            Dict[str, Any]: 请求体, 为空时返回空字典
+        """
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HttpError(400, f"请求体不是有效的 JSON: {e}")
+        if not isinstance(data, dict):
+            raise HttpError(400, "请求体必须是 JSON 对象")
+        return data
+
+
+async def read_request(
+    reader: asyncio.StreamReader,
+    max_body_bytes: int = 1024 * 1024,
+) -> Optional[HttpRequest]:
+    """读取一个请求
+
+    Args:
+        reader: 连接读取端
+        max_body_bytes: 请求体上限
+
+    Returns:
+        Optional[HttpRequest]: 请求, 连接关闭时返回 None
+    """
+    try:
+        request_line = await reader.readline()
+    except (asyncio.LimitOverrunError, ValueError):
+        raise HttpError(414, "请求行过长")
+    if not request_line:
+        return None
+
+    parts = request_line.decode("latin-1").strip().split()
+    if len(parts) != 3:
+        raise HttpError(400, "请求行格式错误")
+    method, target, version = parts
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            return None
+        if line in (b"\r\n", b"\n"):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+        if len(headers) > 100:
+            raise HttpError(431, "请求头过多")
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HttpError(411, "不支持分块请求体, 请提供 Content-Length")
+
+    body = b""
+    length = headers.get("content-length")
+    if length:
+        try:
+            size = int(length)
+        except ValueError:
+            raise HttpError(400, "Content-Length 无效")
+        if size > max_body_bytes:
+            raise HttpError(413, "请求体过大")
+        body = await reader.readexactly(size)
+
+    url = urlsplit(target)
+    return HttpRequest(
+        method=method.upper(),
+        path=unquote(url.path) or "/",
+        query=dict(parse_qsl(url.query)),
+        headers=headers,
+        body=body,
+        version=version,
+    )
+
+
+def _status_line(status: int) -> str:
+    try:
+        phrase = HTTPStatus(status).phrase
+    except ValueError:
+        phrase = ""
+    return f"HTTP/1.1 {status} {phrase}\r\n"
+
+
+async def write_json(
+    writer: asyncio.StreamWriter,
+    status: int,
+    payload: Any,
+    headers: Optional[Dict[str, str]] = None,
+    keep_alive: bool = True,
+) -> None:
+    """写出 JSON 响应
+
+    Args:
+        writer: 连接写入端
+        status: 状态码
+        payload: 响应数据
+        headers: 额外响应头
+        keep_alive: 是否保持连接
+    """
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    head = [
+        _status_line(status),
+        "Content-Type: application/json; charset=utf-8\r\n",
+        f"Content-Length: {len(body)}\r\n",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n",
+    ]
+    for name, value in (headers or {}).items():
+        head.append(f"{name}: {value}\r\n")
+    head.append("\r\n")
+    writer.write("".join(head).encode("latin-1") + body)
+    await writer.drain()
+
+
+class SseStream:
+    """Server-Sent Events 响应"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.started = False
+
+    async def start(self) -> None:
+        """写出响应头"""
+        self.writer.write(
+            (
+                _status_line(200)
+                + "Content-Type: text/event-stream; charset=utf-8\r\n"
+                + "Cache-Control: no-cache\r\n"
+                + "Connection: close\r\n"
+                + "X-Accel-Buffering: no\r\n\r\n"
+            ).encode("latin-1")
+        )
+        await self.writer.drain()
+        self.started = True
+
+    async def send(self, event: str, data: Any) -> None:
+        """推送一个事件
+
+        Args:
+            event: 事件名称
+            data: 事件数据(序列化为 JSON)
+        """
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        self.writer.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+        await self.writer.drain()
@@ -0,0 +1,131 @@
+"""本地压测
+
+对无界面服务并发发起对话请求, 统计吞吐与延迟分位数; 配合回显 Provider
+(`python -m yfai serve --echo`)可以在不访问外部 API 的情况下测量服务本身的开销
+"""
+
+import asyncio
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """计算分位数(最近秩法)
+
+    Args:
+        values: 样本
+        pct: 百分位(0-100)
+
+    Returns:
+        Optional[float]: 分位数, 无样本时返回 None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, math.ceil(pct * len(ordered) / 100) - 1))
+    return ordered[rank]
+
+
+async def _one_request(
+    client: httpx.AsyncClient,
+    url: str,
+    payload: Dict[str, Any],
+    stream: bool,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    first_byte: Optional[float] = None
+    if not stream:
+        response = await client.post(url, json=payload)
+        return {
+            "status": response.status_code,
+            "latency": time.perf_counter() - started,
+        }
+
+    async with client.stream("POST", url, json=payload) as response:
+        async for line in response.aiter_lines():
+            if first_byte is None and line.startswith("event: chunk"):
+                first_byte = time.perf_counter() - started
+            if line.startswith("event: error"):
+                return {"status": 599, "latency": time.perf_counter() - started}
+    return {
+        "status": response.status_code,
+        "latency": time.perf_counter() - started,
+        "ttfb": first_byte,
+    }
+
+
+async def run_load_test(
+    base_url: str = "http://127.0.0.1:8765",
+    total: int = 200,
+    concurrency: int = 16,
+    stream: bool = False,
+    message: str = "ping",
+    provider: Optional[str] = None,
+    api_token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """执行压测
+
+    Args:
+        base_url: 服务地址
+        total: 请求总数
+        concurrency: 并发数
+        stream: 是否使用 SSE 流式接口
+        message: 发送的消息
+        provider: 指定 Provider
+        api_token: 服务访问令牌
+
+    Returns:
+        Dict[str, Any]: 统计结果(秒)
+    """
+    url = f"{base_url.rstrip('/')}/v1/chat"
+    payload: Dict[str, Any] = {"message": message, "stream": stream}
+    if provider:
+        payload["provider"] = provider
+    headers = {"Authorization": f"Bearer {api_token}"} if api_token else None
+
+    results: List[Dict[str, Any]] = []
+    remaining = iter(range(total))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for _ in remaining:
+            try:
+                results.append(await _one_request(client, url, payload, stream))
+            except httpx.HTTPError as e:
+                results.append({"status": 0, "latency": 0.0, "error": str(e)})
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=60, limits=limits, headers=headers) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if r["status"] == 200]
+    latencies = [r["latency"] for r in ok]
+    ttfbs = [r["ttfb"] for r in ok if r.get("ttfb") is not None]
+    status_counts: Dict[str, int] = {}
+    for r in results:
+        status_counts[str(r["status"])] = status_counts.get(str(r["status"]), 0) + 1
+
+    report: Dict[str, Any] = {
+        "requests": len(results),
+        "succeeded": len(ok),
+        "status": status_counts,
+        "elapsed": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+    }
+    if stream:
+        report["ttfb_p50"] = percentile(ttfbs, 50)
+        report["ttfb_p95"] = percentile(ttfbs, 95)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """输出压测结果"""
+    print(json.dumps(report, ensure_ascii=False, indent=2))
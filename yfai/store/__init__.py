@@ -1,16 +1,31 @@
 """数据存储模块"""
 
-from .db import DatabaseManager, Session, Message, ToolCall, Assistant, KnowledgeBase, ProviderStatus
-from .indexer import VectorIndexer
+from typing import TYPE_CHECKING
 
-__all__ = [
-    "DatabaseManager",
-    "Session",
-    "Message",
-    "ToolCall",
-    "Assistant",
-    "KnowledgeBase",
-    "ProviderStatus",
-    "VectorIndexer",
-]
+from .._lazy import lazy_exports
 
+_EXPORTS = {
+    "DatabaseManager": ".db",
+    "Session": ".db",
+    "Message": ".db",
+    "ToolCall": ".db",
+    "Assistant": ".db",
+    "KnowledgeBase": ".db",
+    "ProviderStatus": ".db",
+    "VectorIndexer": ".indexer",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS, globals())
+
+if TYPE_CHECKING:
+    from .db import (
+        DatabaseManager,
+        Session,
+        Message,
+        ToolCall,
+        Assistant,
+        KnowledgeBase,
+        ProviderStatus,
+    )
+    from .indexer import VectorIndexer